@@ -0,0 +1,276 @@
+import codecs
+import csv
+import io
+import json
+import os
+from typing import AsyncIterator, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from .services import legacy_calculate_emissions_batch
+
+
+# Rows parsed and computed per step when processing uploaded CSVs
+CSV_CHUNK_ROWS = int(os.getenv("CSV_CHUNK_ROWS", "5000"))
+# Longest CSV record accepted from a streamed body before giving up
+MAX_CSV_RECORD_BYTES = int(os.getenv("MAX_CSV_RECORD_BYTES", str(1 << 20)))
+
+# Columns of a /calculate activity log and the value used when a cell is blank or missing
+LEGACY_COLUMN_DEFAULTS = {
+    "excavation": 0.0,
+    "transportation": 0.0,
+    "fuel": 0.0,
+    "equipment": 0.0,
+    "workers": 1.0,
+    "output": 1.0,
+    "reduction": 0.0,
+}
+LEGACY_RESULT_KEYS = [
+    "totalEmissions", "excavationEmissions", "transportationEmissions", "equipmentEmissions",
+    "excavationPerCapita", "transportationPerCapita", "equipmentPerCapita",
+    "excavationPerOutput", "transportationPerOutput", "equipmentPerOutput",
+    "perCapitaEmissions", "perOutputEmissions", "baseline", "carboncredits", "reduced", "worth", "total",
+]
+# Result keys accumulated across the whole log, reported with every row
+LEGACY_RUNNING_KEYS = {
+    "totalEmissions": "runningTotalEmissions",
+    "total": "runningTotal",
+    "carboncredits": "runningCarboncredits",
+    "worth": "runningWorth",
+}
+
+
+def iter_csv_chunks(fileobj: BinaryIO, chunk_rows: int = CSV_CHUNK_ROWS) -> Iterator[Tuple[Dict[str, int], List[List[str]]]]:
+    """Yield (column index, rows) chunks from a binary CSV stream without reading it whole"""
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    try:
+        reader = csv.reader(text)
+        try:
+            header = next(reader)
+        except StopIteration:
+            return
+        index = {name.strip(): i for i, name in enumerate(header)}
+        chunk: List[List[str]] = []
+        for row in reader:
+            if not row:
+                continue
+            chunk.append(row)
+            if len(chunk) >= chunk_rows:
+                yield index, chunk
+                chunk = []
+        if chunk:
+            yield index, chunk
+    finally:
+        # Don't let the wrapper close the underlying upload
+        text.detach()
+
+
+def text_column(index: Dict[str, int], rows: List[List[str]], name: str) -> List[str]:
+    i = index.get(name)
+    if i is None:
+        return [""] * len(rows)
+    return [r[i].strip() if i < len(r) else "" for r in rows]
+
+
+def float_column(index: Dict[str, int], rows: List[List[str]], name: str, default: Optional[float] = None,
+                 row_offset: int = 0) -> np.ndarray:
+    """Parse one column as float64; blanks take `default` (NaN when None)"""
+    fill = "nan" if default is None else repr(float(default))
+    values = [v or fill for v in text_column(index, rows, name)]
+    try:
+        return np.array(values, dtype=np.float64)
+    except ValueError:
+        # Locate the offending row for the error message
+        for n, v in enumerate(values):
+            try:
+                float(v)
+            except ValueError:
+                raise ValueError(f"row {row_offset + n + 1}: invalid number {v!r} in column {name}") from None
+        raise
+
+
+def parse_float_columns(index: Dict[str, int], rows: List[List[str]], defaults: Dict[str, float],
+                        row_offset: int = 0) -> Tuple[Dict[str, np.ndarray], Dict[int, str]]:
+    """Like float_column for several columns, but collects per-row errors instead of raising"""
+    arrays: Dict[str, np.ndarray] = {}
+    errors: Dict[int, str] = {}
+    for name, default in defaults.items():
+        fill = repr(float(default))
+        values = [v or fill for v in text_column(index, rows, name)]
+        try:
+            arrays[name] = np.array(values, dtype=np.float64)
+        except ValueError:
+            column = np.empty(len(values), dtype=np.float64)
+            for n, v in enumerate(values):
+                try:
+                    column[n] = float(v)
+                except ValueError:
+                    column[n] = default
+                    errors.setdefault(row_offset + n, f"invalid number {v!r} in column {name}")
+            arrays[name] = column
+    return arrays, errors
+
+
+def _record_boundary(text: str) -> int:
+    # End of the last complete CSV record: a newline preceded by balanced quotes
+    cut, quotes, start = 0, 0, 0
+    while True:
+        pos = text.find("\n", start)
+        if pos < 0:
+            return cut
+        quotes += text.count('"', start, pos + 1)
+        if quotes % 2 == 0:
+            cut = pos + 1
+        start = pos + 1
+
+
+def _split_records(pending: str, finished: bool) -> Tuple[List[List[str]], str]:
+    # Parse the complete records at the front of `pending`; returns them and the unparsed rest
+    cut = len(pending) if finished else _record_boundary(pending)
+    if cut == 0:
+        return [], pending
+    rows = [row for row in csv.reader(io.StringIO(pending[:cut], newline="")) if row]
+    return rows, pending[cut:]
+
+
+async def aiter_csv_chunks(byte_stream: AsyncIterator[bytes],
+                           chunk_rows: int = CSV_CHUNK_ROWS) -> AsyncIterator[Tuple[Dict[str, int], List[List[str]]]]:
+    """Async counterpart of iter_csv_chunks for a request body that is still arriving.
+
+    Records are found and parsed in the threadpool; only decoding runs on the event loop.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    index: Optional[Dict[str, int]] = None
+    chunk: List[List[str]] = []
+    pending = ""
+    finished = False
+    while not finished:
+        try:
+            data = await byte_stream.__anext__()
+            pending += decoder.decode(data)
+        except StopAsyncIteration:
+            pending += decoder.decode(b"", final=True)
+            finished = True
+        rows, pending = await run_in_threadpool(_split_records, pending, finished)
+        if len(pending) > MAX_CSV_RECORD_BYTES:
+            raise ValueError(f"CSV record longer than {MAX_CSV_RECORD_BYTES} bytes")
+        for row in rows:
+            if index is None:
+                index = {name.strip(): i for i, name in enumerate(row)}
+                continue
+            chunk.append(row)
+            if len(chunk) >= chunk_rows:
+                yield index, chunk
+                chunk = []
+    if chunk and index is not None:
+        yield index, chunk
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """StreamingResponse whose body iterator is still reading the request.
+
+    Starlette's StreamingResponse drains receive() to watch for disconnects, which would swallow
+    the request body we are consuming; here the body iterator owns receive() and notices a
+    disconnect through request.stream() instead.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+def _legacy_chunk(index: Dict[str, int], rows: List[List[str]], row_offset: int,
+                  running: Dict[str, float]) -> Tuple[Dict[str, List], Dict[int, str]]:
+    arrays, errors = parse_float_columns(index, rows, LEGACY_COLUMN_DEFAULTS, row_offset=row_offset)
+    results = legacy_calculate_emissions_batch(
+        excavation=arrays["excavation"],
+        transportation=arrays["transportation"],
+        fuel=arrays["fuel"],
+        equipment=arrays["equipment"],
+        workers=arrays["workers"],
+        output=arrays["output"],
+        fuel_type=[v or "coal" for v in text_column(index, rows, "fuelType")],
+        reduction=arrays["reduction"],
+    )
+    ok = np.ones(len(rows), dtype=bool)
+    if errors:
+        ok[[n - row_offset for n in errors]] = False
+    columns = {key: results[key].tolist() for key in LEGACY_RESULT_KEYS}
+    for key, running_key in LEGACY_RUNNING_KEYS.items():
+        cumulative = np.cumsum(np.where(ok, results[key], 0.0)) + running[key]
+        running[key] = float(cumulative[-1])
+        columns[running_key] = cumulative.tolist()
+    return columns, errors
+
+
+def _render_ndjson(columns: Dict[str, List], errors: Dict[int, str], row_offset: int) -> bytes:
+    keys = list(columns)
+    lines = []
+    for n, values in enumerate(zip(*columns.values())):
+        row = row_offset + n
+        if row in errors:
+            lines.append(json.dumps({"row": row + 1, "error": errors[row]}))
+        else:
+            record = {"row": row + 1}
+            record.update(zip(keys, values))
+            lines.append(json.dumps(record))
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+LEGACY_CSV_HEADER = ["row", *LEGACY_RESULT_KEYS, *LEGACY_RUNNING_KEYS.values(), "error"]
+
+
+def _csv_lines(records: List[List]) -> bytes:
+    out = io.StringIO()
+    csv.writer(out).writerows(records)
+    return out.getvalue().encode("utf-8")
+
+
+def _csv_error(row: int, message: str) -> List:
+    return [row + 1] + [""] * (len(LEGACY_CSV_HEADER) - 2) + [message]
+
+
+def _render_csv(columns: Dict[str, List], errors: Dict[int, str], row_offset: int) -> bytes:
+    records = []
+    for n, values in enumerate(zip(*columns.values())):
+        row = row_offset + n
+        if row in errors:
+            records.append(_csv_error(row, errors[row]))
+        else:
+            records.append([row + 1, *values, ""])
+    return _csv_lines(records)
+
+
+async def stream_legacy_calculations(byte_stream: AsyncIterator[bytes], fmt: str = "ndjson") -> AsyncIterator[bytes]:
+    """Apply the /calculate formulas to an activity-log CSV chunk by chunk, streaming results back.
+
+    Memory is bounded by CSV_CHUNK_ROWS regardless of the size of the log.
+    """
+    render = _render_csv if fmt == "csv" else _render_ndjson
+    running = {key: 0.0 for key in LEGACY_RUNNING_KEYS}
+    rows_done, error_rows = 0, 0
+    if fmt == "csv":
+        yield _csv_lines([LEGACY_CSV_HEADER])
+    try:
+        async for index, rows in aiter_csv_chunks(byte_stream):
+            # Rows arrive parsed from the threadpool; number conversion, the array math and
+            # serialisation go there too
+            columns, errors = await run_in_threadpool(_legacy_chunk, index, rows, rows_done, running)
+            yield await run_in_threadpool(render, columns, errors, rows_done)
+            rows_done += len(rows)
+            error_rows += len(errors)
+    except ValueError as e:
+        # The status line is already sent; report the failure in-band and stop
+        if fmt == "csv":
+            yield _csv_lines([_csv_error(rows_done, str(e))])
+        else:
+            yield (json.dumps({"error": str(e)}) + "\n").encode("utf-8")
+        return
+    if fmt != "csv":
+        summary = {"rows": rows_done, "error_rows": error_rows}
+        summary.update({running_key: running[key] for key, running_key in LEGACY_RUNNING_KEYS.items()})
+        yield (json.dumps({"summary": summary}) + "\n").encode("utf-8")
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from fastapi.encoders import jsonable_encoder
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+
+
+# Entries kept by the compute-endpoint response cache; 0 disables it
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2048"))
+# Seconds an entry stays valid even if the data/model versions don't change
+RESPONSE_CACHE_TTL_S = float(os.getenv("RESPONSE_CACHE_TTL_S", "300"))
+# Max-age sent with the ETag'd reference endpoints
+STATIC_MAX_AGE_S = int(os.getenv("STATIC_MAX_AGE_S", "3600"))
+
+
+def render_json(content: Any) -> bytes:
+    # Same bytes FastAPI would send for `content`
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def canonical_payload(payload: Any) -> str:
+    """Stable text form of a request body: field order and whitespace don't matter"""
+    if hasattr(payload, "model_dump"):
+        payload = payload.model_dump(mode="json")
+    elif hasattr(payload, "dict"):
+        payload = jsonable_encoder(payload)
+    return json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+
+
+class ResponseCache:
+    """In-process LRU with a TTL for rendered JSON responses.
+
+    Keys include the versions of everything the response depends on (dataset, model,
+    recommender), so a reload makes older entries unreachable; they age out through LRU/TTL.
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, ttl_s: float = RESPONSE_CACHE_TTL_S):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        # key -> (monotonic expiry, rendered body), least recently used first
+        self._entries = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            expires_at, body = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self._expirations += 1
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return body
+
+    def put(self, key: Hashable, body: bytes) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_s, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def respond(self, key: Hashable, compute: Callable[[], Any]) -> Response:
+        """Cached JSON response for `key`, calling `compute` on a miss.
+
+        Exceptions from `compute` propagate and nothing is stored.
+        """
+        body = self.get(key)
+        if body is None:
+            body = render_json(compute())
+            self.put(key, body)
+        return Response(content=body, media_type="application/json")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            hits, misses = self._hits, self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_s,
+                "hits": hits,
+                "misses": misses,
+                "hit_ratio": hits / (hits + misses) if hits + misses else None,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+            }
+
+
+class StaticJSON:
+    """A constant JSON document rendered once and served with an ETag, answering
+    If-None-Match revalidations with 304."""
+
+    def __init__(self, content: Any, max_age_s: int = STATIC_MAX_AGE_S):
+        self.body = render_json(content)
+        self.etag = '"' + hashlib.sha256(self.body).hexdigest()[:32] + '"'
+        self.headers = {"ETag": self.etag, "Cache-Control": f"public, max-age={max_age_s}"}
+
+    def _matches(self, if_none_match: str) -> bool:
+        if if_none_match.strip() == "*":
+            return True
+        # Weak comparison, as RFC 9110 requires for If-None-Match
+        tags = (t.strip() for t in if_none_match.split(","))
+        return any(t[2:] == self.etag if t.startswith("W/") else t == self.etag for t in tags)
+
+    def response(self, request: Request) -> Response:
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and self._matches(if_none_match):
+            return Response(status_code=304, headers=self.headers)
+        return Response(content=self.body, media_type="application/json", headers=self.headers)
@@ -1,8 +1,9 @@
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import threading
 from dotenv import load_dotenv
 
+from .metrics import instrument_engine
+
 
 load_dotenv()
 
@@ -18,16 +19,34 @@ if not SQLALCHEMY_DATABASE_URL:
     SQLITE_PATH = os.getenv("SQLITE_PATH", str((os.path.dirname(__file__) + "/../zerith.db")))
     SQLALCHEMY_DATABASE_URL = f"sqlite+pysqlite:///{os.path.abspath(SQLITE_PATH)}"
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    pool_pre_ping=True,
-    connect_args={"check_same_thread": False} if SQLALCHEMY_DATABASE_URL.startswith("sqlite") else {},
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
+IS_SQLITE = SQLALCHEMY_DATABASE_URL.startswith("sqlite")
+
+# Connection pool sizing (MySQL, and the SQLite reader pool)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT_S = float(os.getenv("DB_POOL_TIMEOUT_S", "30"))
+DB_POOL_RECYCLE_S = int(os.getenv("DB_POOL_RECYCLE_S", "1800"))
+# SQLite tuning applied to every new connection
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_BYTES = int(os.getenv("SQLITE_MMAP_BYTES", str(256 * 1024 * 1024)))
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+
+
+def _sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    # WAL lets readers proceed while a write is in progress; with WAL, synchronous=NORMAL only
+    # risks the last commits on power loss, never corruption
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_BYTES}")
+    finally:
+        cursor.close()
 
 
 def get_session():
+    setup()
     db = SessionLocal()
     try:
         yield db
@@ -35,3 +54,158 @@ def get_session():
         db.close()
 
 
+def async_database_url(url: str) -> str:
+    """Same database through an asyncio driver: aiosqlite for SQLite, aiomysql for MySQL"""
+    override = os.getenv("ASYNC_DATABASE_URL")
+    if override:
+        return override
+    scheme, rest = url.split("://", 1)
+    if scheme.startswith("sqlite"):
+        return f"sqlite+aiosqlite://{rest}"
+    if scheme.startswith("mysql"):
+        return f"mysql+aiomysql://{rest}"
+    return url
+
+
+ASYNC_DATABASE_URL = async_database_url(SQLALCHEMY_DATABASE_URL)
+
+# Engines, sessionmakers and Base are built by setup() on first use (module __getattr__ below):
+# SQLAlchemy alone is ~0.4 s of import time, which startup pays instead of every `import app.main`
+_LAZY_NAMES = ("engine", "SessionLocal", "Base", "async_write_engine", "async_read_engine",
+               "AsyncWriteSession", "AsyncReadSession")
+_setup_lock = threading.Lock()
+_ready = False
+
+
+def setup() -> None:
+    """Create the engines and sessionmakers; idempotent and thread-safe"""
+    global _ready, engine, SessionLocal, Base, async_write_engine, async_read_engine
+    global AsyncWriteSession, AsyncReadSession
+    if _ready:
+        return
+    with _setup_lock:
+        if _ready:
+            return
+        from sqlalchemy import create_engine, event
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+        from sqlalchemy.orm import declarative_base, sessionmaker
+        from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+        engine = create_engine(
+            SQLALCHEMY_DATABASE_URL,
+            pool_pre_ping=True,
+            connect_args={"check_same_thread": False} if IS_SQLITE else {},
+        )
+        if IS_SQLITE:
+            event.listen(engine, "connect", _sqlite_pragmas)
+        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        Base = declarative_base()
+
+        if IS_SQLITE:
+            # SQLite allows one writer at a time: a single pooled writer connection queues writes in
+            # the app instead of contending for the file lock, while reads get their own pool and,
+            # under WAL, never wait on the writer
+            async_write_engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=AsyncAdaptedQueuePool,
+                                                     pool_size=1, max_overflow=0, pool_timeout=DB_POOL_TIMEOUT_S)
+            async_read_engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=AsyncAdaptedQueuePool,
+                                                    pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW,
+                                                    pool_timeout=DB_POOL_TIMEOUT_S)
+            event.listen(async_write_engine.sync_engine, "connect", _sqlite_pragmas)
+            event.listen(async_read_engine.sync_engine, "connect", _sqlite_pragmas)
+        else:
+            async_write_engine = create_async_engine(
+                ASYNC_DATABASE_URL,
+                pool_pre_ping=True,
+                pool_size=DB_POOL_SIZE,
+                max_overflow=DB_MAX_OVERFLOW,
+                pool_timeout=DB_POOL_TIMEOUT_S,
+                pool_recycle=DB_POOL_RECYCLE_S,
+            )
+            async_read_engine = async_write_engine
+
+        instrument_engine(engine, "sync")
+        instrument_engine(async_write_engine.sync_engine, "async_write")
+        if async_read_engine is not async_write_engine:
+            instrument_engine(async_read_engine.sync_engine, "async_read")
+
+        AsyncWriteSession = async_sessionmaker(async_write_engine, expire_on_commit=False)
+        AsyncReadSession = async_sessionmaker(async_read_engine, expire_on_commit=False)
+        _ready = True
+
+
+def __getattr__(name: str):
+    if name in _LAZY_NAMES:
+        setup()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+async def get_async_session():
+    setup()
+    async with AsyncWriteSession() as session:
+        yield session
+
+
+async def get_read_session():
+    setup()
+    async with AsyncReadSession() as session:
+        yield session
+
+
+async def dispose_async_engines() -> None:
+    if not _ready:
+        return
+    await async_write_engine.dispose()
+    if async_read_engine is not async_write_engine:
+        await async_read_engine.dispose()
+
+
+def upgrade_schema(bind=None) -> None:
+    """Add nullable columns and indexes declared on the models but missing from existing tables.
+
+    create_all() only creates absent tables; this covers what was added to tables created by an
+    older release (or by db/init.sql). An index is skipped when one with the same columns
+    already exists under another name.
+    """
+    from sqlalchemy import inspect, text
+
+    setup()
+    bind = bind or engine
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            present = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in present or not column.nullable:
+                    continue
+                ddl = column.type.compile(dialect=bind.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {ddl}"))
+            indexed = {tuple(ix["column_names"]) for ix in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if tuple(c.name for c in index.columns) not in indexed:
+                    index.create(conn, checkfirst=True)
+
+
+def init_schema(bind=None, attempts: int = 3) -> None:
+    """create_all() plus upgrade_schema(), tolerant of other workers doing the same concurrently.
+
+    With `uvicorn --workers N` every process runs startup at once; the loser of a CREATE race
+    sees "already exists" and simply re-checks.
+    """
+    from sqlalchemy.exc import OperationalError, ProgrammingError
+    # Importing the models is what declares their tables on Base.metadata
+    from . import models
+
+    setup()
+    bind = bind or engine
+    for attempt in range(attempts):
+        try:
+            models.Base.metadata.create_all(bind=bind)
+            upgrade_schema(bind)
+            return
+        except (OperationalError, ProgrammingError):
+            if attempt == attempts - 1:
+                raise
@@ -0,0 +1,286 @@
+import csv
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+NUMERIC_COLUMNS = [
+    "Year",
+    "Coal_Production_Tons",
+    "Energy_Consumption_MWh",
+    "Emission_Factor_kgCO2_perTon",
+    "Methane_Emissions_tons",
+    "Other_GHG_Emissions_tons",
+    "Total_Emissions_tCO2e",
+]
+
+# Window (rows) used for the recent compound growth rate
+CAGR_WINDOW = 5
+
+# How often (seconds) the source files are stat'ed for changes; 0 checks on every call
+DATASET_CHECK_INTERVAL_S = float(os.getenv("DATASET_CHECK_INTERVAL_S", "1.0"))
+
+
+@dataclass(frozen=True)
+class TrendStats:
+    # Values of the latest historical row
+    base_prod: float
+    base_energy: float
+    ef: float
+    ch4: float
+    other: float
+    # Compound growth over the last CAGR_WINDOW rows
+    prod_cagr: float
+    energy_cagr: float
+    # Least-squares slope (per year) over the full history
+    prod_slope: float
+    energy_slope: float
+
+
+def _interpolate_base(years: np.ndarray, prod: np.ndarray, energy: np.ndarray,
+                      year: int) -> Optional[Tuple[float, float]]:
+    if year < years[0] or year > years[-1]:
+        return None
+    idx = int(np.searchsorted(years, year))
+    if years[idx] == year:
+        return float(prod[idx]), float(energy[idx])
+    before, after = idx - 1, idx
+    w = (year - years[before]) / (years[after] - years[before])
+    return float((1 - w) * prod[before] + w * prod[after]), float((1 - w) * energy[before] + w * energy[after])
+
+
+@dataclass(frozen=True)
+class RegionHistory:
+    """Trend stats and start-year anchors of one region's rows"""
+    rows: int
+    stats: TrendStats
+    anchor_years: np.ndarray
+    anchor_prod: np.ndarray
+    anchor_energy: np.ndarray
+
+    def base_at(self, year: int) -> Optional[Tuple[float, float]]:
+        return _interpolate_base(self.anchor_years, self.anchor_prod, self.anchor_energy, year)
+
+
+@dataclass(frozen=True)
+class DatasetSnapshot:
+    path: Path
+    version: str
+    loaded_at: float
+    load_seconds: float
+    # Column arrays, stably sorted by Year
+    columns: Dict[str, np.ndarray]
+    regions: np.ndarray
+    stats: TrendStats
+    # One anchor per distinct year (first row of that year) for start-year seeding
+    anchor_years: np.ndarray
+    anchor_prod: np.ndarray
+    anchor_energy: np.ndarray
+    # The same, computed over each region's rows alone
+    by_region: Dict[str, RegionHistory] = field(default_factory=dict)
+
+    @property
+    def num_rows(self) -> int:
+        return int(self.columns["Year"].shape[0])
+
+    def base_at(self, year: int) -> Optional[Tuple[float, float]]:
+        """Production and energy at `year`, interpolated between anchors; None outside the history"""
+        return _interpolate_base(self.anchor_years, self.anchor_prod, self.anchor_energy, year)
+
+
+def _cagr(first: float, last: float, years_span: int) -> float:
+    try:
+        return (max(1e-6, last) / max(1e-6, first)) ** (1.0 / years_span) - 1.0
+    except Exception:
+        return 0.0
+
+
+def _slope(x: np.ndarray, y: np.ndarray) -> float:
+    if x.shape[0] < 2:
+        return 0.0
+    dx = x - x.mean()
+    denom = float(np.dot(dx, dx))
+    if denom == 0:
+        return 0.0
+    return float(np.dot(dx, y - y.mean()) / denom)
+
+
+def compute_trend_stats(columns: Dict[str, np.ndarray]) -> TrendStats:
+    years = columns["Year"]
+    prod = columns["Coal_Production_Tons"]
+    energy = columns["Energy_Consumption_MWh"]
+    n = years.shape[0]
+
+    prod_cagr, energy_cagr = 0.0, 0.0
+    if n >= 2:
+        start = max(0, n - CAGR_WINDOW)
+        years_span = max(1, int(years[-1]) - int(years[start]))
+        prod_cagr = _cagr(float(prod[start]), float(prod[-1]), years_span)
+        energy_cagr = _cagr(float(energy[start]), float(energy[-1]), years_span)
+
+    return TrendStats(
+        base_prod=float(prod[-1]),
+        base_energy=float(energy[-1]),
+        ef=float(columns["Emission_Factor_kgCO2_perTon"][-1]),
+        ch4=float(columns["Methane_Emissions_tons"][-1]),
+        other=float(columns["Other_GHG_Emissions_tons"][-1]),
+        prod_cagr=prod_cagr,
+        energy_cagr=energy_cagr,
+        prod_slope=_slope(years, prod),
+        energy_slope=_slope(years, energy),
+    )
+
+
+def _anchors(columns: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    anchor_years, first_idx = np.unique(columns["Year"], return_index=True)
+    return (
+        anchor_years.astype(np.int64),
+        columns["Coal_Production_Tons"][first_idx],
+        columns["Energy_Consumption_MWh"][first_idx],
+    )
+
+
+def _region_histories(columns: Dict[str, np.ndarray], regions: np.ndarray) -> Dict[str, RegionHistory]:
+    histories: Dict[str, RegionHistory] = {}
+    for region in sorted(set(regions.tolist())):
+        if not region:
+            continue
+        # Boolean selection keeps the year-sorted order within the region
+        rows = regions == region
+        subset = {name: values[rows] for name, values in columns.items()}
+        anchor_years, anchor_prod, anchor_energy = _anchors(subset)
+        histories[region] = RegionHistory(
+            rows=int(rows.sum()),
+            stats=compute_trend_stats(subset),
+            anchor_years=anchor_years,
+            anchor_prod=anchor_prod,
+            anchor_energy=anchor_energy,
+        )
+    return histories
+
+
+def build_snapshot(columns: Dict[str, np.ndarray], regions: np.ndarray, path: Path, version: str,
+                   load_seconds: float = 0.0) -> DatasetSnapshot:
+    order = np.argsort(columns["Year"], kind="stable")
+    columns = {name: values[order] for name, values in columns.items()}
+    regions = regions[order]
+    anchor_years, anchor_prod, anchor_energy = _anchors(columns)
+    return DatasetSnapshot(
+        path=path,
+        version=version,
+        loaded_at=time.time(),
+        load_seconds=load_seconds,
+        columns=columns,
+        regions=regions,
+        stats=compute_trend_stats(columns),
+        anchor_years=anchor_years,
+        anchor_prod=anchor_prod,
+        anchor_energy=anchor_energy,
+        by_region=_region_histories(columns, regions),
+    )
+
+
+def read_csv_columns(path: Path) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        index = {name: i for i, name in enumerate(header)}
+        raw = list(reader)
+    if not raw:
+        raise ValueError(f"No rows in {path}")
+    columns: Dict[str, np.ndarray] = {}
+    for name in NUMERIC_COLUMNS:
+        if name not in index:
+            continue
+        i = index[name]
+        columns[name] = np.array([r[i] for r in raw], dtype=np.float64)
+    if "Region" in index:
+        i = index["Region"]
+        regions = np.array([r[i].strip().lower() for r in raw], dtype=object)
+    else:
+        regions = np.full(len(raw), "", dtype=object)
+    return columns, regions
+
+
+ColumnReader = Callable[[Path], Tuple[Dict[str, np.ndarray], np.ndarray]]
+
+
+class DatasetCache:
+    """Keeps the parsed history in memory and rebuilds it when its source changes.
+
+    `read` loads (columns, regions) from `path` (the CSV by default). Files in `watch` are part
+    of the change check too, e.g. the seed CSV of a store that `read` rebuilds from it.
+    """
+
+    def __init__(self, path: Path, check_interval_s: float = DATASET_CHECK_INTERVAL_S,
+                 read: ColumnReader = read_csv_columns, watch: Sequence[Path] = ()):
+        self.path = Path(path)
+        self.check_interval_s = check_interval_s
+        self.read = read
+        self.watch = [Path(p) for p in watch]
+        self._lock = threading.Lock()
+        self._snapshot: Optional[DatasetSnapshot] = None
+        self._signature: Optional[Tuple] = None
+        self._checked_at = 0.0
+        self._last_error: Optional[str] = None
+
+    def get(self) -> Optional[DatasetSnapshot]:
+        if time.monotonic() - self._checked_at < self.check_interval_s:
+            return self._snapshot
+        return self._refresh()
+
+    def _stat_signature(self) -> Optional[Tuple]:
+        parts = []
+        for path in [self.path] + self.watch:
+            try:
+                st = os.stat(path)
+                parts.append((st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                parts.append(None)
+        return tuple(parts) if any(parts) else None
+
+    def _refresh(self) -> Optional[DatasetSnapshot]:
+        signature = self._stat_signature()
+
+        with self._lock:
+            self._checked_at = time.monotonic()
+            if signature == self._signature:
+                return self._snapshot
+            snapshot = None
+            if signature is not None:
+                try:
+                    started = time.perf_counter()
+                    columns, regions = self.read(self.path)
+                    snapshot = build_snapshot(
+                        columns,
+                        regions,
+                        path=self.path,
+                        version="-".join(f"{p[0]:x}-{p[1]:x}" if p else "0" for p in signature),
+                        load_seconds=time.perf_counter() - started,
+                    )
+                    self._last_error = None
+                except Exception as e:
+                    # Keep serving the last good snapshot; the signature stays stale so the next
+                    # check reads again (the file may be mid-write)
+                    self._last_error = f"{type(e).__name__}: {e}"
+                    return self._snapshot
+            self._signature = signature
+            self._snapshot = snapshot
+            return snapshot
+
+    def stats(self) -> Dict:
+        snapshot = self._snapshot
+        return {
+            "path": str(self.path),
+            "loaded": snapshot is not None,
+            "version": snapshot.version if snapshot else None,
+            "rows": snapshot.num_rows if snapshot else 0,
+            "regions": sorted(snapshot.by_region) if snapshot else [],
+            "load_seconds": snapshot.load_seconds if snapshot else None,
+            "last_error": self._last_error,
+        }
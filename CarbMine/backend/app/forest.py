@@ -0,0 +1,148 @@
+import os
+import struct
+import zipfile
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+
+# Versions of the array layout written by ml/export_forest.py that this module reads
+FORMAT_VERSIONS = (1, 2)
+# Map the artifact read-only instead of copying it, so every worker on the host shares the same
+# page-cache pages; set MODEL_MMAP=0 to load private copies
+MODEL_MMAP = os.getenv("MODEL_MMAP", "1") not in ("0", "false", "no")
+# Rows traversed per block; bounds the (rows, trees) index matrices
+PREDICT_BLOCK_ROWS = 1024
+# Traversal steps between "all rows at a leaf?" checks
+_EARLY_EXIT_EVERY = 4
+
+
+class CompactForest:
+    """Single-threaded evaluator for a random forest flattened by ml/export_forest.py.
+
+    Every (row, tree) pair walks down its tree in lock-step: one gather per level over a
+    (rows, trees) matrix of node indices. Leaves point at themselves, so pairs that finish early
+    simply stay put.
+    """
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, children: np.ndarray,
+                 value: np.ndarray, roots: np.ndarray, max_depth: int, feature_names: Iterable[str] = ()):
+        self.feature = feature
+        self.threshold = threshold
+        # children[2 * node + went_right]: one gather per step instead of two plus a select
+        self.children = children
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        names = [str(n) for n in feature_names]
+        self.feature_names_in_: Optional[np.ndarray] = np.array(names, dtype=object) if names else None
+        self.n_features_in_ = len(names) if names else int(feature.max()) + 1
+
+    @property
+    def n_estimators(self) -> int:
+        return int(self.roots.shape[0])
+
+    @property
+    def node_count(self) -> int:
+        return int(self.value.shape[0])
+
+    def _leaves(self, X: np.ndarray) -> np.ndarray:
+        n_rows, n_features = X.shape
+        flat_x = np.ascontiguousarray(X).ravel()
+        # Offset of each row in flat_x, broadcast across trees
+        row_base = (np.arange(n_rows, dtype=np.int64) * n_features)[:, None]
+        node = np.tile(self.roots.astype(np.int64, copy=False), (n_rows, 1))
+        for step in range(self.max_depth):
+            x = flat_x.take(row_base + self.feature.take(node))
+            went_right = x > self.threshold.take(node)
+            node = self.children.take(2 * node + went_right)
+            if step % _EARLY_EXIT_EVERY == _EARLY_EXIT_EVERY - 1 and (self.children.take(2 * node) == node).all():
+                break
+        return node
+
+    def predict(self, X) -> np.ndarray:
+        # sklearn evaluates trees on float32 inputs; thresholds were exported to match
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"expected a 2-D array with {self.n_features_in_} features")
+        out = np.empty(X.shape[0], dtype=np.float64)
+        for start in range(0, X.shape[0], PREDICT_BLOCK_ROWS):
+            block = X[start:start + PREDICT_BLOCK_ROWS]
+            out[start:start + block.shape[0]] = self.value.take(self._leaves(block)).mean(axis=1)
+        return out
+
+
+def _read_npz(path: Path) -> Dict[str, np.ndarray]:
+    with np.load(path, allow_pickle=False) as data:
+        return {name: data[name] for name in data.files}
+
+
+def _mmap_npz(path: Path) -> Dict[str, np.ndarray]:
+    """Arrays of an uncompressed .npz as read-only views onto a memory map of the file.
+
+    np.savez stores members uncompressed, so each .npy payload sits contiguously in the zip at a
+    fixed offset; np.load has no mmap mode for archives, hence the manual lookup.
+    """
+    arrays: Dict[str, np.ndarray] = {}
+    with zipfile.ZipFile(path) as zf, open(path, "rb") as f:
+        for info in zf.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"{info.filename} is compressed and cannot be memory-mapped")
+            # Local file header: 30 fixed bytes, then the name and extra field
+            f.seek(info.header_offset)
+            name_len, extra_len = struct.unpack("<HH", f.read(30)[26:30])
+            f.seek(info.header_offset + 30 + name_len + extra_len)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+            name = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+            if dtype.hasobject:
+                raise ValueError(f"{name} holds Python objects")
+            count = int(np.prod(shape))
+            if shape == () or count == 0:
+                # Scalars and empties: not worth a mapping
+                arrays[name] = np.frombuffer(f.read(dtype.itemsize * count), dtype=dtype).reshape(shape)
+                continue
+            mapped = np.memmap(path, dtype=dtype, mode="r", offset=f.tell(), shape=shape,
+                               order="F" if fortran else "C")
+            # Plain ndarray view of the same pages; avoids memmap subclass overhead on every take()
+            array = np.asarray(mapped)
+            if not array.flags.aligned:
+                # Exports before alignment padding: misaligned arrays take numpy's slow buffered
+                # paths and allocate on every call, so keep a private aligned copy instead
+                array = np.array(array)
+            arrays[name] = array
+    return arrays
+
+
+def compact_source_sha256(path: Path) -> Optional[str]:
+    """SHA-256 of the pickle the export at `path` was made from; None for exports that predate it.
+    Reads only that member of the archive."""
+    with np.load(path, allow_pickle=False) as data:
+        if "source_sha256" not in data.files:
+            return None
+        return str(data["source_sha256"])
+
+
+def load_compact_forest(path: Path, mmap: bool = MODEL_MMAP) -> CompactForest:
+    data = _mmap_npz(path) if mmap else _read_npz(path)
+    version = int(data["format_version"])
+    if version not in FORMAT_VERSIONS:
+        raise ValueError(f"unsupported compact forest format {version}")
+    if "children" in data:
+        children = data["children"]
+    else:
+        # Format 1 stored left/right separately
+        children = np.stack([data["left"], data["right"]], axis=1).astype(np.int64).ravel()
+    return CompactForest(
+        feature=data["feature"],
+        threshold=data["threshold"],
+        children=children,
+        value=data["value"],
+        roots=data["roots"],
+        max_depth=int(data["max_depth"]),
+        feature_names=[str(n) for n in data["feature_names"]],
+    )
@@ -0,0 +1,445 @@
+import ast
+import json
+import os
+import re
+import sqlite3
+import subprocess
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+# Queue database and job inputs (e.g. uploaded CSVs for ingestion)
+JOBS_DIR = Path(os.getenv("JOBS_DIR", str(Path(__file__).resolve().parents[1] / "jobs")))
+JOBS_DB_PATH = JOBS_DIR / "jobs.sqlite3"
+# Files jobs read, e.g. CSVs uploaded to /jobs/ingest, named by content hash
+JOBS_INPUT_DIR = JOBS_DIR / "inputs"
+# Required (as X-Jobs-Token) to queue training and ingestion; those endpoints refuse while unset
+JOBS_ADMIN_TOKEN = os.getenv("JOBS_ADMIN_TOKEN", "")
+# Jobs run concurrently by each API process; 0 leaves the queue to other processes
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "1"))
+# Idle workers look for jobs enqueued by other processes this often
+JOB_POLL_INTERVAL_S = float(os.getenv("JOB_POLL_INTERVAL_S", "1.0"))
+# A running job whose heartbeat is older than this lost its process and is requeued
+JOB_STALE_AFTER_S = float(os.getenv("JOB_STALE_AFTER_S", "60"))
+# Runs of a job (including requeues after a lost process) before it is marked failed
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    args TEXT NOT NULL,
+    dedupe_key TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    heartbeat_at REAL
+);
+-- At most one queued/running job per key, whichever process enqueues it
+CREATE UNIQUE INDEX IF NOT EXISTS ux_jobs_active_key ON jobs (dedupe_key) WHERE status IN ('queued', 'running');
+CREATE INDEX IF NOT EXISTS ix_jobs_status_created ON jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS ix_jobs_key_created ON jobs (dedupe_key, created_at);
+"""
+
+# handler(args, progress) -> JSON-serialisable result; progress(fraction, message) reports back,
+# None leaving either unchanged
+Progress = Callable[[Optional[float], Optional[str]], None]
+Handler = Callable[[Dict[str, Any], Progress], Any]
+# cleanup(args) once a job has succeeded or failed for good, e.g. to delete its staged input
+Cleanup = Callable[[Dict[str, Any]], None]
+
+
+def _iso(ts: Optional[float]) -> Optional[str]:
+    if ts is None:
+        return None
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat()
+
+
+@dataclass(frozen=True)
+class Job:
+    id: str
+    kind: str
+    args: Dict[str, Any]
+    status: str
+    progress: float
+    message: Optional[str]
+    result: Any
+    error: Optional[str]
+    attempts: int
+    created_at: float
+    started_at: Optional[float]
+    finished_at: Optional[float]
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> "Job":
+        return cls(
+            id=row["id"],
+            kind=row["kind"],
+            args=json.loads(row["args"]),
+            status=row["status"],
+            progress=row["progress"],
+            message=row["message"],
+            result=json.loads(row["result"]) if row["result"] is not None else None,
+            error=row["error"],
+            attempts=row["attempts"],
+            created_at=row["created_at"],
+            started_at=row["started_at"],
+            finished_at=row["finished_at"],
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "args": self.args,
+            "status": self.status,
+            "progress": self.progress,
+            "message": self.message,
+            "result": self.result,
+            "error": self.error,
+            "attempts": self.attempts,
+            "created_at": _iso(self.created_at),
+            "started_at": _iso(self.started_at),
+            "finished_at": _iso(self.finished_at),
+        }
+
+
+class JobQueue:
+    """Durable job queue in a local SQLite file, worked by a bounded pool of threads.
+
+    Every API process opens the same file, so a job is enqueued once however many workers ask
+    for it (identical kind and args share a job while it is queued or running) and is claimed by
+    exactly one of them. Jobs survive restarts: queued jobs wait in the table, and running jobs
+    whose process died stop heartbeating and are requeued.
+    """
+
+    def __init__(self, path: Path, handlers: Dict[str, Handler], workers: int = JOB_WORKERS,
+                 poll_interval_s: float = JOB_POLL_INTERVAL_S, stale_after_s: float = JOB_STALE_AFTER_S,
+                 max_attempts: int = JOB_MAX_ATTEMPTS, cleanup: Optional[Dict[str, Cleanup]] = None):
+        self.path = Path(path)
+        self.handlers = dict(handlers)
+        self.cleanup = dict(cleanup or {})
+        self.workers = workers
+        self.poll_interval_s = poll_interval_s
+        self.stale_after_s = stale_after_s
+        self.max_attempts = max_attempts
+        self.worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._running: Dict[str, float] = {}
+        self._schema_ready = False
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # One short-lived connection per operation: cheap for SQLite and safe across threads
+        if not self._schema_ready:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            if not self._schema_ready:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+                self._schema_ready = True
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._connect() as conn:
+            # Take the write lock up front so read-then-write sequences are atomic across processes
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def enqueue(self, kind: str, args: Optional[Dict[str, Any]] = None, cooldown_s: float = 0.0,
+                key_args: Optional[Dict[str, Any]] = None) -> Tuple[Job, bool]:
+        """Queue a job unless an identical one is queued or running; returns (job, created).
+
+        Jobs are identical when their kind and `key_args` (by default, all of `args`) are. With
+        `cooldown_s`, an identical job that failed less than that many seconds ago is returned
+        instead of queuing a retry.
+        """
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        args_json = json.dumps(args or {}, sort_keys=True, separators=(",", ":"))
+        if key_args is None:
+            key = f"{kind}:{args_json}"
+        else:
+            key = f"{kind}:{json.dumps(key_args, sort_keys=True, separators=(',', ':'))}"
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE dedupe_key = ? ORDER BY created_at DESC LIMIT 1", (key,)
+            ).fetchone()
+            if row is not None and (
+                row["status"] in ACTIVE_STATUSES
+                or (row["status"] == FAILED and cooldown_s > 0 and now - (row["finished_at"] or 0) < cooldown_s)
+            ):
+                return Job.from_row(row), False
+            job_id = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO jobs (id, kind, args, dedupe_key, status, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, kind, args_json, key, QUEUED, now),
+            )
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        self._wake.set()
+        return Job.from_row(row), True
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job.from_row(row) if row is not None else None
+
+    def recent(self, status: Optional[str] = None, limit: int = 50) -> List[Job]:
+        """Most recent jobs first"""
+        query, params = "SELECT * FROM jobs", []
+        if status:
+            query += " WHERE status = ?"
+            params.append(status)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        with self._connect() as conn:
+            return [Job.from_row(row) for row in conn.execute(query, params)]
+
+    def recover_stale(self) -> int:
+        """Requeue running jobs whose process stopped heartbeating (or fail them past max attempts)"""
+        cutoff = time.time() - self.stale_after_s
+        with self._transaction() as conn:
+            lost = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'running' AND heartbeat_at < ? AND attempts >= ?",
+                (cutoff, self.max_attempts),
+            ).fetchall()
+            result = conn.execute(
+                """
+                UPDATE jobs SET
+                    status = CASE WHEN attempts >= :max_attempts THEN 'failed' ELSE 'queued' END,
+                    error = CASE WHEN attempts >= :max_attempts THEN 'worker lost' ELSE error END,
+                    finished_at = CASE WHEN attempts >= :max_attempts THEN :now ELSE NULL END,
+                    worker = NULL
+                WHERE status = 'running' AND heartbeat_at < :cutoff
+                """,
+                {"max_attempts": self.max_attempts, "now": time.time(), "cutoff": cutoff},
+            )
+        for row in lost:
+            self._finished(Job.from_row(row))
+        return result.rowcount
+
+    def claim(self) -> Optional[Job]:
+        """Mark the oldest queued job as running in this process and return it"""
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                """
+                UPDATE jobs SET status = 'running', attempts = attempts + 1, worker = ?,
+                    started_at = ?, heartbeat_at = ?, progress = 0, message = NULL, error = NULL
+                WHERE id = ?
+                """,
+                (self.worker_id, now, now, row["id"]),
+            )
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+        with self._lock:
+            self._running[row["id"]] = now
+        return Job.from_row(row)
+
+    def _update(self, job_id: str, sql: str, params: Sequence) -> bool:
+        # Only while this process still owns the job; it may have been requeued as stale
+        with self._connect() as conn:
+            result = conn.execute(f"UPDATE jobs SET {sql} WHERE id = ? AND worker = ? AND status = 'running'",
+                                  (*params, job_id, self.worker_id))
+        return result.rowcount > 0
+
+    def _finished(self, job: Job) -> None:
+        cleanup = self.cleanup.get(job.kind)
+        if cleanup is None:
+            return
+        try:
+            cleanup(job.args)
+        except Exception:
+            # Best effort: the job's outcome is already recorded
+            pass
+
+    def _progress(self, job_id: str) -> Progress:
+        def report(fraction: Optional[float], message: Optional[str] = None) -> None:
+            if fraction is not None:
+                fraction = max(0.0, min(1.0, float(fraction)))
+            self._update(job_id, "progress = COALESCE(?, progress), message = COALESCE(?, message), heartbeat_at = ?",
+                         (fraction, message, time.time()))
+        return report
+
+    def run(self, job: Job) -> None:
+        finished = False
+        try:
+            result = self.handlers[job.kind](job.args, self._progress(job.id))
+        except Exception as e:
+            if self._stop.is_set():
+                # Interrupted by shutdown: back to the queue for the next process to pick up
+                self._update(job.id, "status = 'queued', worker = NULL", ())
+            else:
+                finished = self._update(job.id, "status = 'failed', error = ?, finished_at = ?",
+                                        (f"{type(e).__name__}: {e}", time.time()))
+        else:
+            finished = self._update(job.id, "status = 'succeeded', progress = 1, result = ?, finished_at = ?",
+                                    (json.dumps(result, default=str), time.time()))
+        finally:
+            with self._lock:
+                self._running.pop(job.id, None)
+        # Not when the job went back to the queue (shutdown, or requeued as stale): it runs again
+        if finished:
+            self._finished(job)
+
+    def run_pending(self) -> int:
+        """Run queued jobs in the calling thread until none are left; returns how many ran"""
+        count = 0
+        while not self._stop.is_set():
+            job = self.claim()
+            if job is None:
+                break
+            self.run(job)
+            count += 1
+        return count
+
+    def _work(self) -> None:
+        while not self._stop.is_set():
+            try:
+                ran = self.run_pending()
+            except sqlite3.Error:
+                ran = 0
+            if not ran:
+                self._wake.wait(self.poll_interval_s)
+                self._wake.clear()
+
+    def _heartbeat(self) -> None:
+        # Long handlers (subprocesses) may not report progress; keep their jobs from looking
+        # orphaned, and pick up jobs orphaned by other processes
+        while True:
+            try:
+                with self._lock:
+                    job_ids = list(self._running)
+                for job_id in job_ids:
+                    self._update(job_id, "heartbeat_at = ?", (time.time(),))
+                if self.recover_stale():
+                    self._wake.set()
+            except sqlite3.Error:
+                pass
+            if self._stop.wait(self.stale_after_s / 4):
+                break
+
+    def start(self) -> None:
+        if self._threads or self.workers <= 0:
+            return
+        self._stop.clear()
+        self._threads = [threading.Thread(target=self._heartbeat, name="jobs-heartbeat", daemon=True)]
+        self._threads += [
+            threading.Thread(target=self._work, name=f"jobs-worker-{i}", daemon=True) for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout_s: float = 5.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        terminate_processes()
+        for thread in self._threads:
+            thread.join(timeout_s)
+        self._threads = []
+
+    def stats(self) -> Dict:
+        try:
+            with self._connect() as conn:
+                counts = {row["status"]: row["n"] for row in
+                          conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status")}
+        except sqlite3.Error as e:
+            counts = {"error": f"{type(e).__name__}: {e}"}
+        with self._lock:
+            running_here = len(self._running)
+        return {
+            "path": str(self.path),
+            "workers": self.workers if self._threads else 0,
+            "running_in_process": running_here,
+            "jobs": counts,
+        }
+
+
+# Child processes started by run_process, terminated when the queue stops
+_children: "set[subprocess.Popen]" = set()
+_children_lock = threading.Lock()
+# Output lines kept for the result/error of a process
+_OUTPUT_TAIL_LINES = 20
+# "progress <fraction> <message>" output lines (train.report_progress in ml/) mark a stage
+_PROGRESS_LINE = re.compile(r"progress (\d+(?:\.\d+)?) (.*)")
+
+
+def run_process(argv: Sequence[str], progress: Progress, cwd: Optional[Path] = None) -> Dict[str, Any]:
+    """Run a command as a job step, relaying each output line as the job's progress message and
+    stage markers (see _PROGRESS_LINE) as its progress fraction.
+
+    The result holds the last output line (parsed when it is a Python/JSON literal, as the ml/
+    scripts print their summaries); a non-zero exit raises with the tail of the output.
+    """
+    progress(0.0, f"started {Path(argv[1]).name if len(argv) > 1 else argv[0]}")
+    # Unbuffered, so lines arrive as they are printed rather than when the process exits
+    proc = subprocess.Popen(list(argv), cwd=str(cwd) if cwd else None, stdout=subprocess.PIPE,
+                            stderr=subprocess.STDOUT, text=True, env={**os.environ, "PYTHONUNBUFFERED": "1"})
+    with _children_lock:
+        _children.add(proc)
+    tail: "deque[str]" = deque(maxlen=_OUTPUT_TAIL_LINES)
+    try:
+        for line in proc.stdout:
+            line = line.rstrip()
+            if line:
+                tail.append(line)
+                stage = _PROGRESS_LINE.fullmatch(line)
+                if stage is not None:
+                    progress(float(stage.group(1)), stage.group(2)[:500])
+                else:
+                    progress(None, line[:500])
+        returncode = proc.wait()
+    finally:
+        with _children_lock:
+            _children.discard(proc)
+    if returncode != 0:
+        raise RuntimeError(f"exit code {returncode}: " + "\n".join(tail))
+    summary: Any = tail[-1] if tail else None
+    if summary is not None:
+        try:
+            summary = ast.literal_eval(summary)
+        except (ValueError, SyntaxError):
+            pass
+    return {"returncode": returncode, "summary": summary}
+
+
+def terminate_processes() -> None:
+    with _children_lock:
+        children = list(_children)
+    for proc in children:
+        proc.terminate()
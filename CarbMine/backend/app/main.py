@@ -1,23 +1,38 @@
-from fastapi import FastAPI, Depends, UploadFile, File, HTTPException, Query, Request
+from fastapi import FastAPI, Depends, UploadFile, File, HTTPException, Query, Request, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel, Field
+from fastapi.responses import FileResponse, JSONResponse, Response
+from pydantic import BaseModel, Field, ValidationError
+from starlette.concurrency import run_in_threadpool
 from typing import List, Optional
 from pathlib import Path
 import os
+import hmac
 import json
-import joblib
+import shutil
+import uuid
+import numpy as np
 
-from .database import get_session, Base, engine
+from .database import get_async_session, get_read_session, dispose_async_engines, init_schema
 from .schemas import StrategyOut, PdfReportOut, RecommendationOut, RecommendationRequest
-from .models import PdfReport
 from .services import estimate_ipcc_emissions, load_or_train_model, predict_years
 from .services import heuristic_predict_years, legacy_calculate_emissions, legacy_neutralise
 from .services import generate_recommendations, get_indian_regional_emission_factor, classify_indian_emission_level
-from .storage import store_pdf_and_metadata
+from .services import get_model_registry, get_dataset_cache, get_recommender, get_job_queue, get_warmup
+from .services import ForecastScenario, predict_batch, heuristic_predict_batch
+from .services import forecast_regions, regional_scenarios, sum_series
+from .services import estimate_ipcc_emissions_batch, data_versions, query_history
+from .cache import ResponseCache, StaticJSON, canonical_payload
+from .bulk import iter_csv_chunks, float_column, text_column, stream_legacy_calculations, DuplexStreamingResponse
+from .uploads import UploadLimitMiddleware, UploadsStaticFiles, LOCAL_STORAGE_DIR, blob_relpath
+from .uploads import save_upload, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from .jobs import JOBS_ADMIN_TOKEN, JOBS_INPUT_DIR
+from .metrics import CONTENT_TYPE, FORECAST_FALLBACKS, REGISTRY, MetricsMiddleware, forecast_fallback_reason
+from .profiling import ARTIFACT_TYPES, PROFILER, ProfiledRoute, ProfilingMiddleware
 
 
 app = FastAPI(title="Zerith API", version="1.0.0")
+# Set before any route is declared; a no-op wrapper unless a request is being profiled
+app.router.route_class = ProfiledRoute
 
 app.add_middleware(
     CORSMiddleware,
@@ -25,7 +40,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Profile-Id"],
 )
+app.add_middleware(UploadLimitMiddleware)
+app.add_middleware(ProfilingMiddleware)
+# Outermost, so rejected uploads and CORS preflights are timed too
+app.add_middleware(MetricsMiddleware)
 
 
 class EstimateRequest(BaseModel):
@@ -47,21 +67,86 @@ class IndianEstimateRequest(BaseModel):
     region: str = Field(..., description="Indian coal mining region: jharkhand, chhattisgarh, odisha, west_bengal")
 
 
+class EstimateBatchRequest(BaseModel):
+    # Column arrays, one entry per mine-year
+    year: List[int]
+    coal_production_tons: List[float]
+    energy_consumption_mwh: List[float]
+    methane_emissions_tons: Optional[List[float]] = None
+    other_ghg_emissions_tons: Optional[List[float]] = None
+    # Explicit factor per row; null entries use the row's regional factor
+    emission_factor_kgco2_perton: Optional[List[Optional[float]]] = None
+    region: Optional[List[Optional[str]]] = None
+
+
+# Upper bound on mine-year rows per /estimate_emissions/batch call
+MAX_ESTIMATE_BATCH_ROWS = int(os.getenv("ESTIMATE_BATCH_MAX_ROWS", "200000"))
+ESTIMATE_CSV_REQUIRED = ["year", "coal_production_tons", "energy_consumption_mwh"]
+
+
 class PredictRequest(BaseModel):
     start_year: int = Field(..., ge=2000, le=2100)
     end_year: int = Field(..., ge=2000, le=2100)
     coal_production_tons: Optional[float] = Field(None, ge=0)
     energy_consumption_mwh: Optional[float] = Field(None, ge=0)
+    # A region of the dataset, or "all" for every regional series plus their total
+    region: Optional[str] = Field(None, max_length=64)
+
+
+# Upper bound on scenarios per /predict_emissions/batch call
+MAX_BATCH_SCENARIOS = int(os.getenv("PREDICT_BATCH_MAX_SCENARIOS", "1000"))
+
+
+class BatchPredictRequest(BaseModel):
+    # Each entry has the shape of PredictRequest; entries are validated one by one so a bad
+    # scenario is reported in its own result instead of rejecting the whole batch
+    scenarios: List[dict]
 
 
 @app.on_event("startup")
 def on_startup() -> None:
-    Base.metadata.create_all(bind=engine)
-    # Model is optional at runtime; fallback heuristics will be used if missing
+    # First use of the database layer: SQLAlchemy is imported here rather than with app.main
+    init_schema()
+    # Model is optional at runtime; fallback heuristics will be used if missing, while a
+    # background job trains one
+    get_job_queue().start()
+    # Model, dataset and strategy catalogue load off the request path; see /ready
+    get_warmup().start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    # Pooled async connections belong to this event loop
+    await dispose_async_engines()
+    # Interrupted jobs go back to the queue
+    await run_in_threadpool(get_job_queue().stop)
+
 # Serve uploaded PDFs as static files
-STORAGE_DIR = Path(__file__).resolve().parents[1] / "storage"
-STORAGE_DIR.mkdir(parents=True, exist_ok=True)
-app.mount("/uploads", StaticFiles(directory=str(STORAGE_DIR)), name="uploads")
+STORAGE_DIR = LOCAL_STORAGE_DIR
+app.mount("/uploads", UploadsStaticFiles(directory=str(STORAGE_DIR)), name="uploads")
+
+# Rendered responses of the deterministic compute endpoints (/predict_emissions,
+# /recommend_strategies, /estimate_indian)
+response_cache = ResponseCache()
+
+
+def _cache_counts():
+    stats = response_cache.stats()
+    return [(("hit",), stats["hits"]), (("miss",), stats["misses"])]
+
+
+def _model_loaded():
+    return [((), 1.0 if get_model_registry().current() is not None else 0.0)]
+
+
+REGISTRY.collected("zerith_response_cache_requests_total", "Response cache lookups by result",
+                   "counter", _cache_counts, ("result",))
+REGISTRY.collected("zerith_response_cache_hit_ratio", "Response cache hits over lookups since start",
+                   "gauge", lambda: [((), response_cache.stats()["hit_ratio"])])
+REGISTRY.collected("zerith_response_cache_entries", "Responses currently cached",
+                   "gauge", lambda: [((), response_cache.stats()["entries"])])
+REGISTRY.collected("zerith_model_loaded", "1 while a forecast model is loaded, 0 while the heuristic serves",
+                   "gauge", _model_loaded)
 
 
 
@@ -70,6 +155,68 @@ def health() -> dict:
     return {"status": "ok", "service": "zerith-backend"}
 
 
+@app.get("/status")
+def status() -> dict:
+    """Report what the process currently has cached (model, dataset, recommender) and load timings"""
+    return {
+        "model": get_model_registry().stats(),
+        "dataset": get_dataset_cache().stats(),
+        "recommender": get_recommender().stats(),
+        "response_cache": response_cache.stats(),
+        "jobs": get_job_queue().stats(),
+        "warmup": get_warmup().stats(),
+    }
+
+
+@app.get("/ready")
+def ready() -> JSONResponse:
+    """200 once the startup warm-up has run (see app/warmup.py), 503 until then; for readiness probes"""
+    stats = get_warmup().stats()
+    return JSONResponse(stats, status_code=200 if stats["ready"] else 503)
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics() -> Response:
+    """Process-local metrics in the Prometheus text format (each uvicorn worker serves its own)"""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+def _require_profiling(token: Optional[str]) -> None:
+    if not PROFILER.enabled:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    if not PROFILER.token:
+        # Reports expose code paths and request timings: never serve them unauthenticated
+        raise HTTPException(status_code=403, detail="Set PROFILE_ADMIN_TOKEN to read profiles")
+    if not PROFILER.authorized(token):
+        raise HTTPException(status_code=401, detail="Invalid or missing X-Profile-Token")
+
+
+@app.get("/admin/profiles", include_in_schema=False)
+def list_profiles(x_profile_token: Optional[str] = Header(None)) -> dict:
+    """Stored request profiles, newest first (see app/profiling.py)"""
+    _require_profiling(x_profile_token)
+    return {"profiles": PROFILER.store.list()}
+
+
+@app.get("/admin/profiles/{profile_id}", include_in_schema=False)
+def get_profile(profile_id: str, x_profile_token: Optional[str] = Header(None)) -> dict:
+    _require_profiling(x_profile_token)
+    report = PROFILER.store.get(profile_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return report
+
+
+@app.get("/admin/profiles/{profile_id}/{kind}", include_in_schema=False)
+def download_profile(profile_id: str, kind: str, x_profile_token: Optional[str] = Header(None)) -> FileResponse:
+    """The raw profile: `pstats` for cProfile runs, `folded` stacks for sampled ones"""
+    _require_profiling(x_profile_token)
+    path = PROFILER.store.artifact(profile_id, kind)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type=ARTIFACT_TYPES[kind], filename=path.name)
+
+
 @app.post("/estimate_emissions")
 def estimate_emissions(payload: EstimateRequest) -> dict:
     total_tco2e = estimate_ipcc_emissions(
@@ -82,6 +229,52 @@ def estimate_emissions(payload: EstimateRequest) -> dict:
     return {"year": payload.year, "estimated_total_emissions_tco2e": total_tco2e}
 
 
+@app.post("/estimate_emissions/batch")
+def estimate_emissions_batch(payload: EstimateBatchRequest) -> dict:
+    if len(payload.year) > MAX_ESTIMATE_BATCH_ROWS:
+        raise HTTPException(status_code=413, detail=f"at most {MAX_ESTIMATE_BATCH_ROWS} rows per batch")
+    try:
+        return estimate_ipcc_emissions_batch(
+            year=payload.year,
+            coal_production_tons=payload.coal_production_tons,
+            energy_consumption_mwh=payload.energy_consumption_mwh,
+            methane_emissions_tons=payload.methane_emissions_tons,
+            other_ghg_emissions_tons=payload.other_ghg_emissions_tons,
+            emission_factor_kgco2_perton=payload.emission_factor_kgco2_perton,
+            region=payload.region,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/estimate_emissions/batch/csv")
+def estimate_emissions_batch_csv(file: UploadFile = File(...)) -> dict:
+    """Same as /estimate_emissions/batch for a CSV upload with one column per request field"""
+    columns: dict = {name: [] for name in [
+        "year", "coal_production_tons", "energy_consumption_mwh", "methane_emissions_tons",
+        "other_ghg_emissions_tons", "emission_factor_kgco2_perton",
+    ]}
+    regions: List[str] = []
+    try:
+        for index, rows in iter_csv_chunks(file.file):
+            missing = [c for c in ESTIMATE_CSV_REQUIRED if c not in index]
+            if missing:
+                raise ValueError(f"missing columns: {', '.join(missing)}")
+            offset = len(regions)
+            if offset + len(rows) > MAX_ESTIMATE_BATCH_ROWS:
+                raise HTTPException(status_code=413, detail=f"at most {MAX_ESTIMATE_BATCH_ROWS} rows per batch")
+            for name, parts in columns.items():
+                default = None if name in ("year", "emission_factor_kgco2_perton") else 0.0
+                parts.append(float_column(index, rows, name, default=default, row_offset=offset))
+            regions.extend(text_column(index, rows, "region"))
+        if not regions:
+            raise ValueError("CSV has no rows")
+        merged = {name: np.concatenate(parts) for name, parts in columns.items()}
+        return estimate_ipcc_emissions_batch(region=regions, **merged)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 # Backward compatibility endpoints used by existing React pages
 @app.post('/calculate')
 def calculate_legacy(payload: dict) -> dict:
@@ -91,6 +284,19 @@ def calculate_legacy(payload: dict) -> dict:
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@app.post('/calculate/stream')
+async def calculate_legacy_stream(request: Request, fmt: str = Query("ndjson", alias="format")) -> DuplexStreamingResponse:
+    """Bulk /calculate over an activity-log CSV sent as the raw request body (Content-Type: text/csv).
+
+    Columns: excavation, transportation, fuel, equipment, workers, output, fuelType, reduction.
+    Per-row results with running totals are streamed back as NDJSON (default) or CSV.
+    """
+    if fmt not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'csv'")
+    media_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    return DuplexStreamingResponse(stream_legacy_calculations(request.stream(), fmt), media_type=media_type)
+
+
 @app.post('/neutralise')
 def neutralise_legacy(payload: dict) -> dict:
     try:
@@ -103,7 +309,17 @@ def neutralise_legacy(payload: dict) -> dict:
 def predict_emissions(payload: PredictRequest) -> dict:
     if payload.end_year < payload.start_year:
         raise HTTPException(status_code=400, detail="end_year must be >= start_year")
+    try:
+        regions = forecast_regions(payload.region)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    key = ("predict_emissions", canonical_payload(payload), data_versions())
+    if regions is not None:
+        return response_cache.respond(key, lambda: _predict_regions(payload, regions))
+    return response_cache.respond(key, lambda: _predict_emissions(payload))
 
+
+def _predict_emissions(payload: PredictRequest) -> dict:
     try:
         model, feature_columns = load_or_train_model()
         preds = predict_years(
@@ -114,7 +330,8 @@ def predict_emissions(payload: PredictRequest) -> dict:
             override_production=payload.coal_production_tons,
             override_energy=payload.energy_consumption_mwh,
         )
-    except Exception:
+    except Exception as e:
+        FORECAST_FALLBACKS.inc(forecast_fallback_reason(e))
         preds = heuristic_predict_years(
             start_year=payload.start_year,
             end_year=payload.end_year,
@@ -124,45 +341,120 @@ def predict_emissions(payload: PredictRequest) -> dict:
     return {"predictions": preds}
 
 
+def _predict_regions(payload: PredictRequest, regions: List[str]) -> dict:
+    # Every region's rows go through one stacked predict call
+    scenarios = regional_scenarios(
+        payload.start_year, payload.end_year, regions,
+        payload.coal_production_tons, payload.energy_consumption_mwh,
+    )
+    try:
+        model, feature_columns = load_or_train_model()
+        series = predict_batch(model=model, feature_columns=feature_columns, scenarios=scenarios)
+    except Exception as e:
+        FORECAST_FALLBACKS.inc(forecast_fallback_reason(e))
+        series = heuristic_predict_batch(scenarios)
+    if len(regions) == 1:
+        return {"region": regions[0], "predictions": series[0]}
+    # predictions is the total over the regions, the same key a national forecast uses
+    return {"predictions": sum_series(series), "regions": dict(zip(regions, series))}
+
+
+@app.post("/predict_emissions/batch")
+def predict_emissions_batch(payload: BatchPredictRequest) -> dict:
+    if not payload.scenarios:
+        raise HTTPException(status_code=400, detail="scenarios must not be empty")
+    if len(payload.scenarios) > MAX_BATCH_SCENARIOS:
+        raise HTTPException(status_code=413, detail=f"at most {MAX_BATCH_SCENARIOS} scenarios per batch")
+
+    results: List[dict] = [{"index": i} for i in range(len(payload.scenarios))]
+    valid: List[int] = []
+    scenarios: List[ForecastScenario] = []
+    for i, raw in enumerate(payload.scenarios):
+        try:
+            req = PredictRequest(**raw)
+        except ValidationError as e:
+            results[i]["error"] = "; ".join(
+                f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+            )
+            continue
+        if req.end_year < req.start_year:
+            results[i]["error"] = "end_year must be >= start_year"
+            continue
+        try:
+            regions = forecast_regions(req.region)
+        except ValueError as e:
+            results[i]["error"] = str(e)
+            continue
+        if regions is not None and len(regions) > 1:
+            results[i]["error"] = 'region "all" is only supported by /predict_emissions'
+            continue
+        valid.append(i)
+        scenarios.append(ForecastScenario(
+            req.start_year, req.end_year, req.coal_production_tons, req.energy_consumption_mwh,
+            regions[0] if regions else None,
+        ))
+    if not valid:
+        # Nothing to forecast: no reason to load (or train) the model
+        return {"source": None, "results": results}
+
+    source = "model"
+    try:
+        model, feature_columns = load_or_train_model()
+        series = predict_batch(model=model, feature_columns=feature_columns, scenarios=scenarios)
+    except Exception as e:
+        FORECAST_FALLBACKS.inc(forecast_fallback_reason(e))
+        source = "heuristic"
+        series = heuristic_predict_batch(scenarios)
+    for i, preds in zip(valid, series):
+        results[i]["predictions"] = preds
+    return {"source": source, "results": results}
+
+
+# Constant reference data: rendered once at import and served with an ETag
+STRATEGIES = StaticJSON([
+    StrategyOut(
+        id=1,
+        name="EV Fleet Transition",
+        description="Replace diesel vehicles with EVs for onsite haulage.",
+        estimated_reduction_percent=12.0,
+    ),
+    StrategyOut(
+        id=2,
+        name="Renewable Power Purchase",
+        description="Source 40% electricity from solar/wind.",
+        estimated_reduction_percent=18.0,
+    ),
+    StrategyOut(
+        id=3,
+        name="Methane Capture",
+        description="Capture and flare methane from ventilation air and goafs.",
+        estimated_reduction_percent=10.0,
+    ),
+    StrategyOut(
+        id=4,
+        name="Process Efficiency & Electrification",
+        description="Upgrade equipment; electrify compressors and pumps.",
+        estimated_reduction_percent=8.0,
+    ),
+])
+
+
 @app.get("/get_strategies", response_model=List[StrategyOut])
-def get_strategies() -> List[StrategyOut]:
-    return [
-        StrategyOut(
-            id=1,
-            name="EV Fleet Transition",
-            description="Replace diesel vehicles with EVs for onsite haulage.",
-            estimated_reduction_percent=12.0,
-        ),
-        StrategyOut(
-            id=2,
-            name="Renewable Power Purchase",
-            description="Source 40% electricity from solar/wind.",
-            estimated_reduction_percent=18.0,
-        ),
-        StrategyOut(
-            id=3,
-            name="Methane Capture",
-            description="Capture and flare methane from ventilation air and goafs.",
-            estimated_reduction_percent=10.0,
-        ),
-        StrategyOut(
-            id=4,
-            name="Process Efficiency & Electrification",
-            description="Upgrade equipment; electrify compressors and pumps.",
-            estimated_reduction_percent=8.0,
-        ),
-    ]
+def get_strategies(request: Request) -> List[StrategyOut]:
+    return STRATEGIES.response(request)
 
 
 @app.post("/upload_pdf", response_model=PdfReportOut)
-def upload_pdf(request: Request, uid: str = Query(..., min_length=1), file: UploadFile = File(...), session=Depends(get_session)) -> PdfReportOut:
+async def upload_pdf(request: Request, uid: str = Query(..., min_length=1), file: UploadFile = File(...), session=Depends(get_async_session)) -> PdfReportOut:
     if not file.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Only PDF files are allowed")
+    from .storage import store_pdf_and_metadata
 
-    stored = store_pdf_and_metadata(uid=uid, file=file, session=session)
+    # Streams the upload to disk in chunks; oversized files are rejected with 413
+    stored = await store_pdf_and_metadata(uid=uid, file=file, session=session)
     # Replace file-system path with public URL served at /uploads
     base_url = str(request.base_url).rstrip("/")
-    public_url = f"{base_url}/uploads/{file.filename}"
+    public_url = f"{base_url}/uploads/{blob_relpath(stored.sha256)}"
     return PdfReportOut(
         id=stored.id,
         uid=stored.uid,
@@ -170,30 +462,163 @@ def upload_pdf(request: Request, uid: str = Query(..., min_length=1), file: Uplo
         url=public_url,
         size_bytes=stored.size_bytes,
         created_at=stored.created_at,
+        sha256=stored.sha256,
     )
 
 
 @app.get("/fetch_pdfs", response_model=List[PdfReportOut])
-def fetch_pdfs(request: Request, uid: str = Query(..., min_length=1), session=Depends(get_session)) -> List[PdfReportOut]:
-    rows = session.query(PdfReport).filter(PdfReport.uid == uid).order_by(PdfReport.created_at.desc()).all()
+async def fetch_pdfs(
+    request: Request,
+    uid: str = Query(..., min_length=1),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    session=Depends(get_read_session),
+):
+    """Newest reports first, one page at a time; pass the X-Next-Cursor header back as `cursor`"""
+    from .storage import fetch_report_page, report_relpath
+
+    try:
+        rows, next_cursor = await fetch_report_page(session, uid, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     base_url = str(request.base_url).rstrip("/")
-    results: List[PdfReportOut] = []
-    for r in rows:
-        public_url = f"{base_url}/uploads/{r.filename}"
-        results.append(PdfReportOut(
-            id=r.id,
-            uid=r.uid,
-            filename=r.filename,
-            url=public_url,
-            size_bytes=r.size_bytes,
-            created_at=r.created_at,
-        ))
-    return results
+    # Plain dicts straight from the column tuples; skips per-row model construction
+    results = [
+        {
+            "id": r.id,
+            "uid": r.uid,
+            "filename": r.filename,
+            "url": f"{base_url}/uploads/{report_relpath(r)}",
+            "size_bytes": r.size_bytes,
+            "created_at": r.created_at.isoformat() if r.created_at else None,
+            "sha256": r.blob_sha256,
+        }
+        for r in rows
+    ]
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return JSONResponse(results, headers=headers)
+
+
+@app.delete("/pdfs/{report_id}")
+async def delete_pdf(report_id: int, uid: str = Query(..., min_length=1), session=Depends(get_async_session)):
+    from .models import PdfReport
+    from .storage import delete_report
+
+    report = await session.get(PdfReport, report_id)
+    if report is None or report.uid != uid:
+        raise HTTPException(status_code=404, detail="Report not found")
+    sha256 = report.blob_sha256
+    blob_deleted = await delete_report(session, report)
+    return {"id": report_id, "sha256": sha256, "blob_deleted": blob_deleted}
+
+
+def _split_list(values: Optional[List[str]]) -> List[str]:
+    # Accept both repeated parameters and comma-separated lists
+    return [v.strip() for value in values or [] for v in value.split(",") if v.strip()]
+
+
+@app.get("/history")
+def history(
+    year_min: Optional[int] = Query(None),
+    year_max: Optional[int] = Query(None),
+    region: Optional[List[str]] = Query(None),
+    group_by: List[str] = Query(["year"], description="year, region, both, or empty for a single total"),
+    metric: List[str] = Query(["total_emissions_tco2e"]),
+    agg: str = Query("sum", description="sum, avg, min or max"),
+):
+    """Filtered aggregates of the historical dataset, one row per group with its row count"""
+    params = {
+        "year_min": year_min,
+        "year_max": year_max,
+        "regions": _split_list(region) or None,
+        "group_by": _split_list(group_by),
+        "metrics": _split_list(metric),
+        "agg": agg.lower(),
+    }
+    if not params["metrics"]:
+        raise HTTPException(status_code=400, detail="at least one metric is required")
+    key = ("history", canonical_payload(params), data_versions()[0])
+    try:
+        return response_cache.respond(key, lambda: {**params, "rows": query_history(**params)})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+def _require_jobs_token(token: Optional[str]) -> None:
+    # Queued jobs append to the history and replace the served model
+    if not JOBS_ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Set JOBS_ADMIN_TOKEN to queue jobs")
+    if token is None or not hmac.compare_digest(token.encode("utf-8"), JOBS_ADMIN_TOKEN.encode("utf-8")):
+        raise HTTPException(status_code=401, detail="Invalid or missing X-Jobs-Token")
+
+
+@app.post("/jobs/train", status_code=202)
+def enqueue_training(x_jobs_token: Optional[str] = Header(None)) -> dict:
+    """Queue a full retrain; returns the already queued/running one instead of a duplicate"""
+    _require_jobs_token(x_jobs_token)
+    job, created = get_job_queue().enqueue("train")
+    return {"job": job.to_dict(), "created": created}
+
+
+def _move_job_input(src: Path, dest: Path) -> None:
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    shutil.move(str(src), str(dest))
+
+
+@app.post("/jobs/ingest", status_code=202)
+async def enqueue_ingest(file: UploadFile = File(...), incremental: bool = Query(True),
+                         x_jobs_token: Optional[str] = Header(None)) -> dict:
+    """Queue ingestion of an uploaded CSV (see ml/data_ingest.py); the same bytes map to the same job"""
+    _require_jobs_token(x_jobs_token)
+    if not incremental:
+        # A full run of ml/data_ingest.py retrains on the dataset store, not on the uploaded rows
+        raise HTTPException(status_code=400, detail="incremental=false is not supported: "
+                                                    "ingest the rows, or POST /jobs/train for a full retrain")
+    if not file.filename.lower().endswith(".csv"):
+        raise HTTPException(status_code=400, detail="Only CSV files are allowed")
+    stored = await save_upload(file)
+    # Staged for this job alone and deleted when it finishes; identical bytes still share a job
+    dest = JOBS_INPUT_DIR / f"{stored.sha256}-{uuid.uuid4().hex[:8]}.csv"
+    await run_in_threadpool(_move_job_input, stored.path, dest)
+    try:
+        job, created = await run_in_threadpool(
+            get_job_queue().enqueue, "ingest", {"csv": str(dest), "sha256": stored.sha256},
+            key_args={"sha256": stored.sha256},
+        )
+    except BaseException:
+        await run_in_threadpool(dest.unlink, missing_ok=True)
+        raise
+    if not created:
+        # The queued or running job has its own copy
+        await run_in_threadpool(dest.unlink, missing_ok=True)
+    return {"job": job.to_dict(), "created": created}
+
+
+@app.get("/jobs")
+def list_jobs(status: Optional[str] = Query(None), limit: int = Query(50, ge=1, le=500)) -> dict:
+    return {"jobs": [job.to_dict() for job in get_job_queue().recent(status=status, limit=limit)]}
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str) -> dict:
+    """Status, progress (0-1 plus the latest message) and, once finished, result or error"""
+    job = get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
 
 @app.post("/recommend_strategies", response_model=List[RecommendationOut])
 def recommend_strategies(payload: RecommendationRequest) -> List[RecommendationOut]:
     if payload.emission_value < 0:
         raise HTTPException(status_code=400, detail="emission_value must be >= 0")
+    key = ("recommend_strategies", canonical_payload(payload), data_versions())
+    return response_cache.respond(key, lambda: _recommend_strategies(payload))
+
+
+def _recommend_strategies(payload: RecommendationRequest) -> List[RecommendationOut]:
     try:
         recs = generate_recommendations(
             sector=payload.sector,
@@ -209,6 +634,11 @@ def recommend_strategies(payload: RecommendationRequest) -> List[RecommendationO
 @app.post("/estimate_indian")
 def estimate_indian_emissions(payload: IndianEstimateRequest) -> dict:
     """Estimate emissions for Indian coal mines using regional emission factors"""
+    key = ("estimate_indian", canonical_payload(payload), data_versions())
+    return response_cache.respond(key, lambda: _estimate_indian(payload))
+
+
+def _estimate_indian(payload: IndianEstimateRequest) -> dict:
     try:
         # Get regional emission factor
         emission_factor = get_indian_regional_emission_factor(payload.region)
@@ -238,67 +668,73 @@ def estimate_indian_emissions(payload: IndianEstimateRequest) -> dict:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+INDIAN_REGIONS = StaticJSON({
+    "regions": [
+        {
+            "name": "jharkhand",
+            "display_name": "Jharkhand",
+            "emission_factor_kgco2_perton": 2000.0,
+            "description": "Major coal mining state with high-quality coal"
+        },
+        {
+            "name": "chhattisgarh", 
+            "display_name": "Chhattisgarh",
+            "emission_factor_kgco2_perton": 1950.0,
+            "description": "Leading coal producer with efficient mining operations"
+        },
+        {
+            "name": "odisha",
+            "display_name": "Odisha", 
+            "emission_factor_kgco2_perton": 2100.0,
+            "description": "Coastal state with significant coal reserves"
+        },
+        {
+            "name": "west_bengal",
+            "display_name": "West Bengal",
+            "emission_factor_kgco2_perton": 2050.0,
+            "description": "Eastern state with established mining infrastructure"
+        }
+    ],
+    "indian_grid_factor_tco2_per_mwh": 0.82,
+    "emission_scales": {
+        "high": ">500,000 tCO2e",
+        "medium": "50,000 - 500,000 tCO2e", 
+        "low": "<50,000 tCO2e"
+    }
+})
+
+
 @app.get("/indian_regions")
-def get_indian_coal_regions() -> dict:
+def get_indian_coal_regions(request: Request) -> dict:
     """Get available Indian coal mining regions and their characteristics"""
-    return {
-        "regions": [
-            {
-                "name": "jharkhand",
-                "display_name": "Jharkhand",
-                "emission_factor_kgco2_perton": 2000.0,
-                "description": "Major coal mining state with high-quality coal"
-            },
-            {
-                "name": "chhattisgarh", 
-                "display_name": "Chhattisgarh",
-                "emission_factor_kgco2_perton": 1950.0,
-                "description": "Leading coal producer with efficient mining operations"
-            },
-            {
-                "name": "odisha",
-                "display_name": "Odisha", 
-                "emission_factor_kgco2_perton": 2100.0,
-                "description": "Coastal state with significant coal reserves"
-            },
-            {
-                "name": "west_bengal",
-                "display_name": "West Bengal",
-                "emission_factor_kgco2_perton": 2050.0,
-                "description": "Eastern state with established mining infrastructure"
-            }
-        ],
-        "indian_grid_factor_tco2_per_mwh": 0.82,
-        "emission_scales": {
-            "high": ">500,000 tCO2e",
-            "medium": "50,000 - 500,000 tCO2e", 
-            "low": "<50,000 tCO2e"
-        }
+    return INDIAN_REGIONS.response(request)
+
+
+INDIAN_POLICY_FRAMEWORK = StaticJSON({
+    "ndc_targets": {
+        "net_zero_year": 2070,
+        "renewable_energy_target_2030": "500 GW",
+        "emission_intensity_reduction": "45% by 2030"
+    },
+    "regulatory_framework": [
+        "Environmental Clearance (EC)",
+        "Forest Clearance (FC)", 
+        "Coal Mines (Special Provisions) Act, 2015",
+        "Mines and Minerals (Development and Regulation) Act, 1957"
+    ],
+    "renewable_energy_targets": {
+        "solar": "280 GW by 2030",
+        "wind": "140 GW by 2030",
+        "hydro": "50 GW by 2030",
+        "biomass": "10 GW by 2030"
     }
+})
 
 
 @app.get("/indian_policy_framework")
-def get_indian_policy_framework() -> dict:
+def get_indian_policy_framework(request: Request) -> dict:
     """Get India's policy framework relevant to coal mining decarbonization"""
-    return {
-        "ndc_targets": {
-            "net_zero_year": 2070,
-            "renewable_energy_target_2030": "500 GW",
-            "emission_intensity_reduction": "45% by 2030"
-        },
-        "regulatory_framework": [
-            "Environmental Clearance (EC)",
-            "Forest Clearance (FC)", 
-            "Coal Mines (Special Provisions) Act, 2015",
-            "Mines and Minerals (Development and Regulation) Act, 1957"
-        ],
-        "renewable_energy_targets": {
-            "solar": "280 GW by 2030",
-            "wind": "140 GW by 2030",
-            "hydro": "50 GW by 2030",
-            "biomass": "10 GW by 2030"
-        }
-    }
+    return INDIAN_POLICY_FRAMEWORK.response(request)
 
 
 
@@ -0,0 +1,346 @@
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from starlette.routing import Mount
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds: from sub-millisecond handlers to multi-second uploads
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Bytes: 1 KiB to 64 MiB
+SIZE_BUCKETS = tuple(float(1 << shift) for shift in range(10, 27, 2))
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value != value:
+        return "NaN"
+    if value in (float("inf"), float("-inf")):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _ShardHolder:
+    """Thread-local owner of a shard; collected when its thread exits, which retires the shard"""
+
+    __slots__ = ("shard", "__weakref__")
+
+    def __init__(self, shard: Dict[Labels, object]):
+        self.shard = shard
+
+
+class _Metric:
+    """Base for counters and histograms: one shard of values per thread.
+
+    The hot path updates its own thread's shard without a lock; only the first update from a new
+    thread takes one, to register the shard. When the thread exits, its shard is merged into one
+    retired total, so short-lived threads (anyio retires idle workers) do not pile up shards. A
+    scrape copies and sums the shards, so it can miss an update racing with it on another thread;
+    that update shows on the next scrape.
+    """
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # Live threads' shards by id, and the merged shards of threads that have exited
+        self._shards: Dict[int, Dict[Labels, object]] = {}
+        self._retired: Dict[Labels, object] = {}
+
+    def _shard(self) -> Dict[Labels, object]:
+        try:
+            return self._local.holder.shard
+        except AttributeError:
+            shard: Dict[Labels, object] = {}
+            holder = _ShardHolder(shard)
+            with self._lock:
+                self._shards[id(shard)] = shard
+            # Thread-local storage is cleared when the thread exits, which collects the holder
+            weakref.finalize(holder, self._retire, shard)
+            self._local.holder = holder
+            return shard
+
+    def _retire(self, shard: Dict[Labels, object]) -> None:
+        with self._lock:
+            self._shards.pop(id(shard), None)
+            self._merge(self._retired, shard)
+
+    def _merge(self, into: Dict[Labels, object], shard: Dict[Labels, object]) -> None:
+        raise NotImplementedError
+
+    def _totals(self) -> Dict[Labels, object]:
+        with self._lock:
+            shards = list(self._shards.values())
+            totals: Dict[Labels, object] = {}
+            self._merge(totals, self._retired)
+        for shard in shards:
+            # dict.copy() runs without releasing the GIL, so it never sees a half-inserted key
+            self._merge(totals, shard.copy())
+        return totals
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0.0) + amount
+
+    def _merge(self, into: Dict[Labels, float], shard: Dict[Labels, float]) -> None:
+        for labels, value in shard.items():
+            into[labels] = into.get(labels, 0.0) + value
+
+    def value(self, *labels: str) -> float:
+        return self._totals().get(labels, 0.0)
+
+    def samples(self) -> Iterator[str]:
+        totals = self._totals()
+        for labels in sorted(totals):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(totals[labels])}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+
+    def observe(self, value: float, *labels: str) -> None:
+        shard = self._shard()
+        row = shard.get(labels)
+        if row is None:
+            # Per-bucket (not cumulative) counts, the +Inf bucket, then the sum
+            row = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        row[bisect_left(self.buckets, value)] += 1
+        row[-1] += value
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def _merge(self, into: Dict[Labels, List[float]], shard: Dict[Labels, List[float]]) -> None:
+        for labels, row in shard.items():
+            # A copy of the row: the owning thread may still be adding to it
+            row = list(row)
+            acc = into.get(labels)
+            if acc is None:
+                into[labels] = row
+                continue
+            for i, value in enumerate(row):
+                acc[i] += value
+
+    def count(self, *labels: str) -> int:
+        row = self._totals().get(labels)
+        return int(sum(row[:-1])) if row else 0
+
+    def samples(self) -> Iterator[str]:
+        totals = self._totals()
+        for labels in sorted(totals):
+            row = totals[labels]
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), row[:-1]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(row[-1])}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}"
+
+
+class Collected:
+    """Values read at scrape time from state another component already keeps (cache stats, ...)"""
+
+    def __init__(self, name: str, documentation: str, kind: str,
+                 collect: Callable[[], Iterable[Tuple[Labels, float]]], labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self.collect = collect
+
+    def samples(self) -> Iterator[str]:
+        for labels, value in self.collect():
+            if value is None:
+                continue
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, object] = {}
+
+    def _register(self, metric):
+        with self._lock:
+            # Registering a name twice returns the first metric, e.g. when a module is re-imported
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def collected(self, name: str, documentation: str, kind: str,
+                  collect: Callable[[], Iterable[Tuple[Labels, float]]], labelnames: Sequence[str] = ()) -> Collected:
+        with self._lock:
+            # Replaced rather than kept: the callback closes over the latest objects
+            metric = self._metrics[name] = Collected(name, documentation, kind, collect, labelnames)
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            try:
+                samples = list(metric.samples())
+            except Exception:
+                # One failing collector must not take the whole scrape down
+                continue
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "zerith_http_request_duration_seconds", "Time to serve a request, by route template",
+    ("method", "route", "status"),
+)
+MODEL_LOAD_SECONDS = REGISTRY.histogram(
+    "zerith_model_load_seconds", "Time to load the forecast model artifact", ("format",),
+)
+MODEL_PREDICT_SECONDS = REGISTRY.histogram(
+    "zerith_model_predict_seconds", "Time spent in model.predict per stacked forecast batch",
+)
+MODEL_PREDICT_ROWS = REGISTRY.counter(
+    "zerith_model_predict_rows_total", "Feature rows passed to model.predict",
+)
+FORECAST_SERIES = REGISTRY.counter(
+    "zerith_forecast_series_total",
+    "Forecast series served, by path: model, physics (model output too flat) or heuristic (no usable model)",
+    ("path",),
+)
+FORECAST_FALLBACKS = REGISTRY.counter(
+    "zerith_forecast_fallbacks_total", "Forecast requests that fell back to the heuristic, by reason", ("reason",),
+)
+UPLOAD_BYTES = REGISTRY.histogram(
+    "zerith_upload_size_bytes", "Size of spooled uploads", buckets=SIZE_BUCKETS,
+)
+DB_QUERY_SECONDS = REGISTRY.histogram(
+    "zerith_db_query_duration_seconds", "Database statement execution time", ("engine", "operation"),
+)
+
+_DB_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "PRAGMA", "CREATE", "ALTER", "DROP", "WITH"}
+
+
+def instrument_engine(engine, name: str) -> None:
+    """Time every statement `engine` (a sync Engine, or an AsyncEngine's .sync_engine) executes"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _started(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._metrics_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _finished(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_metrics_started", None)
+        if started is None:
+            return
+        head = statement.lstrip()[:8].split(None, 1)
+        operation = head[0].upper() if head else ""
+        DB_QUERY_SECONDS.observe(
+            time.perf_counter() - started, name, operation if operation in _DB_OPERATIONS else "OTHER",
+        )
+
+
+def forecast_fallback_reason(error: BaseException) -> str:
+    # A small fixed set keeps the label cardinality bounded
+    return "no_model" if isinstance(error, FileNotFoundError) else "error"
+
+
+class MetricsMiddleware:
+    """Observes every HTTP request into HTTP_REQUEST_SECONDS, labelled by route template.
+
+    Unmatched paths share one "unmatched" label so scanners cannot grow the series count.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        # Route endpoint, or mounted app, to its template; built from the app's routes on first use
+        self._templates: Optional[Dict[object, str]] = None
+
+    @staticmethod
+    def _build_templates(routes: Iterable[object]) -> Dict[object, str]:
+        templates: Dict[object, str] = {}
+        for route in routes:
+            if isinstance(route, Mount):
+                # The router puts the mounted app (StaticFiles, ...) in scope["endpoint"]
+                templates[route.app] = route.path + "/{path}"
+            elif hasattr(route, "endpoint") and hasattr(route, "path"):
+                templates[route.endpoint] = route.path
+        return templates
+
+    def _route(self, scope: Scope) -> str:
+        templates = self._templates
+        if templates is None:
+            routes = getattr(getattr(scope.get("app"), "router", None), "routes", [])
+            templates = self._templates = self._build_templates(routes)
+        # No endpoint means no route (or mount) matched
+        endpoint = scope.get("endpoint")
+        return templates.get(endpoint, "unmatched") if endpoint is not None else "unmatched"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status: Optional[int] = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started, scope["method"], self._route(scope), str(status or 500),
+            )
@@ -0,0 +1,201 @@
+import hashlib
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .forest import compact_source_sha256, load_compact_forest
+from .metrics import MODEL_LOAD_SECONDS
+
+
+# Feature order used by ml/train.py when fitting the forest
+FEATURE_COLUMNS = [
+    "Year",
+    "Coal_Production_Tons",
+    "Energy_Consumption_MWh",
+    "Emission_Factor_kgCO2_perTon",
+    "Methane_Emissions_tons",
+    "Other_GHG_Emissions_tons",
+]
+
+# How often (seconds) the model file is stat'ed for changes; 0 checks on every call
+MODEL_CHECK_INTERVAL_S = float(os.getenv("MODEL_CHECK_INTERVAL_S", "1.0"))
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _stat(path: Path) -> Optional[os.stat_result]:
+    try:
+        return os.stat(path)
+    except FileNotFoundError:
+        return None
+
+
+def _iso(ts: Optional[float]) -> Optional[str]:
+    if ts is None:
+        return None
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat()
+
+
+@dataclass(frozen=True)
+class LoadedModel:
+    model: object
+    feature_columns: List[str]
+    # Artifact actually loaded: the compact forest or the pickle
+    path: Path
+    sha256: str
+    mtime_ns: int
+    size_bytes: int
+    load_seconds: float
+    loaded_at: float
+
+
+class ModelRegistry:
+    """Process-wide cache of the trained forest, hot-swapped when the artifact changes.
+
+    When `compact_path` exists (ml/export_forest.py output) it is served instead of the pickle:
+    it loads in milliseconds and predicts without joblib's thread fan-out. A leftover export from
+    an earlier model is not: it must record the current pickle's SHA-256 or, for exports that
+    predate that, be at least as new as the pickle.
+    """
+
+    def __init__(self, path: Path, feature_columns: List[str], check_interval_s: float = MODEL_CHECK_INTERVAL_S,
+                 compact_path: Optional[Path] = None):
+        self.path = Path(path)
+        self.compact_path = Path(compact_path) if compact_path is not None else None
+        self.feature_columns = list(feature_columns)
+        self.check_interval_s = check_interval_s
+        self._lock = threading.Lock()
+        self._current: Optional[LoadedModel] = None
+        # (path, mtime_ns, size) of the file the current model was verified against
+        self._signature: Optional[Tuple[str, int, int]] = None
+        self._checked_at = 0.0
+        self._reload_count = 0
+        self._last_error: Optional[str] = None
+        # ((compact signature, pickle signature), compact export matches the pickle)
+        self._compact_verdict: Optional[Tuple[Tuple, bool]] = None
+
+    def get(self) -> Tuple[object, List[str]]:
+        current = self._current
+        if current is not None and time.monotonic() - self._checked_at < self.check_interval_s:
+            return current.model, current.feature_columns
+        loaded = self._refresh()
+        return loaded.model, loaded.feature_columns
+
+    def current(self) -> Optional[LoadedModel]:
+        return self._current
+
+    @property
+    def version(self) -> Optional[str]:
+        current = self._current
+        return current.sha256 if current is not None else None
+
+    def _compact_is_current(self, compact_st: os.stat_result, pickle_st: os.stat_result) -> bool:
+        key = (compact_st.st_mtime_ns, compact_st.st_size, pickle_st.st_mtime_ns, pickle_st.st_size)
+        verdict = self._compact_verdict
+        if verdict is not None and verdict[0] == key:
+            return verdict[1]
+        try:
+            source = compact_source_sha256(self.compact_path)
+            if source is not None:
+                current = source == _file_sha256(self.path)
+            else:
+                current = compact_st.st_mtime_ns >= pickle_st.st_mtime_ns
+        except Exception:
+            # Unreadable or mid-replace: serve the pickle and look again on the next check
+            return False
+        self._compact_verdict = (key, current)
+        return current
+
+    def _resolve(self) -> Tuple[Path, Optional[os.stat_result]]:
+        pickle_st = _stat(self.path)
+        compact_st = _stat(self.compact_path) if self.compact_path is not None else None
+        if compact_st is None:
+            return self.path, pickle_st
+        if pickle_st is None or self._compact_is_current(compact_st, pickle_st):
+            return self.compact_path, compact_st
+        return self.path, pickle_st
+
+    def _refresh(self) -> LoadedModel:
+        path, st = self._resolve()
+
+        with self._lock:
+            self._checked_at = time.monotonic()
+            current = self._current
+            if st is None:
+                # Keep serving the last good model while an artifact is being replaced
+                if current is not None:
+                    return current
+                raise FileNotFoundError("Model not found. Run ml/train.py to create model.pkl")
+
+            signature = (str(path), st.st_mtime_ns, st.st_size)
+            if current is not None and signature == self._signature:
+                return current
+
+            try:
+                sha256 = _file_sha256(path)
+                if current is not None and sha256 == current.sha256:
+                    # Touched but unchanged (e.g. copied over with the same bytes)
+                    self._signature = signature
+                    return current
+
+                started = time.perf_counter()
+                if path == self.compact_path:
+                    model = load_compact_forest(path)
+                else:
+                    # Imported here: it costs ~150 ms at startup and the compact format never needs it
+                    import joblib
+
+                    model = joblib.load(path)
+                    if hasattr(model, "n_jobs"):
+                        # Request-sized batches are far too small to gain from joblib's thread fan-out
+                        model.n_jobs = 1
+                load_seconds = time.perf_counter() - started
+                MODEL_LOAD_SECONDS.observe(load_seconds, "compact" if path == self.compact_path else "pickle")
+            except Exception as e:
+                self._last_error = f"{type(e).__name__}: {e}"
+                if current is not None:
+                    return current
+                raise
+
+            loaded = LoadedModel(
+                model=model,
+                feature_columns=self.feature_columns,
+                path=path,
+                sha256=sha256,
+                mtime_ns=st.st_mtime_ns,
+                size_bytes=st.st_size,
+                load_seconds=load_seconds,
+                loaded_at=time.time(),
+            )
+            if current is not None:
+                self._reload_count += 1
+            self._signature = signature
+            self._last_error = None
+            # Single reference assignment: readers see either the old or the new model
+            self._current = loaded
+            return loaded
+
+    def stats(self) -> Dict:
+        current = self._current
+        return {
+            "path": str(current.path if current else self.path),
+            "format": ("compact" if current.path == self.compact_path else "pickle") if current else None,
+            "loaded": current is not None,
+            "sha256": current.sha256 if current else None,
+            "size_bytes": current.size_bytes if current else None,
+            "load_seconds": current.load_seconds if current else None,
+            "loaded_at": _iso(current.loaded_at) if current else None,
+            "last_reload_at": _iso(current.loaded_at) if current and self._reload_count else None,
+            "reload_count": self._reload_count,
+            "last_error": self._last_error,
+        }
@@ -1,16 +1,42 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Index
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.sql import func
 from .database import Base
 
 
+# created_at is always set by CURRENT_TIMESTAMP (whole seconds). On SQLite, store bound values in
+# that same text form so keyset comparisons against a cursor's created_at match stored rows
+CreatedAt = DateTime(timezone=True).with_variant(
+    sqlite.DATETIME(storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"),
+    "sqlite",
+)
+
+
+class PdfBlob(Base):
+    __tablename__ = "pdf_blobs"
+
+    # Content-addressed PDF bytes shared by every report with the same digest
+    sha256 = Column(String(64), primary_key=True)
+    size_bytes = Column(Integer, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
 class PdfReport(Base):
     __tablename__ = "pdf_reports"
+    __table_args__ = (
+        # Serves /fetch_pdfs: equality on uid, then (created_at, id) in index order for keyset pages
+        Index("ix_pdf_reports_uid_created_at_id", "uid", "created_at", "id"),
+    )
+    # Fetch the server-generated created_at with the INSERT (RETURNING where supported) rather
+    # than by a refresh that would hold a connection open after commit
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True, index=True)
     uid = Column(String(128), index=True, nullable=False)
     filename = Column(String(255), nullable=False)
     url = Column(Text, nullable=False)
     size_bytes = Column(Integer, nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-
-
+    created_at = Column(CreatedAt, server_default=func.now())
+    # NULL for reports stored before content addressing; those live at LOCAL_STORAGE_DIR/filename
+    blob_sha256 = Column(String(64), index=True, nullable=True)
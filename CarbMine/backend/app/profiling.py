@@ -0,0 +1,402 @@
+"""Opt-in per-request profiling: cProfile or stack sampling plus a tracemalloc top-N, kept on disk.
+
+With PROFILING_ENABLED set, a request is profiled when it carries `X-Profile: cprofile` (or
+`sample`, or any other value for PROFILE_MODE) or when it is picked at PROFILE_SAMPLE_RATE. If
+PROFILE_ADMIN_TOKEN is set, the header only counts alongside a matching `X-Profile-Token`, and the
+/admin/profiles endpoints require the same header; without a token they answer 403. The response carries `X-Profile-Id`; the report
+lands in PROFILE_DIR, which keeps the newest PROFILE_KEEP profiles.
+
+With profiling disabled the middleware returns after one attribute check and the endpoint wrapper
+after one context-variable lookup. Each worker profiles one request at a time; requests arriving
+meanwhile run unprofiled. cProfile and the sampler also see whatever else the event loop runs while
+the request awaits, and tracemalloc sees every thread, so profile on a quiet worker.
+"""
+import asyncio
+import cProfile
+import functools
+import hmac
+import json
+import marshal
+import os
+import pstats
+import random
+import re
+import secrets
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") not in ("0", "false", "no", "")
+# Fraction of requests profiled without the header
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_MODE = os.getenv("PROFILE_MODE", "cprofile")
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", str(Path(__file__).resolve().parents[1] / "profiles")))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+PROFILE_TOP_N = int(os.getenv("PROFILE_TOP_N", "30"))
+PROFILE_SAMPLE_INTERVAL_S = float(os.getenv("PROFILE_SAMPLE_INTERVAL_S", "0.001"))
+PROFILE_TRACEMALLOC = os.getenv("PROFILE_TRACEMALLOC", "1") not in ("0", "false", "no")
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN", "")
+
+MODES = ("cprofile", "sample")
+# From 3.12 cProfile runs on sys.monitoring: only one profiler can be enabled per interpreter, and
+# it sees every thread, so the request's profiler also covers the threadpool
+SHARED_CPROFILE = sys.version_info >= (3, 12)
+ADMIN_PREFIX = "/admin/profiles"
+# Downloadable files next to each report, by kind
+ARTIFACT_TYPES = {"pstats": "application/octet-stream", "folded": "text/plain; charset=utf-8"}
+
+_PROFILE_ID = re.compile(r"^\d{8}T\d{12}-[0-9a-f]{8}$")
+_MAX_STACK_DEPTH = 128
+
+# The profile of the request being served, if any; read by the wrapped endpoints
+_active: ContextVar[Optional["RequestProfile"]] = ContextVar("zerith_request_profile", default=None)
+
+
+def new_profile_id() -> str:
+    # Sorts chronologically (to the microsecond), which is what the ring prunes by
+    now = time.time()
+    return f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime(now))}{int(now % 1 * 1e6):06d}-{secrets.token_hex(4)}"
+
+
+class ProfileStore:
+    """Reports as <id>.json plus artifacts as <id>.<kind>, pruned to the newest `keep`"""
+
+    def __init__(self, directory: Path, keep: int = PROFILE_KEEP):
+        self.directory = Path(directory)
+        self.keep = max(1, keep)
+        self._lock = threading.Lock()
+
+    def _write(self, path: Path, data: bytes) -> None:
+        tmp = path.with_name(f".{path.name}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+    def save(self, report: Dict, artifacts: Dict[str, bytes]) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        profile_id = report["id"]
+        for kind, data in artifacts.items():
+            self._write(self.directory / f"{profile_id}.{kind}", data)
+        # The report goes last: a listed profile always has its artifacts
+        self._write(self.directory / f"{profile_id}.json", json.dumps(report).encode("utf-8"))
+        self._prune()
+
+    def _ids(self) -> List[str]:
+        if not self.directory.is_dir():
+            return []
+        return sorted(p.stem for p in self.directory.glob("*.json") if _PROFILE_ID.match(p.stem))
+
+    def _prune(self) -> None:
+        with self._lock:
+            ids = self._ids()
+            for profile_id in ids[:-self.keep]:
+                for path in self.directory.glob(f"{profile_id}.*"):
+                    # Another worker sharing the directory may have pruned it already
+                    path.unlink(missing_ok=True)
+
+    def list(self) -> List[Dict]:
+        """Report summaries, newest first"""
+        summaries = []
+        for profile_id in reversed(self._ids()):
+            report = self.get(profile_id)
+            if report is not None:
+                summaries.append({k: v for k, v in report.items() if k not in ("functions", "stacks", "allocations")})
+        return summaries
+
+    def get(self, profile_id: str) -> Optional[Dict]:
+        if not _PROFILE_ID.match(profile_id):
+            return None
+        try:
+            return json.loads((self.directory / f"{profile_id}.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def artifact(self, profile_id: str, kind: str) -> Optional[Path]:
+        if not _PROFILE_ID.match(profile_id) or kind not in ARTIFACT_TYPES:
+            return None
+        path = self.directory / f"{profile_id}.{kind}"
+        return path if path.is_file() else None
+
+
+def _fold(frame) -> str:
+    """One stack in the folded format of flamegraph.pl and speedscope, root first"""
+    names = []
+    while frame is not None and len(names) < _MAX_STACK_DEPTH:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class StackSampler:
+    """Samples the stacks of the watched threads every `interval_s` from a background thread"""
+
+    def __init__(self, interval_s: float = PROFILE_SAMPLE_INTERVAL_S):
+        self.interval_s = interval_s
+        self.stacks: Counter = Counter()
+        self._watched: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="zerith-profile-sampler", daemon=True)
+
+    def watch(self, ident: int) -> None:
+        with self._lock:
+            self._watched[ident] = self._watched.get(ident, 0) + 1
+
+    def unwatch(self, ident: int) -> None:
+        with self._lock:
+            left = self._watched.get(ident, 0) - 1
+            if left > 0:
+                self._watched[ident] = left
+            else:
+                self._watched.pop(ident, None)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            with self._lock:
+                watched = list(self._watched)
+            frames = sys._current_frames()
+            for ident in watched:
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.stacks[_fold(frame)] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+class RequestProfile:
+    """Profile of one request: the event-loop thread plus any threadpool thread running its endpoint"""
+
+    def __init__(self, mode: str, top_n: int = PROFILE_TOP_N, trace_allocations: bool = PROFILE_TRACEMALLOC,
+                 interval_s: float = PROFILE_SAMPLE_INTERVAL_S):
+        self.id = new_profile_id()
+        self.mode = mode
+        self.top_n = top_n
+        self.trace_allocations = trace_allocations
+        self._sampler = StackSampler(interval_s) if mode == "sample" else None
+        self._profilers: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+        self._started_tracing = False
+        self._before: Optional[tracemalloc.Snapshot] = None
+        self._loop_ident = 0
+
+    def start(self) -> None:
+        if self.trace_allocations:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            self._before = tracemalloc.take_snapshot()
+        self._loop_ident = threading.get_ident()
+        if self._sampler is not None:
+            self._sampler.watch(self._loop_ident)
+            self._sampler.start()
+        else:
+            profiler = cProfile.Profile()
+            self._profilers.append(profiler)
+            profiler.enable()
+
+    def run(self, call: Callable, args: Tuple, kwargs: Dict):
+        """call(*args, **kwargs) profiled on the current (threadpool) thread"""
+        if self._sampler is not None:
+            ident = threading.get_ident()
+            self._sampler.watch(ident)
+            try:
+                return call(*args, **kwargs)
+            finally:
+                self._sampler.unwatch(ident)
+        if SHARED_CPROFILE:
+            return call(*args, **kwargs)
+        # Before 3.12 a cProfile.Profile only follows the thread that enabled it: one per thread
+        profiler = cProfile.Profile()
+        with self._lock:
+            self._profilers.append(profiler)
+        profiler.enable()
+        try:
+            return call(*args, **kwargs)
+        finally:
+            profiler.disable()
+
+    def stop(self) -> None:
+        # Called on the thread that called start(), before the slow part in finish()
+        if self._sampler is not None:
+            self._sampler.unwatch(self._loop_ident)
+            self._sampler.stop()
+        else:
+            self._profilers[0].disable()
+
+    def _allocations(self) -> Tuple[List[Dict], Optional[float]]:
+        after = tracemalloc.take_snapshot()
+        peak = tracemalloc.get_traced_memory()[1] if self._started_tracing else None
+        if self._started_tracing:
+            tracemalloc.stop()
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        diff = after.filter_traces(ignore).compare_to(self._before.filter_traces(ignore), "lineno")
+        top = [stat for stat in diff if stat.size_diff > 0][:self.top_n]
+        return [
+            {
+                "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                "size_kib": round(stat.size_diff / 1024, 1),
+                "count": stat.count_diff,
+            }
+            for stat in top
+        ], (round(peak / 1024, 1) if peak is not None else None)
+
+    def finish(self, meta: Dict) -> Tuple[Dict, Dict[str, bytes]]:
+        """The JSON report and the artifacts to store with it"""
+        report = {"id": self.id, "mode": self.mode, **meta}
+        artifacts: Dict[str, bytes] = {}
+        if self.trace_allocations:
+            # New allocations still alive at the end of the request, largest first
+            report["allocations"], report["traced_peak_kib"] = self._allocations()
+        if self._sampler is not None:
+            stacks = self._sampler.stacks
+            report["samples"] = sum(stacks.values())
+            report["interval_ms"] = round(self._sampler.interval_s * 1000, 3)
+            report["stacks"] = [{"stack": stack, "samples": n} for stack, n in stacks.most_common(self.top_n)]
+            artifacts["folded"] = "".join(f"{stack} {n}\n" for stack, n in stacks.items()).encode("utf-8")
+        else:
+            stats = pstats.Stats(self._profilers[0])
+            for profiler in self._profilers[1:]:
+                stats.add(profiler)
+            rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:self.top_n]
+            report["functions"] = [
+                {"function": f"{filename}:{line}({name})", "calls": calls, "primitive_calls": primitive,
+                 "own_s": round(own, 6), "cumulative_s": round(cumulative, 6)}
+                for (filename, line, name), (primitive, calls, own, cumulative, _callers) in rows
+            ]
+            # Loadable with pstats.Stats(path), snakeviz, ...; the same bytes Stats.dump_stats writes
+            artifacts["pstats"] = marshal.dumps(stats.stats)
+        report["files"] = sorted(artifacts)
+        return report, artifacts
+
+
+class Profiler:
+    """Settings and state shared by the middleware, the endpoint wrapper and the admin endpoints"""
+
+    def __init__(self, store: ProfileStore, enabled: bool = PROFILING_ENABLED,
+                 sample_rate: float = PROFILE_SAMPLE_RATE, mode: str = PROFILE_MODE,
+                 token: str = PROFILE_ADMIN_TOKEN, top_n: int = PROFILE_TOP_N):
+        self.store = store
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.mode = mode if mode in MODES else "cprofile"
+        self.token = token
+        self.top_n = top_n
+        self.busy = False
+
+    def authorized(self, token: Optional[str]) -> bool:
+        if not self.token:
+            return True
+        return token is not None and hmac.compare_digest(token.encode("utf-8"), self.token.encode("utf-8"))
+
+    def trigger(self, scope: Scope) -> Optional[Tuple[str, str]]:
+        """(mode, "header" or "sample") if this request should be profiled"""
+        if scope["path"].startswith(ADMIN_PREFIX):
+            return None
+        requested = token = None
+        for name, value in scope["headers"]:
+            if name == b"x-profile":
+                requested = value.decode("latin-1").strip().lower()
+            elif name == b"x-profile-token":
+                token = value.decode("latin-1")
+        if requested and self.authorized(token):
+            return (requested if requested in MODES else self.mode), "header"
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return self.mode, "sample"
+        return None
+
+
+PROFILER = Profiler(ProfileStore(PROFILE_DIR))
+
+
+class ProfilingMiddleware:
+    """Profiles the requests PROFILER.trigger picks and stores the report once the response is sent"""
+
+    def __init__(self, app: ASGIApp, profiler: Optional[Profiler] = None):
+        self.app = app
+        self.profiler = profiler or PROFILER
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        profiler = self.profiler
+        if not profiler.enabled or scope["type"] != "http" or profiler.busy:
+            await self.app(scope, receive, send)
+            return
+        picked = profiler.trigger(scope)
+        if picked is None:
+            await self.app(scope, receive, send)
+            return
+
+        mode, trigger = picked
+        profile = RequestProfile(mode, top_n=profiler.top_n)
+        status: Optional[int] = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile.id.encode())]
+            await send(message)
+
+        # Only the event loop touches `busy`, so checking and setting it cannot race
+        profiler.busy = True
+        try:
+            reset = _active.set(profile)
+            profile.start()
+            started = time.perf_counter()
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                elapsed = time.perf_counter() - started
+                profile.stop()
+                _active.reset(reset)
+                meta = {
+                    "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                    "method": scope["method"],
+                    # The query string is left out: it can carry user ids
+                    "path": scope["path"],
+                    "status": status or 500,
+                    "duration_ms": round(elapsed * 1000, 3),
+                    "trigger": trigger,
+                }
+                report, artifacts = await run_in_threadpool(profile.finish, meta)
+                await run_in_threadpool(profiler.store.save, report, artifacts)
+        finally:
+            profiler.busy = False
+
+
+def _profiled_call(call: Callable) -> Callable:
+    @functools.wraps(call)
+    def wrapper(*args, **kwargs):
+        profile = _active.get()
+        if profile is None:
+            return call(*args, **kwargs)
+        return profile.run(call, args, kwargs)
+
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """Route whose sync endpoint is profiled in the threadpool thread FastAPI runs it on.
+
+    Async endpoints run on the event loop, which the middleware already profiles.
+    """
+
+    def get_route_handler(self):
+        call = self.dependant.call
+        if call is not None and not asyncio.iscoroutinefunction(call):
+            self.dependant.call = _profiled_call(call)
+        return super().get_route_handler()
@@ -0,0 +1,213 @@
+import csv
+import importlib.util
+import inspect
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from types import ModuleType
+from typing import Dict, List, Optional, Tuple
+
+
+# How often (seconds) the plugin and catalogue files are stat'ed for changes
+RECOMMENDER_CHECK_INTERVAL_S = float(os.getenv("RECOMMENDER_CHECK_INTERVAL_S", "1.0"))
+
+
+def load_strategy_catalogue(path: Path) -> List[Dict]:
+    rows: List[Dict] = []
+    if path.exists():
+        try:
+            with open(path, newline="", encoding="utf-8") as f:
+                reader = csv.DictReader(f)
+                for r in reader:
+                    try:
+                        rows.append({
+                            "strategy": r.get("strategy", ""),
+                            "category": r.get("category", ""),
+                            "impact_level": r.get("impact_level", "Medium"),
+                            "estimated_reduction_tco2e": float(r.get("estimated_reduction_tco2e", 0) or 0),
+                            "description": r.get("description", ""),
+                            "sector": r.get("sector") or None,
+                        })
+                    except Exception:
+                        continue
+        except Exception:
+            pass
+    return rows
+
+
+def _signature(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+@dataclass(frozen=True)
+class _LoadedPlugin:
+    module: Optional[ModuleType]
+    catalogue: List[Dict]
+    # Whether recommend_strategies() accepts the pre-parsed catalogue via `rows=`
+    accepts_rows: bool
+    # Ranking index built by the module's build_index(), passed back as `index=`
+    index: Optional[object]
+    accepts_index: bool
+    module_signature: Optional[Tuple[int, int]]
+    catalogue_signature: Optional[Tuple[int, int]]
+    module_load_seconds: float
+    catalogue_load_seconds: float
+    index_build_seconds: float
+    loaded_at: float
+
+
+@dataclass
+class _RankStats:
+    calls: int = 0
+    total_seconds: float = 0.0
+    last_seconds: Optional[float] = None
+    errors: int = 0
+
+
+class RecommenderPlugin:
+    """Imports ml/recommend.py once and keeps the strategy catalogue parsed in memory.
+
+    Both files are re-read only when their mtime/size change.
+    """
+
+    def __init__(self, module_path: Path, catalogue_path: Path, check_interval_s: float = RECOMMENDER_CHECK_INTERVAL_S):
+        self.module_path = Path(module_path)
+        self.catalogue_path = Path(catalogue_path)
+        self.check_interval_s = check_interval_s
+        self._lock = threading.Lock()
+        self._loaded: Optional[_LoadedPlugin] = None
+        self._checked_at = 0.0
+        self._reload_count = 0
+        self._last_error: Optional[str] = None
+        self._rank = _RankStats()
+        self._version = 0
+
+    def get(self) -> _LoadedPlugin:
+        loaded = self._loaded
+        if loaded is not None and time.monotonic() - self._checked_at < self.check_interval_s:
+            return loaded
+        return self._refresh()
+
+    @property
+    def catalogue(self) -> List[Dict]:
+        return self.get().catalogue
+
+    @property
+    def version(self) -> int:
+        # Bumped on every (re)load so callers can key caches on it
+        self.get()
+        return self._version
+
+    def _refresh(self) -> _LoadedPlugin:
+        module_sig = _signature(self.module_path)
+        catalogue_sig = _signature(self.catalogue_path)
+        with self._lock:
+            self._checked_at = time.monotonic()
+            current = self._loaded
+            if current is not None and current.module_signature == module_sig and current.catalogue_signature == catalogue_sig:
+                return current
+
+            module, accepts_rows, accepts_index, module_seconds = None, False, False, 0.0
+            if current is not None and current.module_signature == module_sig:
+                module, module_seconds = current.module, current.module_load_seconds
+                accepts_rows, accepts_index = current.accepts_rows, current.accepts_index
+            elif module_sig is not None:
+                started = time.perf_counter()
+                try:
+                    spec = importlib.util.spec_from_file_location("ml_recommend", str(self.module_path))
+                    if spec and spec.loader:
+                        module = importlib.util.module_from_spec(spec)
+                        spec.loader.exec_module(module)
+                        fn = getattr(module, "recommend_strategies", None)
+                        params = inspect.signature(fn).parameters if fn is not None else {}
+                        accepts_rows = "rows" in params
+                        accepts_index = "index" in params and hasattr(module, "build_index")
+                    self._last_error = None
+                except Exception as e:
+                    module = None
+                    self._last_error = f"{type(e).__name__}: {e}"
+                module_seconds = time.perf_counter() - started
+
+            if current is not None and current.catalogue_signature == catalogue_sig:
+                catalogue, catalogue_seconds = current.catalogue, current.catalogue_load_seconds
+            else:
+                started = time.perf_counter()
+                catalogue = load_strategy_catalogue(self.catalogue_path)
+                catalogue_seconds = time.perf_counter() - started
+
+            index, index_seconds = None, 0.0
+            if accepts_index:
+                started = time.perf_counter()
+                try:
+                    index = module.build_index(catalogue)
+                except Exception as e:
+                    accepts_index = False
+                    self._last_error = f"{type(e).__name__}: {e}"
+                index_seconds = time.perf_counter() - started
+
+            loaded = _LoadedPlugin(
+                module=module,
+                catalogue=catalogue,
+                accepts_rows=accepts_rows,
+                index=index,
+                accepts_index=accepts_index,
+                module_signature=module_sig,
+                catalogue_signature=catalogue_sig,
+                module_load_seconds=module_seconds,
+                catalogue_load_seconds=catalogue_seconds,
+                index_build_seconds=index_seconds,
+                loaded_at=time.time(),
+            )
+            if current is not None:
+                self._reload_count += 1
+            self._version += 1
+            self._loaded = loaded
+            return loaded
+
+    def recommend(self, sector: str, emission_value: float, region: Optional[str]) -> Optional[List[Dict]]:
+        loaded = self.get()
+        fn = getattr(loaded.module, "recommend_strategies", None) if loaded.module is not None else None
+        if fn is None:
+            return None
+        started = time.perf_counter()
+        try:
+            if loaded.accepts_index:
+                ranked = fn(sector=sector, emission_value=emission_value, region=region, index=loaded.index)
+            elif loaded.accepts_rows:
+                ranked = fn(sector=sector, emission_value=emission_value, region=region, rows=loaded.catalogue)
+            else:
+                ranked = fn(sector=sector, emission_value=emission_value, region=region)
+        except Exception:
+            self._rank.errors += 1
+            return None
+        elapsed = time.perf_counter() - started
+        # Unsynchronised counters: good enough for reporting, never on the critical path
+        self._rank.calls += 1
+        self._rank.total_seconds += elapsed
+        self._rank.last_seconds = elapsed
+        return ranked
+
+    def stats(self) -> Dict:
+        loaded = self._loaded
+        rank = self._rank
+        return {
+            "module_path": str(self.module_path),
+            "catalogue_path": str(self.catalogue_path),
+            "module_loaded": bool(loaded and loaded.module is not None),
+            "catalogue_rows": len(loaded.catalogue) if loaded else 0,
+            "module_load_seconds": loaded.module_load_seconds if loaded else None,
+            "catalogue_load_seconds": loaded.catalogue_load_seconds if loaded else None,
+            "index_build_seconds": loaded.index_build_seconds if loaded else None,
+            "reload_count": self._reload_count,
+            "rank_calls": rank.calls,
+            "rank_errors": rank.errors,
+            "rank_last_seconds": rank.last_seconds,
+            "rank_mean_seconds": (rank.total_seconds / rank.calls) if rank.calls else None,
+            "last_error": self._last_error,
+        }
@@ -23,6 +23,7 @@ class PdfReportOut(BaseModel):
     url: str
     size_bytes: int
     created_at: Optional[datetime] = None
+    sha256: Optional[str] = None
     if HAS_V2:
         # Pydantic v2 config
         model_config = ConfigDict(from_attributes=True)
@@ -1,19 +1,117 @@
 from pathlib import Path
 import os
-import math
-import json
-import joblib
-from typing import List, Dict, Optional, Tuple
-import csv
-from dataclasses import asdict, dataclass
-
-
-ML_DIR = Path(__file__).resolve().parents[2] / "ml"
-DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+from typing import List, Dict, NamedTuple, Optional, Sequence, Tuple
+import heapq
+import importlib.util
+import sqlite3
+import sys
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+
+from .dataset import DatasetCache, DatasetSnapshot, read_csv_columns
+from .jobs import JOBS_DB_PATH, JOBS_INPUT_DIR, Job, JobQueue, run_process
+from .metrics import FORECAST_SERIES, MODEL_PREDICT_ROWS, MODEL_PREDICT_SECONDS
+from .model_registry import FEATURE_COLUMNS, ModelRegistry
+from .recommender import RecommenderPlugin
+from .warmup import Warmup
+from .trajectory import YEAR, TrajectoryBase, build_feature_matrices, flat_series, physics_totals
+
+
+ML_DIR = Path(os.getenv("ML_DIR", str(Path(__file__).resolve().parents[2] / "ml")))
+DATA_DIR = Path(os.getenv("DATA_DIR", str(Path(__file__).resolve().parents[2] / "data")))
 MODEL_PATH = ML_DIR / "model.pkl"
+# Array-backed export of MODEL_PATH (ml/export_forest.py); preferred when present
+COMPACT_MODEL_PATH = ML_DIR / "model.forest.npz"
 METRICS_PATH = ML_DIR / "model_metrics.json"
 RECOMMENDER_PATH = ML_DIR / "recommend.py"
-STRATEGIES_CSV = Path(__file__).resolve().parents[2] / "data" / "strategies.csv"
+STRATEGIES_CSV = DATA_DIR / "strategies.csv"
+EMISSIONS_CSV = DATA_DIR / "coal_emissions.csv"
+# Indexed store of the history, (re)built from EMISSIONS_CSV by ml/datastore.py
+DATASTORE_PATH = DATA_DIR / "coal_emissions.sqlite3"
+DATASTORE_MODULE = ML_DIR / "datastore.py"
+
+
+def _load_datastore():
+    # Shared with the training scripts, so loaded from ml/ rather than packaged with the app;
+    # without it the API reads the CSV directly and /history is unavailable
+    if not DATASTORE_MODULE.exists():
+        return None
+    spec = importlib.util.spec_from_file_location("ml_datastore", str(DATASTORE_MODULE))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# The process-wide objects below are built on first use, which app startup and the warm-up
+# thread trigger, so importing this module stays cheap
+_UNBUILT = object()
+_build_lock = threading.RLock()
+
+
+def _lazy(name: str, build):
+    """Module global `name`, built by `build()` the first time it is needed"""
+    value = globals()[name]
+    if value is _UNBUILT:
+        with _build_lock:
+            value = globals()[name]
+            if value is _UNBUILT:
+                value = globals()[name] = build()
+    return value
+
+
+_datastore = _UNBUILT
+_model_registry = _UNBUILT
+_dataset_cache = _UNBUILT
+_recommender = _UNBUILT
+_job_queue = _UNBUILT
+
+
+def _get_datastore():
+    return _lazy("_datastore", _load_datastore)
+
+
+def _read_datastore(path: Path):
+    datastore = _get_datastore()
+    try:
+        datastore.ensure_store(path, EMISSIONS_CSV)
+    except (OSError, sqlite3.Error):
+        # Read-only data directory: serve the CSV as before
+        if not path.exists():
+            return read_csv_columns(EMISSIONS_CSV)
+    return datastore.read_columns(path)
+
+
+def _build_dataset_cache() -> DatasetCache:
+    if _get_datastore() is not None:
+        return DatasetCache(DATASTORE_PATH, read=_read_datastore, watch=[EMISSIONS_CSV])
+    return DatasetCache(EMISSIONS_CSV)
+
+# A failed background training run is only retried by requests after this long
+TRAIN_RETRY_AFTER_S = float(os.getenv("TRAIN_RETRY_AFTER_S", "300"))
+
+
+def _train_job(args: Dict, progress) -> Dict:
+    return run_process([sys.executable, str(ML_DIR / "train.py")], progress, cwd=ML_DIR)
+
+
+def _ingest_job(args: Dict, progress) -> Dict:
+    # Always incremental: a full run would validate the upload, then retrain on the store without it
+    argv = [sys.executable, str(ML_DIR / "data_ingest.py"), "--incremental", "--csv", args["csv"]]
+    return run_process(argv, progress, cwd=ML_DIR)
+
+
+def _cleanup_ingest(args: Dict) -> None:
+    # Each upload is staged for its own job (see /jobs/ingest)
+    path = Path(args["csv"])
+    if path.parent == JOBS_INPUT_DIR:
+        path.unlink(missing_ok=True)
+
+
+def _build_job_queue() -> JobQueue:
+    return JobQueue(JOBS_DB_PATH, {"train": _train_job, "ingest": _ingest_job},
+                    cleanup={"ingest": _cleanup_ingest})
 
 
 def estimate_ipcc_emissions(
@@ -57,39 +155,331 @@ def classify_indian_emission_level(emission_value: float) -> str:
         return 'low'
 
 
-def load_or_train_model() -> Tuple[object, List[str]]:
-    if MODEL_PATH.exists():
-        model = joblib.load(MODEL_PATH)
-        # Infer feature columns from training script convention
-        feature_columns = [
-            "Year",
-            "Coal_Production_Tons",
-            "Energy_Consumption_MWh",
-            "Emission_Factor_kgCO2_perTon",
-            "Methane_Emissions_tons",
-            "Other_GHG_Emissions_tons",
-        ]
-        return model, feature_columns
+def get_model_registry() -> ModelRegistry:
+    return _lazy("_model_registry",
+                 lambda: ModelRegistry(MODEL_PATH, FEATURE_COLUMNS, compact_path=COMPACT_MODEL_PATH))
+
+
+INDIAN_GRID_FACTOR_TCO2_PER_MWH = 0.82
+EMISSION_LEVELS = np.array(["low", "medium", "high"], dtype=object)
+
+
+def regional_emission_factors(regions: Sequence[Optional[str]]) -> np.ndarray:
+    """Vector form of get_indian_regional_emission_factor, resolved once per distinct region"""
+    keys = np.array([(r or "").strip().lower() for r in regions], dtype=object)
+    if keys.shape[0] == 0:
+        return np.empty(0, dtype=np.float64)
+    distinct, inverse = np.unique(keys, return_inverse=True)
+    factors = np.array([get_indian_regional_emission_factor(r or None) for r in distinct], dtype=np.float64)
+    return factors[inverse]
+
+
+def classify_indian_emission_levels(emission_values: np.ndarray) -> np.ndarray:
+    """Vector form of classify_indian_emission_level"""
+    bands = (emission_values >= 50_000).astype(np.int8) + (emission_values >= 500_000).astype(np.int8)
+    return EMISSION_LEVELS[bands]
 
-    # Fallback: try to train quickly if dataset exists
-    from subprocess import run
-    if (ML_DIR / "train.py").exists():
+
+def estimate_ipcc_emissions_batch(
+    year: Sequence[float],
+    coal_production_tons: Sequence[float],
+    energy_consumption_mwh: Sequence[float],
+    methane_emissions_tons: Optional[Sequence[float]] = None,
+    other_ghg_emissions_tons: Optional[Sequence[float]] = None,
+    emission_factor_kgco2_perton: Optional[Sequence[Optional[float]]] = None,
+    region: Optional[Sequence[Optional[str]]] = None,
+) -> Dict:
+    """Column-wise estimate_ipcc_emissions + classify_indian_emission_level for a whole inventory.
+
+    A missing (None/NaN) emission factor falls back to the row's regional factor.
+    """
+    n = len(year)
+    columns = {
+        "year": np.asarray(year, dtype=np.float64),
+        "coal_production_tons": np.asarray(coal_production_tons, dtype=np.float64),
+        "energy_consumption_mwh": np.asarray(energy_consumption_mwh, dtype=np.float64),
+        "methane_emissions_tons": np.zeros(n) if methane_emissions_tons is None else np.asarray(methane_emissions_tons, dtype=np.float64),
+        "other_ghg_emissions_tons": np.zeros(n) if other_ghg_emissions_tons is None else np.asarray(other_ghg_emissions_tons, dtype=np.float64),
+    }
+    if emission_factor_kgco2_perton is None:
+        ef = np.full(n, np.nan)
+    elif isinstance(emission_factor_kgco2_perton, np.ndarray):
+        ef = emission_factor_kgco2_perton.astype(np.float64)
+    else:
+        ef = np.array([np.nan if v is None else v for v in emission_factor_kgco2_perton], dtype=np.float64)
+    regions = [None] * n if region is None else list(region)
+
+    lengths = {name: values.shape[0] for name, values in columns.items()}
+    lengths.update({"emission_factor_kgco2_perton": ef.shape[0], "region": len(regions)})
+    bad_lengths = [name for name, length in lengths.items() if length != n]
+    if bad_lengths:
+        raise ValueError(f"columns must all have {n} entries: {', '.join(bad_lengths)}")
+
+    for name, values in columns.items():
+        if name == "year":
+            invalid = ~((values >= 2000) & (values <= 2100))
+        else:
+            invalid = ~(values >= 0)
+        if invalid.any():
+            raise ValueError(f"{name}[{int(np.argmax(invalid))}] is out of range")
+    if (ef < 0).any():
+        raise ValueError(f"emission_factor_kgco2_perton[{int(np.argmax(ef < 0))}] is out of range")
+
+    ef = np.where(np.isnan(ef), regional_emission_factors(regions), ef)
+    # Same arithmetic as estimate_ipcc_emissions, one array op per term
+    totals = (
+        columns["coal_production_tons"] * ef / 1000.0
+        + columns["energy_consumption_mwh"] * INDIAN_GRID_FACTOR_TCO2_PER_MWH
+        + columns["methane_emissions_tons"]
+        + columns["other_ghg_emissions_tons"]
+    )
+    levels = classify_indian_emission_levels(totals)
+
+    return {
+        "count": n,
+        "year": columns["year"].astype(np.int64).tolist(),
+        "region": [r.strip().lower() if r else None for r in regions],
+        "emission_factor_kgco2_perton": ef.tolist(),
+        "total_emissions_tco2e": totals.tolist(),
+        "emission_level": levels.tolist(),
+        "indian_grid_factor_tco2_per_mwh": INDIAN_GRID_FACTOR_TCO2_PER_MWH,
+        "summary": {
+            "total_emissions_tco2e": float(totals.sum()),
+            "rows_by_level": {level: int((levels == level).sum()) for level in EMISSION_LEVELS},
+        },
+    }
+
+
+def get_dataset_cache() -> DatasetCache:
+    return _lazy("_dataset_cache", _build_dataset_cache)
+
+
+def get_dataset_snapshot() -> Optional[DatasetSnapshot]:
+    # Parsed once per CSV version; None when the history is missing or unreadable
+    return get_dataset_cache().get()
+
+
+def get_job_queue() -> JobQueue:
+    return _lazy("_job_queue", _build_job_queue)
+
+
+def request_training() -> Tuple[Job, bool]:
+    """Queue a background training run unless one is queued, running or recently failed"""
+    return get_job_queue().enqueue("train", cooldown_s=TRAIN_RETRY_AFTER_S)
+
+
+def query_history(year_min: Optional[int] = None, year_max: Optional[int] = None,
+                  regions: Optional[Sequence[str]] = None, group_by: Sequence[str] = ("year",),
+                  metrics: Sequence[str] = ("total_emissions_tco2e",), agg: str = "sum") -> List[Dict]:
+    """Aggregates of the stored history (see ml/datastore.py); ValueError on unknown names,
+    FileNotFoundError when there is no store"""
+    # Brings the store up to date with the seed CSV, at most once per check interval
+    get_dataset_cache().get()
+    datastore = _get_datastore()
+    if datastore is None or not DATASTORE_PATH.exists():
+        raise FileNotFoundError("History store not available")
+    return datastore.query_history(
+        DATASTORE_PATH, year_min=year_min, year_max=year_max, regions=regions,
+        group_by=group_by, metrics=metrics, agg=agg,
+    )
+
+
+def load_or_train_model() -> Tuple[object, List[str]]:
+    # Served from the process-wide registry; the artifact is only re-read when it changes
+    try:
+        return get_model_registry().get()
+    except FileNotFoundError:
+        # Train in the background; callers serve the heuristic path until the model is published
         try:
-            run(["python", str(ML_DIR / "train.py")], check=False)
+            request_training()
         except Exception:
             pass
-        if MODEL_PATH.exists():
-            model = joblib.load(MODEL_PATH)
-            feature_columns = [
-                "Year",
-                "Coal_Production_Tons",
-                "Energy_Consumption_MWh",
-                "Emission_Factor_kgCO2_perTon",
-                "Methane_Emissions_tons",
-                "Other_GHG_Emissions_tons",
-            ]
-            return model, feature_columns
-    raise FileNotFoundError("Model not found. Run ml/train.py to create model.pkl")
+        raise
+
+
+def _history(snapshot: DatasetSnapshot, region: Optional[str]):
+    # The whole dataset, or one region's rows; both expose .stats and .base_at
+    return snapshot if region is None else snapshot.by_region[region]
+
+
+def _forecast_base(start_year: int, region: Optional[str] = None) -> TrajectoryBase:
+    snapshot = get_dataset_snapshot()
+    if snapshot is None:
+        return TrajectoryBase(
+            base_prod=1.0, base_energy=1.0, ef=2000.0, ch4=0.0, other=0.0,
+            default_prod_growth=0.01, default_energy_growth=0.0,
+        )
+    history = _history(snapshot, region)
+    st = history.stats
+    base_prod, base_energy = st.base_prod, st.base_energy
+    # Seed base at the chosen start_year if historical data spans it
+    seeded = history.base_at(start_year)
+    if seeded is not None:
+        base_prod, base_energy = seeded
+    return TrajectoryBase(
+        base_prod=base_prod,
+        base_energy=base_energy,
+        ef=st.ef,
+        ch4=st.ch4,
+        other=st.other,
+        prod_cagr=st.prod_cagr,
+        energy_cagr=st.energy_cagr,
+        prod_slope=st.prod_slope,
+        energy_slope=st.energy_slope,
+        default_prod_growth=0.01,  # 1% per year to avoid flat line
+        default_energy_growth=0.0,  # keep flat if no info
+    )
+
+
+def _heuristic_base(region: Optional[str] = None) -> TrajectoryBase:
+    snapshot = get_dataset_snapshot()
+    if snapshot is None:
+        return TrajectoryBase(base_prod=650_000_000.0, base_energy=800_000.0, ef=2000.0, ch4=10_000.0, other=6_000.0)
+    st = _history(snapshot, region).stats
+    return TrajectoryBase(
+        base_prod=st.base_prod,
+        base_energy=st.base_energy,
+        ef=st.ef,
+        ch4=st.ch4,
+        other=st.other,
+        prod_cagr=st.prod_cagr,
+        energy_cagr=st.energy_cagr,
+    )
+
+
+def _series(years: np.ndarray, values: np.ndarray) -> List[Dict[str, float]]:
+    return [
+        {"year": int(year), "predicted_total_emissions_tco2e": float(value)}
+        for year, value in zip(years.tolist(), values.tolist())
+    ]
+
+
+class ForecastScenario(NamedTuple):
+    start_year: int
+    end_year: int
+    override_production: Optional[float] = None
+    override_energy: Optional[float] = None
+    # Forecast from this region's history alone (a key of DatasetSnapshot.by_region)
+    region: Optional[str] = None
+
+
+def forecast_regions(region: Optional[str]) -> Optional[List[str]]:
+    """Regions a forecast request covers: None for the national series, every region for "all".
+
+    Raises ValueError for a region the loaded dataset has no history for.
+    """
+    if region is None or not region.strip():
+        return None
+    snapshot = get_dataset_snapshot()
+    known = sorted(snapshot.by_region) if snapshot is not None else []
+    key = region.strip().lower()
+    if key == "all" and known:
+        return known
+    if key not in known:
+        raise ValueError(f"unknown region {region!r}; known regions: {', '.join(known) or 'none loaded'}")
+    return [key]
+
+
+def regional_scenarios(
+    start_year: int,
+    end_year: int,
+    regions: Sequence[str],
+    override_production: Optional[float] = None,
+    override_energy: Optional[float] = None,
+) -> List[ForecastScenario]:
+    """One scenario per region. Across several regions an override is a combined target, split
+    in proportion to each region's base at start_year so the regional paths add up to it."""
+    if len(regions) == 1:
+        return [ForecastScenario(start_year, end_year, override_production, override_energy, regions[0])]
+    bases = [_forecast_base(start_year, region) for region in regions]
+
+    def split(total: Optional[float], values: List[float]) -> List[Optional[float]]:
+        if total is None:
+            return [None] * len(values)
+        weights = np.maximum(np.asarray(values, dtype=np.float64), 0.0)
+        weights = weights / weights.sum() if weights.sum() > 0 else np.full(len(values), 1.0 / len(values))
+        return (total * weights).tolist()
+
+    prods = split(override_production, [b.base_prod for b in bases])
+    energies = split(override_energy, [b.base_energy for b in bases])
+    return [
+        ForecastScenario(start_year, end_year, p, e, region)
+        for region, p, e in zip(regions, prods, energies)
+    ]
+
+
+def sum_series(series: Sequence[List[Dict[str, float]]]) -> List[Dict[str, float]]:
+    """Year-by-year total of forecasts over the same year range"""
+    if not series:
+        return []
+    totals = np.sum([[p["predicted_total_emissions_tco2e"] for p in s] for s in series], axis=0)
+    return [
+        {"year": p["year"], "predicted_total_emissions_tco2e": float(total)}
+        for p, total in zip(series[0], totals.tolist())
+    ]
+
+
+def _scenario_blocks(scenarios: Sequence[ForecastScenario], base_for) -> List[Tuple[List[int], np.ndarray]]:
+    # Scenarios sharing a year range and a region share one feature build
+    groups: Dict[Tuple[int, int, Optional[str]], List[int]] = {}
+    for i, sc in enumerate(scenarios):
+        groups.setdefault((sc.start_year, sc.end_year, sc.region), []).append(i)
+    blocks: List[Tuple[List[int], np.ndarray]] = []
+    for (start_year, end_year, region), members in groups.items():
+        X = build_feature_matrices(
+            base_for(start_year, region),
+            start_year,
+            end_year,
+            [scenarios[i].override_production for i in members],
+            [scenarios[i].override_energy for i in members],
+        )
+        blocks.append((members, X))
+    return blocks
+
+
+def predict_batch(
+    model: object,
+    feature_columns: List[str],
+    scenarios: Sequence[ForecastScenario],
+) -> List[List[Dict[str, float]]]:
+    """Forecast any mix of scenarios with a single model.predict over the stacked feature rows"""
+    if not scenarios:
+        return []
+    blocks = _scenario_blocks(scenarios, _forecast_base)
+    num_features = blocks[0][1].shape[-1]
+    stacked = np.concatenate([X.reshape(-1, num_features) for _, X in blocks])
+    with MODEL_PREDICT_SECONDS.time():
+        y_all = np.asarray(model.predict(stacked), dtype=np.float64)
+    MODEL_PREDICT_ROWS.inc(amount=stacked.shape[0])
+
+    results: List[List[Dict[str, float]]] = [[] for _ in scenarios]
+    offset = 0
+    for members, X in blocks:
+        num_scenarios, num_years, _ = X.shape
+        y_pred = y_all[offset:offset + num_scenarios * num_years].reshape(num_scenarios, num_years)
+        offset += num_scenarios * num_years
+        # If the model outputs a flat series (common with weak Year signal),
+        # fall back to a physics-based estimate that reflects year-by-year inputs.
+        flat = flat_series(y_pred)
+        if flat.any():
+            y_pred = np.where(flat[:, None], physics_totals(X), y_pred)
+            FORECAST_SERIES.inc("physics", amount=int(flat.sum()))
+        if not flat.all():
+            FORECAST_SERIES.inc("model", amount=int((~flat).sum()))
+        for j, i in enumerate(members):
+            results[i] = _series(X[j, :, YEAR], y_pred[j])
+    return results
+
+
+def predict_scenarios(
+    model: object,
+    feature_columns: List[str],
+    start_year: int,
+    end_year: int,
+    overrides: Sequence[Tuple[Optional[float], Optional[float]]],
+) -> List[List[Dict[str, float]]]:
+    """Forecast several (production, energy) override scenarios with one feature build and one predict call"""
+    return predict_batch(model, feature_columns, [ForecastScenario(start_year, end_year, p, e) for p, e in overrides])
 
 
 def predict_years(
@@ -101,164 +491,25 @@ def predict_years(
     override_energy: Optional[float] = None,
 ) -> List[Dict[str, float]]:
     # Build a per-year trajectory using recent growth rates or smooth interpolation
-    csv_path = DATA_DIR / "coal_emissions.csv"
-    base_prod, base_energy, ef, ch4, other = 1.0, 1.0, 2000.0, 0.0, 0.0
-    prod_cagr, energy_cagr = 0.0, 0.0
+    return predict_scenarios(model, feature_columns, start_year, end_year, [(override_production, override_energy)])[0]
 
-    hist: List[Dict[str, str]] = []
-    if csv_path.exists():
-        try:
-            with open(csv_path, newline="", encoding="utf-8") as f:
-                reader = csv.DictReader(f)
-                hist = [r for r in reader]
-                hist.sort(key=lambda r: int(r["Year"]))
-                last = hist[-1]
-                base_prod = float(last.get("Coal_Production_Tons", base_prod))
-                base_energy = float(last.get("Energy_Consumption_MWh", base_energy))
-                ef = float(last.get("Emission_Factor_kgCO2_perTon", ef))
-                ch4 = float(last.get("Methane_Emissions_tons", ch4))
-                other = float(last.get("Other_GHG_Emissions_tons", other))
-
-                # Compute CAGR over last up-to-5 years for stability
-                if len(hist) >= 2:
-                    window = hist[-5:] if len(hist) >= 5 else hist
-                    first = window[0]
-                    years_span = max(1, int(window[-1]["Year"]) - int(window[0]["Year"]))
-                    p0 = max(1e-6, float(first.get("Coal_Production_Tons", base_prod)))
-                    p1 = max(1e-6, float(window[-1].get("Coal_Production_Tons", base_prod)))
-                    e0 = max(1e-6, float(first.get("Energy_Consumption_MWh", base_energy)))
-                    e1 = max(1e-6, float(window[-1].get("Energy_Consumption_MWh", base_energy)))
-                    try:
-                        prod_cagr = (p1 / p0) ** (1.0 / years_span) - 1.0
-                    except Exception:
-                        prod_cagr = 0.0
-                    try:
-                        energy_cagr = (e1 / e0) ** (1.0 / years_span) - 1.0
-                    except Exception:
-                        energy_cagr = 0.0
-                # Compute simple linear trend (slope per year) as fallback when CAGR ~ 0
-                try:
-                    n = len(hist)
-                    if n >= 2:
-                        sum_x = sum(int(r["Year"]) for r in hist)
-                        sum_x2 = sum(int(r["Year"]) ** 2 for r in hist)
-                        sum_py = sum(float(r.get("Coal_Production_Tons", base_prod)) for r in hist)
-                        sum_ey = sum(float(r.get("Energy_Consumption_MWh", base_energy)) for r in hist)
-                        sum_xpy = sum(int(r["Year"]) * float(r.get("Coal_Production_Tons", base_prod)) for r in hist)
-                        sum_xey = sum(int(r["Year"]) * float(r.get("Energy_Consumption_MWh", base_energy)) for r in hist)
-                        denom = n * sum_x2 - (sum_x ** 2)
-                        prod_slope = ((n * sum_xpy - sum_x * sum_py) / denom) if denom != 0 else 0.0
-                        energy_slope = ((n * sum_xey - sum_x * sum_ey) / denom) if denom != 0 else 0.0
-                    else:
-                        prod_slope = 0.0
-                        energy_slope = 0.0
-                except Exception:
-                    prod_slope = 0.0
-                    energy_slope = 0.0
-        except Exception:
-            pass
 
-    # Seed base at the chosen start_year if historical data spans it
-    if hist:
-        try:
-            years = [int(r["Year"]) for r in hist]
-            first_year, last_year = years[0], years[-1]
-            if start_year <= last_year and start_year >= first_year:
-                # find exact or interpolate between neighbors
-                before = max((y for y in years if y <= start_year), default=first_year)
-                after = min((y for y in years if y >= start_year), default=last_year)
-                if before == after:
-                    ref = next(r for r in hist if int(r["Year"]) == before)
-                    base_prod = float(ref.get("Coal_Production_Tons", base_prod))
-                    base_energy = float(ref.get("Energy_Consumption_MWh", base_energy))
-                else:
-                    rb = next(r for r in hist if int(r["Year"]) == before)
-                    ra = next(r for r in hist if int(r["Year"]) == after)
-                    w = (start_year - before) / (after - before)
-                    bp = float(rb.get("Coal_Production_Tons", base_prod))
-                    ap = float(ra.get("Coal_Production_Tons", base_prod))
-                    be = float(rb.get("Energy_Consumption_MWh", base_energy))
-                    ae = float(ra.get("Energy_Consumption_MWh", base_energy))
-                    base_prod = (1 - w) * bp + w * ap
-                    base_energy = (1 - w) * be + w * ae
-        except Exception:
-            pass
+def heuristic_predict_batch(scenarios: Sequence[ForecastScenario]) -> List[List[Dict[str, float]]]:
+    results: List[List[Dict[str, float]]] = [[] for _ in scenarios]
+    for members, X in _scenario_blocks(scenarios, lambda start_year, region: _heuristic_base(region)):
+        totals = physics_totals(X)
+        for j, i in enumerate(members):
+            results[i] = _series(X[j, :, YEAR], totals[j])
+    FORECAST_SERIES.inc("heuristic", amount=len(scenarios))
+    return results
 
-    num_years = max(1, end_year - start_year)
-    rows: List[Dict[str, float]] = []
-    for idx, year in enumerate(range(start_year, end_year + 1)):
-        t = idx / num_years if num_years > 0 else 0.0
-
-        # Geometric trajectory to user-provided overrides for curvature
-        if override_production is not None:
-            target_p = max(1e-9, float(override_production))
-            base_p = max(1e-9, float(base_prod))
-            g_p = (target_p / base_p) ** (1.0 / num_years) - 1.0 if num_years > 0 else 0.0
-            prod = base_p * ((1.0 + g_p) ** idx)
-        else:
-            # If CAGR is near zero, prefer linear trend if available; otherwise apply gentle default growth
-            if abs(prod_cagr) < 1e-9:
-                if 'prod_slope' in locals() and abs(prod_slope) > 1e-12:
-                    prod = base_prod + prod_slope * (year - start_year)
-                else:
-                    default_prod_growth = 0.01  # 1% per year to avoid flat line
-                    prod = base_prod * ((1.0 + default_prod_growth) ** idx)
-            else:
-                prod = base_prod * ((1.0 + prod_cagr) ** idx)
-
-        if override_energy is not None:
-            target_e = max(1e-9, float(override_energy))
-            base_e = max(1e-9, float(base_energy))
-            g_e = (target_e / base_e) ** (1.0 / num_years) - 1.0 if num_years > 0 else 0.0
-            energy = base_e * ((1.0 + g_e) ** idx)
-        else:
-            if abs(energy_cagr) < 1e-9:
-                if 'energy_slope' in locals() and abs(energy_slope) > 1e-12:
-                    energy = base_energy + energy_slope * (year - start_year)
-                else:
-                    default_energy_growth = 0.0  # keep flat if no info
-                    energy = base_energy * ((1.0 + default_energy_growth) ** idx)
-            else:
-                energy = base_energy * ((1.0 + energy_cagr) ** idx)
-
-        rows.append({
-            "Year": year,
-            "Coal_Production_Tons": float(prod),
-            "Energy_Consumption_MWh": float(energy),
-            "Emission_Factor_kgCO2_perTon": float(ef),
-            "Methane_Emissions_tons": float(ch4),
-            "Other_GHG_Emissions_tons": float(other),
-        })
 
-    X = [[
-        r["Year"],
-        r["Coal_Production_Tons"],
-        r["Energy_Consumption_MWh"],
-        r["Emission_Factor_kgCO2_perTon"],
-        r["Methane_Emissions_tons"],
-        r["Other_GHG_Emissions_tons"],
-    ] for r in rows]
-    y_pred = model.predict(X)
-
-    # If the model outputs a flat series (common with weak Year signal),
-    # fall back to a physics-based estimate that reflects year-by-year inputs.
-    try:
-        min_y = float(min(y_pred))
-        max_y = float(max(y_pred))
-    except Exception:
-        min_y, max_y = 0.0, 0.0
-
-    # Replace with physics-based if series is nearly flat (very low variance)
-    if (max_y - min_y) < 1e-6 or (len(rows) > 1 and (max_y - min_y) / (abs((max_y + min_y) / 2.0) + 1e-9) < 1e-4):
-        fallback = []
-        for r in rows:
-            co2_from_production_t = float(r["Coal_Production_Tons"]) * float(r["Emission_Factor_kgCO2_perTon"]) / 1000.0
-            electricity_t = float(r["Energy_Consumption_MWh"]) * 0.8
-            total_t = co2_from_production_t + electricity_t + float(r["Methane_Emissions_tons"]) + float(r["Other_GHG_Emissions_tons"])
-            fallback.append(total_t)
-        y_pred = fallback
-
-    return [{"year": int(rows[i]["Year"]), "predicted_total_emissions_tco2e": float(y_pred[i])} for i in range(len(rows))]
+def heuristic_predict_scenarios(
+    start_year: int,
+    end_year: int,
+    overrides: Sequence[Tuple[Optional[float], Optional[float]]],
+) -> List[List[Dict[str, float]]]:
+    return heuristic_predict_batch([ForecastScenario(start_year, end_year, p, e) for p, e in overrides])
 
 
 def heuristic_predict_years(
@@ -267,66 +518,7 @@ def heuristic_predict_years(
     override_production: Optional[float] = None,
     override_energy: Optional[float] = None,
 ) -> List[Dict[str, float]]:
-    csv_path = DATA_DIR / "coal_emissions.csv"
-    base_prod, base_energy, ef, ch4, other = 650_000_000.0, 800_000.0, 2000.0, 10_000.0, 6_000.0
-    prod_cagr, energy_cagr = 0.0, 0.0
-
-    if csv_path.exists():
-        try:
-            with open(csv_path, newline="", encoding="utf-8") as f:
-                reader = csv.DictReader(f)
-                hist = list(reader)
-                hist.sort(key=lambda r: int(r["Year"]))
-                last = hist[-1]
-                base_prod = float(last.get("Coal_Production_Tons", base_prod))
-                base_energy = float(last.get("Energy_Consumption_MWh", base_energy))
-                ef = float(last.get("Emission_Factor_kgCO2_perTon", ef))
-                ch4 = float(last.get("Methane_Emissions_tons", ch4))
-                other = float(last.get("Other_GHG_Emissions_tons", other))
-
-                if len(hist) >= 2:
-                    window = hist[-5:] if len(hist) >= 5 else hist
-                    years_span = max(1, int(window[-1]["Year"]) - int(window[0]["Year"]))
-                    p0 = max(1e-6, float(window[0].get("Coal_Production_Tons", base_prod)))
-                    p1 = max(1e-6, float(window[-1].get("Coal_Production_Tons", base_prod)))
-                    e0 = max(1e-6, float(window[0].get("Energy_Consumption_MWh", base_energy)))
-                    e1 = max(1e-6, float(window[-1].get("Energy_Consumption_MWh", base_energy)))
-                    try:
-                        prod_cagr = (p1 / p0) ** (1.0 / years_span) - 1.0
-                    except Exception:
-                        prod_cagr = 0.0
-                    try:
-                        energy_cagr = (e1 / e0) ** (1.0 / years_span) - 1.0
-                    except Exception:
-                        energy_cagr = 0.0
-        except Exception:
-            pass
-
-    num_years = max(1, end_year - start_year)
-    preds: List[Dict[str, float]] = []
-    for idx, year in enumerate(range(start_year, end_year + 1)):
-        t = idx / num_years if num_years > 0 else 0.0
-        if override_production is not None:
-            target_p = max(1e-9, float(override_production))
-            base_p = max(1e-9, float(base_prod))
-            g_p = (target_p / base_p) ** (1.0 / num_years) - 1.0 if num_years > 0 else 0.0
-            prod = base_p * ((1.0 + g_p) ** idx)
-        else:
-            prod = base_prod * ((1.0 + prod_cagr) ** idx)
-
-        if override_energy is not None:
-            target_e = max(1e-9, float(override_energy))
-            base_e = max(1e-9, float(base_energy))
-            g_e = (target_e / base_e) ** (1.0 / num_years) - 1.0 if num_years > 0 else 0.0
-            energy = base_e * ((1.0 + g_e) ** idx)
-        else:
-            energy = base_energy * ((1.0 + energy_cagr) ** idx)
-
-        co2_from_production_t = prod * ef / 1000.0
-        electricity_t = energy * 0.8
-        total_t = co2_from_production_t + electricity_t + ch4 + other
-        preds.append({"year": year, "predicted_total_emissions_tco2e": float(total_t)})
-    return preds
+    return heuristic_predict_scenarios(start_year, end_year, [(override_production, override_energy)])[0]
 
 
 # ---------------------- Recommendations ----------------------
@@ -342,43 +534,64 @@ class _Recommendation:
     region: Optional[str] = None
 
 
+def get_recommender() -> RecommenderPlugin:
+    return _lazy("_recommender", lambda: RecommenderPlugin(RECOMMENDER_PATH, STRATEGIES_CSV))
+
+
+def _warm_model() -> bool:
+    try:
+        get_model_registry().get()
+    except FileNotFoundError:
+        # Training is still only queued by the first forecast request, as before
+        return False
+    return True
+
+
+def _warm_recommender() -> bool:
+    loaded = get_recommender().get()
+    return loaded.module is not None or bool(loaded.catalogue)
+
+
+# Run in the background from app startup; /ready reports when it is done
+_warmup = Warmup([
+    ("model", _warm_model),
+    ("dataset", lambda: get_dataset_cache().get() is not None),
+    ("recommender", _warm_recommender),
+])
+
+
+def get_warmup() -> Warmup:
+    return _warmup
+
+
+def data_versions() -> Tuple[Optional[str], Optional[str], int]:
+    """(dataset, model, recommender) versions currently served; cache keys include them so a
+    reload of any of the three invalidates derived responses"""
+    snapshot = get_dataset_cache().get()
+    registry = get_model_registry()
+    try:
+        # Within the check interval this is a dict lookup; otherwise a stat
+        registry.get()
+    except Exception:
+        pass
+    return (
+        snapshot.version if snapshot is not None else None,
+        registry.version,
+        get_recommender().version,
+    )
+
+
 def _load_static_strategies() -> List[Dict]:
-    rows: List[Dict] = []
-    if STRATEGIES_CSV.exists():
-        try:
-            with open(STRATEGIES_CSV, newline="", encoding="utf-8") as f:
-                reader = csv.DictReader(f)
-                for r in reader:
-                    try:
-                        rows.append({
-                            "strategy": r.get("strategy", ""),
-                            "category": r.get("category", ""),
-                            "impact_level": r.get("impact_level", "Medium"),
-                            "estimated_reduction_tco2e": float(r.get("estimated_reduction_tco2e", 0) or 0),
-                            "description": r.get("description", ""),
-                            "sector": r.get("sector") or None,
-                        })
-                    except Exception:
-                        continue
-        except Exception:
-            pass
-    return rows
+    # Parsed once per strategies.csv version by the recommender plugin
+    return get_recommender().catalogue
 
 
 def _rank_with_ml(sector: str, emission_value: float, region: Optional[str]) -> Optional[List[Dict]]:
-    # Dynamically import and use ml/recommend.py if present
+    # Use ml/recommend.py if present; the module is imported once and reloaded only when it changes
     try:
-        import importlib.util
-        if RECOMMENDER_PATH.exists():
-            spec = importlib.util.spec_from_file_location("ml_recommend", str(RECOMMENDER_PATH))
-            if spec and spec.loader:
-                mod = importlib.util.module_from_spec(spec)
-                spec.loader.exec_module(mod)
-                if hasattr(mod, "recommend_strategies"):
-                    return mod.recommend_strategies(sector=sector, emission_value=emission_value, region=region)
+        return get_recommender().recommend(sector=sector, emission_value=emission_value, region=region)
     except Exception:
         return None
-    return None
 
 
 def generate_recommendations(sector: str, emission_value: float, region: Optional[str]) -> List[Dict]:
@@ -443,11 +656,12 @@ def generate_recommendations(sector: str, emission_value: float, region: Optiona
             base += 0.5
         return base
 
-    ranked_rows = sorted(static_rows, key=score, reverse=True)
+    # Top 10 in stable score order without sorting the whole catalogue
+    ranked_rows = heapq.nlargest(10, static_rows, key=score)
 
     # Calibrate estimated reduction to user's emission_value if not absolute
     output: List[Dict] = []
-    for r in ranked_rows[:10]:
+    for r in ranked_rows:
         est = float(r.get("estimated_reduction_tco2e", 0) or 0)
         # If value seems like a ratio (<=1), scale by emissions; else assume absolute tCO2e
         estimated = est * emission_value if est <= 1 else est
@@ -526,6 +740,53 @@ def legacy_calculate_emissions(payload: dict) -> dict:
     }
 
 
+def legacy_calculate_emissions_batch(
+    excavation: np.ndarray,
+    transportation: np.ndarray,
+    fuel: np.ndarray,
+    equipment: np.ndarray,
+    workers: np.ndarray,
+    output: np.ndarray,
+    fuel_type: Sequence[str],
+    reduction: np.ndarray,
+) -> Dict[str, np.ndarray]:
+    """Column-wise legacy_calculate_emissions; returns one array per result key"""
+    workers = np.maximum(1.0, np.trunc(workers))
+    output = np.maximum(1.0, output)
+
+    excavation_emissions = excavation * EXCAVATION_FACTOR
+    transportation_emissions = transportation * TRANSPORTATION_FACTOR * 0.5
+    equipment_emissions = equipment * EQUIPMENT_FACTOR
+    total_emissions = excavation_emissions + transportation_emissions + equipment_emissions
+
+    # Resolve the fuel factor once per distinct fuel type
+    distinct, inverse = np.unique(np.asarray(fuel_type, dtype=object).astype(str), return_inverse=True)
+    factors = np.array([EMISSION_FACTORS.get(f, COAL_CO2_EMISSION_FACTOR_TON_PER_TON) for f in distinct], dtype=np.float64)
+    fuel_emissions = fuel * factors[inverse.reshape(-1)]
+    total = output * COAL_CO2_EMISSION_FACTOR_TON_PER_TON + fuel_emissions
+    carboncredits = total - reduction
+
+    return {
+        'totalEmissions': total_emissions,
+        'excavationEmissions': excavation_emissions,
+        'transportationEmissions': transportation_emissions,
+        'equipmentEmissions': equipment_emissions,
+        'excavationPerCapita': excavation_emissions / workers,
+        'transportationPerCapita': transportation_emissions / workers,
+        'equipmentPerCapita': equipment_emissions / workers,
+        'excavationPerOutput': excavation_emissions / output,
+        'transportationPerOutput': transportation_emissions / output,
+        'equipmentPerOutput': equipment_emissions / output,
+        'perCapitaEmissions': total_emissions / workers,
+        'perOutputEmissions': total_emissions / output,
+        'baseline': total,
+        'carboncredits': carboncredits,
+        'reduced': reduction,
+        'worth': carboncredits * 42,
+        'total': total,
+    }
+
+
 def legacy_neutralise(payload: dict) -> dict:
     EV_CONSTANT = 0.20
     GREEN_FUEL_CONSTANT = 0.50
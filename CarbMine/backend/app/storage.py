@@ -1,33 +1,186 @@
+import base64
 import os
+from datetime import datetime
 from pathlib import Path
-from typing import Dict
+from typing import List, Optional, Tuple
 from fastapi import UploadFile
-from sqlalchemy.orm import Session
-from .models import PdfReport
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from .models import PdfBlob, PdfReport
 from .schemas import PdfReportOut
+from .uploads import DEFAULT_PAGE_SIZE, LOCAL_STORAGE_DIR, StoredUpload, blob_path, blob_relpath, save_upload
 
 
-LOCAL_STORAGE_DIR = Path(__file__).resolve().parents[1] / "storage"
-LOCAL_STORAGE_DIR.mkdir(parents=True, exist_ok=True)
+def report_relpath(report: PdfReport) -> str:
+    """Path of a report's PDF under /uploads"""
+    if report.blob_sha256:
+        return blob_relpath(report.blob_sha256)
+    return report.filename
 
 
-def store_pdf_and_metadata(uid: str, file: UploadFile, session: Session) -> PdfReportOut:
+# Cross-process safety of blob files rests on the database: an upload places its file only after
+# its ref-count statement has taken the write lock on the blob (SQLite's database write lock, an
+# InnoDB row or gap lock), and a file is only unlinked under that same lock after re-checking that
+# no row references it. Per-process locks would not help with `uvicorn --workers N`.
+
+
+async def _acquire_blob(session: AsyncSession, sha256: str, size_bytes: int) -> bool:
+    """Add a reference to the blob, creating its row if needed; True when the row was created"""
+    result = await session.execute(
+        update(PdfBlob).where(PdfBlob.sha256 == sha256).values(ref_count=PdfBlob.ref_count + 1)
+    )
+    if result.rowcount:
+        return False
+    session.add(PdfBlob(sha256=sha256, size_bytes=size_bytes, ref_count=1))
+    return True
+
+
+def _place_blob(tmp_path: Path, dest: Path) -> None:
+    # Always our own copy: an existing file may be about to be unlinked by a delete that committed
+    # before our reference did. Same digest, same bytes, so replacing it is harmless
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(tmp_path, dest)
+
+
+async def _unlink_if_unreferenced(session: AsyncSession, sha256: str) -> bool:
+    """Remove the blob file if no row references it; True when it was removed"""
+    # No-op write for the lock uploads take in _acquire_blob
+    await session.execute(
+        update(PdfBlob).where(PdfBlob.sha256 == sha256).values(ref_count=PdfBlob.ref_count)
+    )
+    referenced = (await session.execute(select(PdfBlob.sha256).where(PdfBlob.sha256 == sha256))).first()
+    try:
+        if referenced is None:
+            await run_in_threadpool(blob_path(sha256).unlink, missing_ok=True)
+    finally:
+        await session.commit()
+    return referenced is None
+
+
+async def commit_blob(session: AsyncSession, stored: StoredUpload, report: PdfReport) -> Tuple[PdfReport, bool]:
+    """Reference (or create) the blob for `stored`, move the spooled file to its content address
+    and save `report`, in that order within one transaction. Returns the saved report and whether
+    the content was already stored."""
+    created = False
+    try:
+        try:
+            created = await _acquire_blob(session, stored.sha256, stored.size_bytes)
+            session.add(report)
+            await session.flush()
+        except IntegrityError:
+            # Another process inserted the same blob row first
+            await session.rollback()
+            created = await _acquire_blob(session, stored.sha256, stored.size_bytes)
+            session.add(report)
+            await session.flush()
+        await run_in_threadpool(_place_blob, stored.path, blob_path(stored.sha256))
+        await session.commit()
+    except BaseException:
+        stored.path.unlink(missing_ok=True)
+        if created:
+            # Our file may be in place with no committed row behind it
+            try:
+                await session.rollback()
+                await _unlink_if_unreferenced(session, stored.sha256)
+            except Exception:
+                pass
+        raise
+    return report, not created
+
+
+async def delete_report(session: AsyncSession, report: PdfReport) -> bool:
+    """Delete a report and drop its blob reference; returns True when the blob itself was removed"""
+    sha256 = report.blob_sha256
+    await session.delete(report)
+    removed = False
+    if sha256:
+        await session.execute(
+            update(PdfBlob).where(PdfBlob.sha256 == sha256).values(ref_count=PdfBlob.ref_count - 1)
+        )
+        result = await session.execute(
+            delete(PdfBlob).where(PdfBlob.sha256 == sha256, PdfBlob.ref_count <= 0)
+        )
+        removed = bool(result.rowcount)
+    await session.commit()
+    if removed:
+        # An upload may have re-created the row since the commit; it then owns the file
+        removed = await _unlink_if_unreferenced(session, sha256)
+    elif not sha256:
+        # Pre-content-addressing file, owned by this report alone
+        await run_in_threadpool((LOCAL_STORAGE_DIR / report.filename).unlink, missing_ok=True)
+    return removed
+
+
+def encode_cursor(created_at: Optional[datetime], report_id: int) -> str:
+    raw = f"{created_at.isoformat() if created_at else ''}|{report_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], int]:
+    """Inverse of encode_cursor; raises ValueError on anything it did not produce"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        stamp, report_id = raw.rsplit("|", 1)
+        return (datetime.fromisoformat(stamp) if stamp else None), int(report_id)
+    except Exception:
+        raise ValueError("Invalid cursor") from None
+
+
+# Columns needed to render a report listing; selected directly instead of hydrating PdfReport
+_LISTING_COLUMNS = (
+    PdfReport.id,
+    PdfReport.uid,
+    PdfReport.filename,
+    PdfReport.size_bytes,
+    PdfReport.created_at,
+    PdfReport.blob_sha256,
+)
+
+
+async def fetch_report_page(session: AsyncSession, uid: str, limit: int = DEFAULT_PAGE_SIZE,
+                            cursor: Optional[str] = None) -> Tuple[List, Optional[str]]:
+    """One page of a user's reports, newest first, and the cursor of the next page (None at the end).
+
+    Keyset pagination over (created_at, id): each page is a range scan of the
+    (uid, created_at, id) index, so its cost does not grow with how deep the client has paged.
+    """
+    query = select(*_LISTING_COLUMNS).where(PdfReport.uid == uid)
+    if cursor:
+        created_at, report_id = decode_cursor(cursor)
+        if created_at is None:
+            query = query.where(PdfReport.created_at.is_(None), PdfReport.id < report_id)
+        else:
+            query = query.where(or_(
+                PdfReport.created_at < created_at,
+                and_(PdfReport.created_at == created_at, PdfReport.id < report_id),
+                # NULLs sort last in a descending scan on both SQLite and MySQL
+                PdfReport.created_at.is_(None),
+            ))
+    query = query.order_by(PdfReport.created_at.desc(), PdfReport.id.desc()).limit(limit + 1)
+    rows = (await session.execute(query)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return rows, next_cursor
+
+
+async def store_pdf_and_metadata(uid: str, file: UploadFile, session: AsyncSession) -> PdfReportOut:
     # In real deployment: if Firebase configured, upload to Firebase Storage.
-    # Fallback: local storage
-    dest = LOCAL_STORAGE_DIR / file.filename
-    content = file.file.read()
-    with open(dest, "wb") as f:
-        f.write(content)
+    # Fallback: local content-addressed storage, one file per distinct PDF
+    filename = Path(file.filename).name
+    stored = await save_upload(file)
 
     report = PdfReport(
         uid=uid,
-        filename=file.filename,
-        url=str(dest.resolve()),
-        size_bytes=len(content),
+        filename=filename,
+        url=str(blob_path(stored.sha256).resolve()),
+        size_bytes=stored.size_bytes,
+        blob_sha256=stored.sha256,
     )
-    session.add(report)
-    session.commit()
-    session.refresh(report)
-    return PdfReportOut.from_orm(report)
-
-
+    report, _ = await commit_blob(session, stored, report)
+    out = PdfReportOut.from_orm(report)
+    out.sha256 = stored.sha256
+    return out
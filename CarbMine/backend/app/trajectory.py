@@ -0,0 +1,108 @@
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+import numpy as np
+
+
+# Column order of the feature matrix; matches model_registry.FEATURE_COLUMNS
+YEAR, PROD, ENERGY, EF, CH4, OTHER = range(6)
+NUM_FEATURES = 6
+
+# Grid factor used by the physics-based fallback series (tCO2/MWh)
+FALLBACK_GRID_FACTOR = 0.8
+
+
+@dataclass(frozen=True)
+class TrajectoryBase:
+    base_prod: float
+    base_energy: float
+    ef: float
+    ch4: float
+    other: float
+    prod_cagr: float = 0.0
+    energy_cagr: float = 0.0
+    # Linear trend used when the CAGR is ~0; None disables it
+    prod_slope: Optional[float] = None
+    energy_slope: Optional[float] = None
+    # Growth applied when neither CAGR nor slope carries signal; None always follows the CAGR
+    default_prod_growth: Optional[float] = None
+    default_energy_growth: Optional[float] = None
+
+
+def _trend_path(base: float, cagr: float, slope: Optional[float], default_growth: Optional[float],
+                idx: np.ndarray) -> np.ndarray:
+    if abs(cagr) < 1e-9 and (slope is not None or default_growth is not None):
+        # If CAGR is near zero, prefer linear trend if available; otherwise apply the default growth
+        if slope is not None and abs(slope) > 1e-12:
+            return base + slope * idx
+        if default_growth is not None:
+            return base * ((1.0 + default_growth) ** idx)
+    return base * ((1.0 + cagr) ** idx)
+
+
+def _paths(base: float, trend: np.ndarray, targets: np.ndarray, idx: np.ndarray, num_years: int) -> np.ndarray:
+    # Geometric trajectory from base to each scenario's override; NaN targets follow the trend
+    missing = np.isnan(targets)
+    base_p = max(1e-9, float(base))
+    safe_targets = np.maximum(1e-9, np.where(missing, base_p, targets))
+    growth = (safe_targets / base_p) ** (1.0 / num_years) - 1.0
+    paths = base_p * ((1.0 + growth)[:, None] ** idx[None, :])
+    return np.where(missing[:, None], trend[None, :], paths)
+
+
+def _targets(overrides: Sequence[Optional[float]]) -> np.ndarray:
+    return np.array([np.nan if v is None else float(v) for v in overrides], dtype=np.float64)
+
+
+def build_feature_matrices(
+    base: TrajectoryBase,
+    start_year: int,
+    end_year: int,
+    override_production: Sequence[Optional[float]],
+    override_energy: Sequence[Optional[float]],
+) -> np.ndarray:
+    """Feature tensor of shape (scenarios, years, NUM_FEATURES) for one year range"""
+    if len(override_production) != len(override_energy):
+        raise ValueError("override_production and override_energy must have the same length")
+    num_scenarios = len(override_production)
+    num_years = max(1, end_year - start_year)
+    idx = np.arange(end_year - start_year + 1, dtype=np.float64)
+
+    prod_trend = _trend_path(base.base_prod, base.prod_cagr, base.prod_slope, base.default_prod_growth, idx)
+    energy_trend = _trend_path(base.base_energy, base.energy_cagr, base.energy_slope, base.default_energy_growth, idx)
+
+    X = np.empty((num_scenarios, idx.shape[0], NUM_FEATURES), dtype=np.float64)
+    X[:, :, YEAR] = start_year + idx
+    X[:, :, PROD] = _paths(base.base_prod, prod_trend, _targets(override_production), idx, num_years)
+    X[:, :, ENERGY] = _paths(base.base_energy, energy_trend, _targets(override_energy), idx, num_years)
+    X[:, :, EF] = base.ef
+    X[:, :, CH4] = base.ch4
+    X[:, :, OTHER] = base.other
+    return X
+
+
+def build_feature_matrix(
+    base: TrajectoryBase,
+    start_year: int,
+    end_year: int,
+    override_production: Optional[float] = None,
+    override_energy: Optional[float] = None,
+) -> np.ndarray:
+    return build_feature_matrices(base, start_year, end_year, [override_production], [override_energy])[0]
+
+
+def physics_totals(X: np.ndarray, grid_factor: float = FALLBACK_GRID_FACTOR) -> np.ndarray:
+    # CO2 from production (kg/t → t) + electricity + methane + other GHG, along the last axis
+    return X[..., PROD] * X[..., EF] / 1000.0 + X[..., ENERGY] * grid_factor + X[..., CH4] + X[..., OTHER]
+
+
+def flat_series(y: np.ndarray) -> np.ndarray:
+    """Per-series flag (last axis) for predictions too flat to be informative"""
+    y = np.asarray(y, dtype=np.float64)
+    if y.shape[-1] == 0:
+        return np.ones(y.shape[:-1], dtype=bool)
+    min_y = y.min(axis=-1)
+    max_y = y.max(axis=-1)
+    spread = max_y - min_y
+    relative = spread / (np.abs((max_y + min_y) / 2.0) + 1e-9)
+    return (spread < 1e-6) | ((y.shape[-1] > 1) & (relative < 1e-4))
@@ -0,0 +1,148 @@
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from fastapi import HTTPException, UploadFile
+from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response
+from starlette.types import ASGIApp, Receive, Scope, Send
+from .metrics import UPLOAD_BYTES
+
+# The file side of report storage. Nothing here touches the database, so app.main can import it
+# without loading SQLAlchemy; the rows live in app/storage.py
+
+
+LOCAL_STORAGE_DIR = Path(os.getenv("LOCAL_STORAGE_DIR", str(Path(__file__).resolve().parents[1] / "storage")))
+LOCAL_STORAGE_DIR.mkdir(parents=True, exist_ok=True)
+# PDFs keyed by SHA-256, shared by every report with the same content
+BLOB_DIR = LOCAL_STORAGE_DIR / "blobs"
+
+# Largest accepted PDF upload; requests above this are rejected before the body is read
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(25 * 1024 * 1024)))
+# Bytes moved per read/write while copying an upload to disk
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+# Multipart framing allowance on top of MAX_UPLOAD_BYTES for the raw request size check
+UPLOAD_OVERHEAD_BYTES = 64 * 1024
+
+UPLOAD_PATHS = {"/upload_pdf", "/jobs/ingest"}
+
+# Page size bounds for /fetch_pdfs
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+@dataclass
+class StoredUpload:
+    path: Path
+    size_bytes: int
+    sha256: str
+
+
+def _too_large() -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Upload exceeds {MAX_UPLOAD_BYTES} bytes")
+
+
+class UploadLimitMiddleware:
+    """Rejects oversized uploads early: by Content-Length before any body is read, and by counting
+    bytes as they arrive for chunked requests, so an oversized body is never spooled in full."""
+
+    def __init__(self, app: ASGIApp, max_body_bytes: int = MAX_UPLOAD_BYTES + UPLOAD_OVERHEAD_BYTES):
+        self.app = app
+        self.max_body_bytes = max_body_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] not in UPLOAD_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                try:
+                    declared = int(value)
+                except ValueError:
+                    declared = 0
+                if declared > self.max_body_bytes:
+                    await _send_413(send)
+                    return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_bytes:
+                    # Re-raised by FastAPI's body parsing and rendered as a 413
+                    raise _too_large()
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+async def _send_413(send: Send) -> None:
+    body = b'{"detail":"Upload exceeds %d bytes"}' % MAX_UPLOAD_BYTES
+    await send({
+        "type": "http.response.start",
+        "status": 413,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def _write_chunk(out, digest, chunk: bytes) -> None:
+    digest.update(chunk)
+    out.write(chunk)
+
+
+def blob_relpath(sha256: str) -> str:
+    # Two-character fan-out keeps directories small
+    return f"blobs/{sha256[:2]}/{sha256}.pdf"
+
+
+def blob_path(sha256: str) -> Path:
+    return LOCAL_STORAGE_DIR / blob_relpath(sha256)
+
+
+async def save_upload(file: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES) -> StoredUpload:
+    """Spool an upload to a temp file in BLOB_DIR in fixed-size chunks, hashing and size-checking
+    on the fly. Disk writes run in the threadpool so the event loop stays free.
+
+    The returned path is the temp file; commit_blob() moves it to its content address.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    BLOB_DIR.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=str(BLOB_DIR), prefix=".upload-", suffix=".part")
+    tmp_path = Path(tmp_name)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise _too_large()
+                await run_in_threadpool(_write_chunk, out, digest, chunk)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    UPLOAD_BYTES.observe(size)
+    return StoredUpload(path=tmp_path, size_bytes=size, sha256=digest.hexdigest())
+
+
+class UploadsStaticFiles(StaticFiles):
+    """StaticFiles for /uploads that marks content-addressed blobs as immutable.
+
+    A blob's path is its SHA-256, so its bytes can never change; clients and proxies may cache
+    it for a year without revalidating.
+    """
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        response = await super().get_response(path, scope)
+        if response.status_code in (200, 304) and path.replace(os.sep, "/").startswith("blobs/"):
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
@@ -0,0 +1,78 @@
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "1") not in ("0", "false", "no")
+
+
+@dataclass
+class WarmupStep:
+    name: str
+    # pending, running, loaded, missing (nothing to load yet) or failed
+    state: str = "pending"
+    seconds: Optional[float] = None
+    error: Optional[str] = None
+
+
+class Warmup:
+    """Loads the per-process caches on a background thread at startup, so the first requests do
+    not pay for it. Each step returns False when there is nothing to load yet (no trained model,
+    say), which the API already handles with its fallbacks.
+
+    Readiness means every step has run, whatever its outcome: a missing or broken artifact is not
+    fixed by waiting, and the endpoints serve without it.
+    """
+
+    def __init__(self, steps: List[Tuple[str, Callable[[], bool]]], enabled: bool = WARMUP_ENABLED):
+        self.enabled = enabled
+        self._calls = [call for _, call in steps]
+        self._steps = [WarmupStep(name) for name, _ in steps]
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._done = threading.Event()
+        self._started_at: Optional[float] = None
+        self._seconds: Optional[float] = None
+        if not enabled:
+            self._done.set()
+
+    def start(self) -> None:
+        """Start warming in the background; later calls (every app startup in one process) do nothing"""
+        with self._lock:
+            if not self.enabled or self._thread is not None:
+                return
+            self._started_at = time.perf_counter()
+            self._thread = threading.Thread(target=self._run, name="zerith-warmup", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        try:
+            for step, call in zip(self._steps, self._calls):
+                step.state = "running"
+                started = time.perf_counter()
+                try:
+                    step.state = "loaded" if call() else "missing"
+                except Exception as e:
+                    step.state = "failed"
+                    step.error = f"{type(e).__name__}: {e}"
+                step.seconds = round(time.perf_counter() - started, 4)
+        finally:
+            self._seconds = round(time.perf_counter() - self._started_at, 4)
+            self._done.set()
+
+    @property
+    def ready(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "ready": self.ready,
+            "seconds": self._seconds,
+            "steps": {step.name: {k: v for k, v in asdict(step).items() if k != "name"} for step in self._steps},
+        }
@@ -0,0 +1,173 @@
+"""Cold start: import time of app.main, time until the API serves, and first-request latency.
+
+    cd CarbMine/backend
+    python -m benchmarks.cold_start
+    python -m benchmarks.cold_start --model compact --runs 5 --json
+
+Builds a throwaway ML dir holding a forest trained on data/coal_emissions.csv, as ml/train.py
+would publish it: `--model pickle` (model.pkl only), `compact` (plus the model.forest.npz export
+the API prefers) or `none` (heuristic forecasts). Then:
+
+- imports app.main in `--runs` fresh interpreters and reports the median wall time, plus the
+  heaviest direct imports from `python -X importtime`;
+- for each of WARMUP_ENABLED=1 and 0, starts uvicorn `--runs` times and records the time from
+  launch until /health answers and until /ready returns 200, then the latency of the first and
+  second /predict_emissions and the first /recommend_strategies request sent after that.
+
+Medians over the runs are reported. The response cache is off so both forecasts compute.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from statistics import median
+from typing import Dict, List, Tuple
+
+import httpx
+
+from .common import BACKEND_DIR, DATA_DIR, ML_DIR, run_server
+
+# Copied into the throwaway ML dir: the API loads both from ML_DIR
+ML_MODULES = ["recommend.py", "datastore.py"]
+PREDICT = {"start_year": 2025, "end_year": 2050, "coal_production_tons": 6.5e8}
+RECOMMEND = {"sector": "mining", "emission_value": 250_000, "year": 2025, "region": "jharkhand"}
+
+
+def build_ml_dir(directory: Path, model: str) -> Path:
+    directory.mkdir(parents=True, exist_ok=True)
+    for name in ML_MODULES:
+        shutil.copyfile(ML_DIR / name, directory / name)
+    if model == "none":
+        return directory
+    import joblib
+    import pandas as pd
+
+    sys.path.insert(0, str(ML_DIR))
+    try:
+        import export_forest
+        import train
+    finally:
+        sys.path.remove(str(ML_DIR))
+    fitted, _ = train.fit_full(pd.read_csv(DATA_DIR / "coal_emissions.csv"))
+    joblib.dump(fitted, directory / "model.pkl")
+    if model == "compact":
+        export_forest.export_forest(fitted, directory / "model.forest.npz", source=directory / "model.pkl")
+    return directory
+
+
+def import_seconds(env: Dict[str, str]) -> float:
+    code = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=str(BACKEND_DIR), env=env, check=True,
+                         stdout=subprocess.PIPE, text=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def heaviest_imports(env: Dict[str, str], top: int) -> List[Tuple[str, float]]:
+    """Direct imports of app.main (and app.main itself) by cumulative import time, in ms"""
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"], cwd=str(BACKEND_DIR),
+                         env=env, check=True, stderr=subprocess.PIPE, text=True)
+    children: Dict[str, float] = {}
+    timings: Dict[str, float] = {}
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or line.count("|") != 2:
+            continue
+        _, cumulative, name = line.split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        # Children are printed before their parent: keep the depth-1 run that ends in app.main
+        if depth == 0:
+            if name.strip() == "app.main":
+                timings = {**children, "app.main": int(cumulative) / 1000}
+            children = {}
+        elif depth == 1:
+            children[name.strip()] = int(cumulative) / 1000
+    return sorted(timings.items(), key=lambda item: item[1], reverse=True)[:top]
+
+
+def _timed(client: httpx.Client, path: str, payload: Dict) -> float:
+    started = time.perf_counter()
+    r = client.post(path, json=payload)
+    elapsed = time.perf_counter() - started
+    r.raise_for_status()
+    return elapsed * 1000
+
+
+def start_once(env: Dict[str, str]) -> Dict[str, float]:
+    with run_server(env=env, poll_interval_s=0.005) as server:
+        started = time.perf_counter() - server.up_after_s
+        with httpx.Client(base_url=server.base_url, timeout=60.0) as client:
+            while True:
+                r = client.get("/ready")
+                # A tree without the endpoint is ready once it answers at all
+                if r.status_code in (200, 404):
+                    break
+                time.sleep(0.005)
+            ready_s = time.perf_counter() - started
+            first_predict = _timed(client, "/predict_emissions", PREDICT)
+            second_predict = _timed(client, "/predict_emissions", {**PREDICT, "coal_production_tons": 6.6e8})
+            first_recommend = _timed(client, "/recommend_strategies", RECOMMEND)
+    return {
+        "health_ms": server.up_after_s * 1000,
+        "ready_ms": ready_s * 1000,
+        "first_predict_ms": first_predict,
+        "second_predict_ms": second_predict,
+        "first_recommend_ms": first_recommend,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", choices=["pickle", "compact", "none"], default="pickle")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=8, help="heaviest imports to list")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="zerith-cold-") as tmp:
+        tmp = Path(tmp)
+        ml_dir = build_ml_dir(tmp / "ml", args.model)
+        data_dir = tmp / "data"
+        data_dir.mkdir()
+        for name in ("coal_emissions.csv", "strategies.csv"):
+            shutil.copyfile(DATA_DIR / name, data_dir / name)
+        env = {
+            "ML_DIR": str(ml_dir),
+            "DATA_DIR": str(data_dir),
+            "JOBS_DIR": str(tmp / "jobs"),
+            "JOB_WORKERS": "0",
+            "RESPONSE_CACHE_MAX_ENTRIES": "0",
+            "DATABASE_URL": f"sqlite+pysqlite:///{tmp}/zerith.db",
+            "LOCAL_STORAGE_DIR": str(tmp / "storage"),
+        }
+        child_env = {**os.environ, **env}
+        report = {
+            "model": args.model,
+            "runs": args.runs,
+            "import_ms": round(median(import_seconds(child_env) for _ in range(args.runs)) * 1000, 1),
+            "heaviest_imports_ms": dict(heaviest_imports(child_env, args.top)),
+            "startup": {},
+        }
+        for warmup in ("1", "0"):
+            runs = [start_once({**env, "WARMUP_ENABLED": warmup}) for _ in range(args.runs)]
+            report["startup"][f"warmup={warmup}"] = {
+                key: round(median(run[key] for run in runs), 1) for key in runs[0]
+            }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"model={report['model']}  import app.main: {report['import_ms']} ms (median of {args.runs})")
+    for name, ms in report["heaviest_imports_ms"].items():
+        print(f"  {name:<32} {ms:>8.1f} ms")
+    print(f"\n{'':<12} {'health':>8} {'ready':>8} {'predict#1':>10} {'predict#2':>10} {'recommend#1':>12}  (ms)")
+    for label, r in report["startup"].items():
+        print(f"{label:<12} {r['health_ms']:>8} {r['ready_ms']:>8} {r['first_predict_ms']:>10} "
+              f"{r['second_predict_ms']:>10} {r['first_recommend_ms']:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""Helpers shared by the benchmark scripts: a throwaway uvicorn server, data dirs and RSS sampling."""
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+ROOT = BACKEND_DIR.parents[1]
+ML_DIR = ROOT / "ml"
+DATA_DIR = ROOT / "data"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def rss_bytes(pid: int) -> int:
+    """Resident set size of `pid` (Linux /proc)"""
+    with open(f"/proc/{pid}/status", encoding="ascii") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def pss_bytes(pid: int) -> int:
+    """Proportional set size: shared pages are split between the processes mapping them"""
+    with open(f"/proc/{pid}/smaps_rollup", encoding="ascii") as f:
+        for line in f:
+            if line.startswith("Pss:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def child_pids(pid: int) -> List[int]:
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children", encoding="ascii") as f:
+            return [int(p) for p in f.read().split()]
+    except FileNotFoundError:
+        return []
+
+
+class RssSampler:
+    """Samples the RSS of a set of processes in a background thread and keeps the peak per pid."""
+
+    def __init__(self, pids: List[int], interval_s: float = 0.02):
+        self.pids = pids
+        self.interval_s = interval_s
+        self.peak: Dict[int, int] = {pid: 0 for pid in pids}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            for pid in self.pids:
+                try:
+                    self.peak[pid] = max(self.peak[pid], rss_bytes(pid))
+                except (FileNotFoundError, ProcessLookupError):
+                    pass
+            self._stop.wait(self.interval_s)
+
+    def __enter__(self) -> "RssSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+@contextmanager
+def run_server(workers: int = 1, env: Optional[Dict[str, str]] = None, startup_timeout_s: float = 60.0,
+               poll_interval_s: float = 0.2) -> Iterator[subprocess.Popen]:
+    """Start app.main:app under uvicorn with throwaway storage and database; yields the process
+    with `base_url`, `worker_pids` and `up_after_s` (launch to first /health answer) set"""
+    port = free_port()
+    tmp = tempfile.mkdtemp(prefix="zerith-bench-")
+    server_env = dict(os.environ)
+    server_env.setdefault("DATABASE_URL", f"sqlite+pysqlite:///{tmp}/zerith.db")
+    server_env.setdefault("LOCAL_STORAGE_DIR", os.path.join(tmp, "storage"))
+    server_env.update(env or {})
+    cmd = [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+           "--log-level", "warning", "--workers", str(workers)]
+    launched = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=str(BACKEND_DIR), env=server_env)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + startup_timeout_s
+        while True:
+            try:
+                if httpx.get(f"{base_url}/health", timeout=1.0).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if proc.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError("uvicorn did not come up")
+            time.sleep(poll_interval_s)
+        proc.up_after_s = time.perf_counter() - launched
+        proc.base_url = base_url
+        proc.worker_pids = worker_pids(proc.pid) if workers > 1 else [proc.pid]
+        yield proc
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def worker_pids(supervisor_pid: int) -> List[int]:
+    # With --workers > 1 uvicorn's supervisor spawns the workers through multiprocessing, next to
+    # multiprocessing's resource tracker
+    pids = []
+    for pid in child_pids(supervisor_pid):
+        try:
+            with open(f"/proc/{pid}/cmdline", "rb") as f:
+                if b"spawn_main" in f.read():
+                    pids.append(pid)
+        except FileNotFoundError:
+            pass
+    return pids
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * q
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def prepare_data_dir(directory: Path, rows: Optional[int] = None, seed: int = 0) -> Path:
+    """A DATA_DIR for the app: the repo's CSVs, or `rows` rows from ml/generate_synthetic_data.py"""
+    directory.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(DATA_DIR / "strategies.csv", directory / "strategies.csv")
+    if not rows:
+        shutil.copyfile(DATA_DIR / "coal_emissions.csv", directory / "coal_emissions.csv")
+        return directory
+    sys.path.insert(0, str(ML_DIR))
+    try:
+        import generate_synthetic_data
+    finally:
+        sys.path.remove(str(ML_DIR))
+    generate_synthetic_data.generate(directory / "coal_emissions.csv", rows=rows, seed=seed)
+    return directory
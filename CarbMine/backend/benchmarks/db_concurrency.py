@@ -0,0 +1,92 @@
+"""Throughput of mixed report reads and uploads against the database layer.
+
+Starts the API under uvicorn and runs `concurrency` clients for `duration` seconds. Each request
+is a /fetch_pdfs page with probability `read_ratio`, otherwise a small /upload_pdf. Reports
+requests per second and latency percentiles for each kind.
+
+    cd CarbMine/backend
+    python -m benchmarks.db_concurrency --concurrency 1,8,32 --read-ratio 0.8 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from typing import Dict, List
+
+import httpx
+
+from .common import percentile, run_server
+
+
+async def _run_mix(base_url: str, concurrency: int, read_ratio: float, duration_s: float, users: int) -> Dict:
+    latencies: Dict[str, List[float]] = {"read": [], "write": []}
+    errors = 0
+    deadline = time.perf_counter() + duration_s
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=30.0, limits=limits) as client:
+        async def worker(n: int) -> None:
+            nonlocal errors
+            rng = random.Random(n)
+            while time.perf_counter() < deadline:
+                uid = f"bench-{rng.randrange(users)}"
+                kind = "read" if rng.random() < read_ratio else "write"
+                started = time.perf_counter()
+                if kind == "read":
+                    r = await client.get("/fetch_pdfs", params={"uid": uid, "limit": 50})
+                else:
+                    # Unique content so every write inserts a blob as well as a report
+                    content = b"%PDF-1.4\n" + os.urandom(2048)
+                    r = await client.post("/upload_pdf", params={"uid": uid},
+                                          files={"file": ("bench.pdf", content, "application/pdf")})
+                latencies[kind].append(time.perf_counter() - started)
+                if r.status_code != 200:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(n) for n in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    result = {"concurrency": concurrency, "seconds": round(elapsed, 2), "errors": errors}
+    total = 0
+    for kind, values in latencies.items():
+        values.sort()
+        total += len(values)
+        result[f"{kind}_count"] = len(values)
+        result[f"{kind}_p50_ms"] = round(percentile(values, 0.5) * 1000, 2)
+        result[f"{kind}_p95_ms"] = round(percentile(values, 0.95) * 1000, 2)
+    result["req_per_s"] = round(total / elapsed, 1)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", default="1,8,32")
+    parser.add_argument("--read-ratio", type=float, default=0.8)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per concurrency level")
+    parser.add_argument("--users", type=int, default=20, help="distinct uids spread across the traffic")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    results = []
+    with run_server(workers=args.workers) as server:
+        for concurrency in (int(c) for c in args.concurrency.split(",")):
+            results.append(asyncio.run(_run_mix(server.base_url, concurrency, args.read_ratio,
+                                                args.duration, args.users)))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'conc':>5} {'req/s':>8} {'reads':>7} {'read p50':>9} {'read p95':>9} "
+          f"{'writes':>7} {'write p50':>10} {'write p95':>10} {'errors':>7}")
+    for r in results:
+        print(f"{r['concurrency']:>5} {r['req_per_s']:>8} {r['read_count']:>7} {r['read_p50_ms']:>9} "
+              f"{r['read_p95_ms']:>9} {r['write_count']:>7} {r['write_p50_ms']:>10} {r['write_p95_ms']:>10} "
+              f"{r['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
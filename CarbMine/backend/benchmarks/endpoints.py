@@ -0,0 +1,250 @@
+"""Endpoint latency, throughput and memory, with a JSON baseline and a regression check.
+
+    cd CarbMine/backend
+    python -m benchmarks.endpoints --save endpoints-baseline.json
+    # ...change something...
+    python -m benchmarks.endpoints --compare endpoints-baseline.json --threshold 0.2
+
+Drives app.main:app in-process through FastAPI's TestClient, once per dataset: "small" is
+data/coal_emissions.csv, "large" is `--large-rows` rows from ml/generate_synthetic_data.py.
+Each dataset runs in a child process so the app is imported fresh against it (DATA_DIR,
+a throwaway database and storage, no job workers, response cache off so every request computes).
+
+Per scenario: `--requests` sequential requests after a warm-up, reported as p50/p95/p99 latency
+and requests per second, then a short pass under tracemalloc for the peak Python allocation of
+a single request. The child's peak RSS is reported per dataset. With --compare, a p50/p95 latency
+or memory figure that grew by more than --threshold (and by more than --min-delta-ms for
+latencies), or a throughput that fell by more than it, is a regression and the exit status is 1.
+p99 is recorded but not gated: from a few hundred samples it is mostly noise. Baselines are only
+comparable on the same machine.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .common import BACKEND_DIR, ML_DIR, ROOT, percentile, prepare_data_dir
+
+SCENARIOS = [
+    "estimate",
+    "predict_short",
+    "predict_long",
+    "predict_regions",
+    "recommend",
+    "upload",
+    "fetch_pdfs",
+]
+# Reports seeded for the fetch_pdfs user before timing
+SEEDED_REPORTS = 200
+MEMORY_REQUESTS = 20
+PDF_BYTES = b"%PDF-1.4\n" + b"0" * 64 * 1024
+
+LATENCY_METRICS = ["p50_ms", "p95_ms", "p99_ms"]
+# Checked by --compare; lower is better for all but requests_per_second
+GATED_METRICS = ["p50_ms", "p95_ms", "peak_alloc_kib"]
+
+
+def _requests(client, seq: int) -> Dict[str, Callable[[], object]]:
+    """One request per scenario; `seq` varies the payloads the way distinct callers would"""
+    return {
+        "estimate": lambda: client.post("/estimate_emissions", json={
+            "year": 2024, "coal_production_tons": 1_000_000 + seq, "energy_consumption_mwh": 100_000,
+            "emission_factor_kgco2_perton": 2000, "methane_emissions_tons": 100, "other_ghg_emissions_tons": 50,
+        }),
+        "predict_short": lambda: client.post("/predict_emissions", json={
+            "start_year": 2025, "end_year": 2027, "coal_production_tons": 6e8 + seq,
+        }),
+        "predict_long": lambda: client.post("/predict_emissions", json={
+            "start_year": 2025, "end_year": 2100, "coal_production_tons": 6e8 + seq,
+        }),
+        "predict_regions": lambda: client.post("/predict_emissions", json={
+            "start_year": 2025, "end_year": 2050, "region": "all", "coal_production_tons": 2.6e9 + seq,
+        }),
+        "recommend": lambda: client.post("/recommend_strategies", json={
+            "sector": "mining", "emission_value": 250_000 + seq, "year": 2025, "region": "jharkhand",
+        }),
+        "upload": lambda: client.post("/upload_pdf", params={"uid": "bench-upload"}, files={
+            # Distinct bytes, so every upload stores a new blob
+            "file": ("report.pdf", PDF_BYTES + str(seq).encode(), "application/pdf"),
+        }),
+        "fetch_pdfs": lambda: client.get("/fetch_pdfs", params={"uid": "bench-reader", "limit": 50}),
+    }
+
+
+def _timed(call: Callable[[], object]) -> float:
+    started = time.perf_counter()
+    r = call()
+    elapsed = time.perf_counter() - started
+    if r.status_code >= 400:
+        raise RuntimeError(f"{r.request.method} {r.request.url.path} -> {r.status_code}: {r.text[:200]}")
+    return elapsed
+
+
+def _run_child(requests: int, warmup: int) -> Dict:
+    # Imported here: the parent sets DATA_DIR and friends in the child's environment first
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    results: Dict[str, Dict] = {}
+    with TestClient(app) as client:
+        for i in range(SEEDED_REPORTS):
+            client.post("/upload_pdf", params={"uid": "bench-reader"},
+                        files={"file": ("seed.pdf", PDF_BYTES + f"seed-{i}".encode(), "application/pdf")})
+        seq = 0
+        for name in SCENARIOS:
+            for _ in range(warmup):
+                seq += 1
+                _timed(_requests(client, seq)[name])
+            latencies = []
+            started = time.perf_counter()
+            for _ in range(requests):
+                seq += 1
+                latencies.append(_timed(_requests(client, seq)[name]))
+            wall = time.perf_counter() - started
+
+            tracemalloc.start()
+            peak = 0
+            for _ in range(MEMORY_REQUESTS):
+                seq += 1
+                call = _requests(client, seq)[name]
+                tracemalloc.reset_peak()
+                _timed(call)
+                peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+            latencies.sort()
+            results[name] = {
+                "requests": requests,
+                **{key: round(percentile(latencies, q) * 1000, 3)
+                   for key, q in zip(LATENCY_METRICS, (0.50, 0.95, 0.99))},
+                "requests_per_second": round(requests / wall, 1),
+                "peak_alloc_kib": round(peak / 1024, 1),
+            }
+        status = client.get("/status").json()
+    return {
+        "rows": status["dataset"]["rows"],
+        "model_loaded": bool(status.get("model", {}).get("loaded")),
+        "peak_rss_mib": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "scenarios": results,
+    }
+
+
+def _run_dataset(name: str, args: argparse.Namespace) -> Dict:
+    with tempfile.TemporaryDirectory(prefix="zerith-endpoints-") as tmp:
+        tmp = Path(tmp)
+        prepare_data_dir(tmp / "data", rows=args.large_rows if name == "large" else None)
+        env = dict(os.environ)
+        env.update({
+            "DATA_DIR": str(tmp / "data"),
+            "ML_DIR": str(args.ml_dir),
+            "DATABASE_URL": f"sqlite+pysqlite:///{tmp}/zerith.db",
+            "LOCAL_STORAGE_DIR": str(tmp / "storage"),
+            "JOBS_DIR": str(tmp / "jobs"),
+            "JOB_WORKERS": "0",
+            "RESPONSE_CACHE_MAX_ENTRIES": "0",
+        })
+        cmd = [sys.executable, "-m", "benchmarks.endpoints", "--child",
+               "--requests", str(args.requests), "--warmup", str(args.warmup)]
+        out = subprocess.run(cmd, cwd=str(BACKEND_DIR), env=env, check=True, stdout=subprocess.PIPE, text=True)
+        return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=str(ROOT), check=True,
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline: Dict, current: Dict, threshold: float, min_delta_ms: float) -> List[Dict]:
+    """Figures in `current` that regressed past `threshold` (relative) against `baseline`"""
+    regressions = []
+    for dataset, result in current["datasets"].items():
+        base_result = baseline.get("datasets", {}).get(dataset)
+        if base_result is None:
+            continue
+        for scenario, figures in result["scenarios"].items():
+            base = base_result["scenarios"].get(scenario)
+            if base is None:
+                continue
+            checks: List[Tuple[str, float, float, bool]] = [
+                (metric, base[metric], figures[metric], True) for metric in GATED_METRICS
+            ] + [("requests_per_second", base["requests_per_second"], figures["requests_per_second"], False)]
+            for metric, before, after, lower_is_better in checks:
+                if before <= 0:
+                    continue
+                change = (after - before) / before
+                worse = change > threshold if lower_is_better else -change > threshold
+                # Sub-noise latency shifts on fast endpoints are not regressions
+                if worse and metric in LATENCY_METRICS and after - before < min_delta_ms:
+                    worse = False
+                if worse:
+                    regressions.append({"dataset": dataset, "scenario": scenario, "metric": metric,
+                                        "baseline": before, "current": after, "change": round(change, 3)})
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--datasets", default="small,large", help="comma list of small,large")
+    parser.add_argument("--large-rows", type=int, default=1_000_000)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--ml-dir", type=Path, default=ML_DIR, help="model and recommender directory")
+    parser.add_argument("--save", type=Path, help="write the results here as the new baseline")
+    parser.add_argument("--compare", type=Path, help="baseline JSON to check the results against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative change counted as a regression")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5,
+                        help="latency increases below this are never regressions")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(_run_child(args.requests, args.warmup)))
+        return
+
+    datasets = [d.strip() for d in args.datasets.split(",") if d.strip()]
+    unknown = set(datasets) - {"small", "large"}
+    if unknown:
+        parser.error(f"unknown datasets: {', '.join(sorted(unknown))}")
+    results = {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "requests": args.requests,
+            "large_rows": args.large_rows,
+        },
+        "datasets": {},
+    }
+    for name in datasets:
+        results["datasets"][name] = _run_dataset(name, args)
+        for scenario, figures in results["datasets"][name]["scenarios"].items():
+            print(json.dumps({"dataset": name, "scenario": scenario, **figures}))
+
+    if args.save:
+        args.save.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        regressions = compare(baseline, results, args.threshold, args.min_delta_ms)
+        for regression in regressions:
+            print(json.dumps({"regression": regression}))
+        print(json.dumps({"compared_to": baseline["meta"].get("git_revision"), "regressions": len(regressions)}))
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Pickled RandomForest vs the compact array export: artifact size, load time, predict latency.
+
+    cd CarbMine/backend
+    python -m benchmarks.forest_inference --model ../../ml/model.pkl
+
+The compact file next to the pickle is used when present, otherwise one is exported to a temp
+directory. Latency is measured for a single row and for a forecast-sized batch.
+"""
+import argparse
+import gc
+import importlib.util
+import json
+import tempfile
+import time
+import warnings
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+from app.forest import load_compact_forest
+from app.model_registry import FEATURE_COLUMNS
+
+from .common import percentile
+
+ML_DIR = Path(__file__).resolve().parents[3] / "ml"
+
+
+def _export(model_path: Path, dest: Path) -> Path:
+    spec = importlib.util.spec_from_file_location("ml_export_forest", str(ML_DIR / "export_forest.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.export_forest(joblib.load(model_path), dest)
+
+
+def _time_loads(load, path: Path, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        load(path)
+        times.append(time.perf_counter() - started)
+    return sorted(times)[len(times) // 2]
+
+
+def _latencies(predict, X: np.ndarray, repeat: int) -> dict:
+    predict(X)  # warm-up
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        predict(X)
+        times.append(time.perf_counter() - started)
+    times.sort()
+    return {"p50_ms": round(percentile(times, 0.5) * 1000, 3), "p99_ms": round(percentile(times, 0.99) * 1000, 3)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default=str(ML_DIR / "model.pkl"))
+    parser.add_argument("--compact", default=None, help="compact forest file (default: next to --model)")
+    parser.add_argument("--batch-rows", type=int, default=36, help="rows in the batch case (a 2025-2060 forecast)")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--load-repeat", type=int, default=5)
+    args = parser.parse_args()
+    # The pickle was fitted on a DataFrame; plain arrays are what the API passes too
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+    model_path = Path(args.model)
+    compact_path = Path(args.compact) if args.compact else model_path.with_name("model.forest.npz")
+    with tempfile.TemporaryDirectory() as tmp:
+        if not compact_path.exists():
+            compact_path = _export(model_path, Path(tmp) / "model.forest.npz")
+
+        pickled = joblib.load(model_path)
+        compact = load_compact_forest(compact_path)
+        rng = np.random.default_rng(0)
+        base = np.array([2025, 6.5e8, 8e5, 2000, 1e4, 6e3], dtype=np.float64)
+        batch = base * rng.uniform(0.9, 1.1, size=(args.batch_rows, len(FEATURE_COLUMNS)))
+        batch[:, 0] = np.arange(2025, 2025 + args.batch_rows)
+        single = batch[:1]
+
+        report = {
+            "pickle": {"bytes": model_path.stat().st_size, "load_s": round(_time_loads(joblib.load, model_path, args.load_repeat), 4)},
+            "compact": {"bytes": compact_path.stat().st_size, "load_s": round(_time_loads(load_compact_forest, compact_path, args.load_repeat), 4)},
+        }
+        variants = {"pickle": pickled.predict, "compact": compact.predict}
+        if getattr(pickled, "n_jobs", None) not in (None, 1):
+            single_threaded = joblib.load(model_path)
+            single_threaded.n_jobs = 1
+            variants["pickle_n_jobs_1"] = single_threaded.predict
+            report["pickle_n_jobs_1"] = {}
+        for name, predict in variants.items():
+            report[name]["single_row"] = _latencies(predict, single, args.repeat)
+            report[name][f"batch_{args.batch_rows}"] = _latencies(predict, batch, args.repeat)
+        report["max_abs_rel_diff"] = float(np.max(np.abs(compact.predict(batch) - pickled.predict(batch)) / np.abs(pickled.predict(batch))))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
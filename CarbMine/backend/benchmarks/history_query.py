@@ -0,0 +1,117 @@
+"""History queries: parsing the CSV vs the indexed store (ml/datastore.py).
+
+    cd CarbMine/backend
+    python -m benchmarks.history_query --rows 1000000
+
+Builds a synthetic history of `--rows` mine-years (40 regions x 100 years, many mines each) as a
+CSV and as a store, then times the same aggregates both ways: a narrow filter (one region, five
+years), a one-region trend (all years) and a full group-by of every (year, region).
+"""
+import argparse
+import csv
+import importlib.util
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.dataset import read_csv_columns
+
+ML_DIR = Path(__file__).resolve().parents[3] / "ml"
+REGIONS = [f"region_{i:02d}" for i in range(40)]
+YEARS = (1990, 2089)
+
+
+def _datastore():
+    spec = importlib.util.spec_from_file_location("ml_datastore", str(ML_DIR / "datastore.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _write_csv(path: Path, rows: int, seed: int) -> None:
+    rng = np.random.default_rng(seed)
+    chunk = 100_000
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Year", "Coal_Production_Tons", "Energy_Consumption_MWh", "Emission_Factor_kgCO2_perTon",
+                         "Methane_Emissions_tons", "Other_GHG_Emissions_tons", "Total_Emissions_tCO2e", "Region"])
+        for start in range(0, rows, chunk):
+            n = min(chunk, rows - start)
+            years = rng.integers(YEARS[0], YEARS[1] + 1, n)
+            regions = rng.integers(0, len(REGIONS), n)
+            prod = rng.uniform(1e5, 1e7, n).round(2)
+            ef = rng.uniform(1800, 2200, n).round(2)
+            energy = (prod / 1000 + 80).round(2)
+            ch4, other = (prod * 2e-5).round(2), (prod * 1e-5).round(2)
+            total = (prod * ef / 1000 + energy * 0.82 + ch4 + other).round(2)
+            writer.writerows(zip(years.tolist(), prod.tolist(), energy.tolist(), ef.tolist(), ch4.tolist(),
+                                 other.tolist(), total.tolist(), [REGIONS[r] for r in regions]))
+
+
+def _timed(fn, repeat: int):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - started)
+    return round(sorted(times)[len(times) // 2] * 1000, 1), result
+
+
+def _csv_query(path: Path, year_min, year_max, region, by_region: bool):
+    # What answering from the CSV takes: parse everything, then filter and group in numpy
+    columns, regions = read_csv_columns(path)
+    years = columns["Year"]
+    mask = np.ones(years.shape[0], dtype=bool)
+    if year_min is not None:
+        mask &= (years >= year_min) & (years <= year_max)
+    if region is not None:
+        mask &= regions == region
+    keys = list(zip(years[mask].astype(int).tolist(), regions[mask].tolist())) if by_region else years[mask].astype(int).tolist()
+    totals = {}
+    for key, value in zip(keys, columns["Total_Emissions_tCO2e"][mask].tolist()):
+        totals[key] = totals.get(key, 0.0) + value
+    return len(totals)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    datastore = _datastore()
+    with tempfile.TemporaryDirectory(prefix="zerith-history-") as tmp:
+        csv_path, store = Path(tmp) / "history.csv", Path(tmp) / "history.sqlite3"
+        _write_csv(csv_path, args.rows, args.seed)
+        build_s, _ = _timed(lambda: datastore.build_store(store, csv_path), 1)
+        print(json.dumps({"rows": args.rows, "csv_bytes": csv_path.stat().st_size,
+                          "store_bytes": store.stat().st_size, "build_ms": build_s}))
+
+        queries = {
+            "narrow": dict(year_min=2020, year_max=2024, region=REGIONS[7], group_by=["year"]),
+            "region_trend": dict(year_min=None, year_max=None, region=REGIONS[7], group_by=["year"]),
+            "all_groups": dict(year_min=None, year_max=None, region=None, group_by=["year", "region"]),
+        }
+        with datastore.connect(store) as conn:
+            plan = conn.execute("EXPLAIN QUERY PLAN SELECT Year, SUM(Total_Emissions_tCO2e) FROM emissions "
+                                "WHERE Region = ? AND Year BETWEEN ? AND ? GROUP BY Year", (REGIONS[7], 2020, 2024)).fetchall()
+        print(json.dumps({"narrow_plan": [row[-1] for row in plan]}))
+        for name, q in queries.items():
+            store_ms, groups = _timed(lambda: datastore.query_history(
+                store, year_min=q["year_min"], year_max=q["year_max"],
+                regions=[q["region"]] if q["region"] else None, group_by=q["group_by"],
+            ), args.repeat)
+            csv_ms, csv_groups = _timed(lambda: _csv_query(
+                csv_path, q["year_min"], q["year_max"], q["region"], len(q["group_by"]) > 1,
+            ), 1)
+            assert len(groups) == csv_groups
+            print(json.dumps({"query": name, "groups": len(groups), "csv_ms": csv_ms, "store_ms": store_ms,
+                              "speedup": round(csv_ms / store_ms, 1)}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Full retrain vs incremental ingest of a nightly batch.
+
+    cd CarbMine/backend
+    python -m benchmarks.ingest --history 300 30000 --new-rows 300
+
+For each history size a temp store is built by resampling data/coal_emissions.csv with noise,
+and a batch of `--new-rows` rows with unseen (Year, Region) keys is ingested twice into copies of
+it: once as append + full retrain (400 trees over everything), once with
+`data_ingest.py --incremental` (50 warm-started trees over the new rows and a bounded replay
+sample). Both runs start from the same full-trained model and publish into temp artifact dirs.
+"""
+import argparse
+import json
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ML_DIR = Path(__file__).resolve().parents[3] / "ml"
+DATA_CSV = ML_DIR.parent / "data" / "coal_emissions.csv"
+# ml/ scripts import each other as top-level modules
+sys.path.insert(0, str(ML_DIR))
+
+import data_ingest  # noqa: E402
+import datastore  # noqa: E402
+import train  # noqa: E402
+from artifacts import publish  # noqa: E402
+
+
+def _synthetic(base: pd.DataFrame, rows: int, rng: np.random.Generator) -> pd.DataFrame:
+    df = base.iloc[rng.integers(0, len(base), rows)].reset_index(drop=True)
+    for col in data_ingest.REQUIRED_COLUMNS[1:]:
+        df[col] = (df[col] * rng.normal(1.0, 0.02, rows)).round(2)
+    return df
+
+
+def _new_batch(base: pd.DataFrame, rows: int, rng: np.random.Generator) -> pd.DataFrame:
+    batch = _synthetic(base, rows, rng)
+    # Years past the history, several regions per year: every key is unseen
+    regions = [f"region_{i}" for i in range(10)]
+    batch["Year"] = 2100 + np.arange(rows) // len(regions)
+    batch["Region"] = [regions[i % len(regions)] for i in range(rows)]
+    return batch
+
+
+def _run(history: int, new_rows: int, seed: int) -> dict:
+    rng = np.random.default_rng(seed)
+    base = pd.read_csv(DATA_CSV)
+    store = _synthetic(base, history, rng)
+    batch = _new_batch(base, new_rows, rng)
+
+    with tempfile.TemporaryDirectory(prefix="zerith-ingest-") as tmp:
+        tmp = Path(tmp)
+        batch_csv = tmp / "batch.csv"
+        batch.to_csv(batch_csv, index=False)
+        store.to_csv(tmp / "seed.csv", index=False)
+        datastore.build_store(tmp / "store.sqlite3", tmp / "seed.csv")
+        model, metrics = train.fit_full(store)
+
+        results = {"history_rows": history, "new_rows": new_rows}
+        for mode in ("full", "incremental"):
+            work = tmp / mode
+            work.mkdir()
+            store_path = work / "store.sqlite3"
+            shutil.copyfile(tmp / "store.sqlite3", store_path)
+            paths = {
+                "artifacts_dir": work / "artifacts",
+                "model_path": work / "model.pkl",
+                "compact_path": work / "model.forest.npz",
+                "metrics_path": work / "model_metrics.json",
+            }
+            publish(model, metrics, {"mode": "full"}, **paths)
+
+            started = time.perf_counter()
+            if mode == "full":
+                datastore.append_rows(data_ingest.store_rows(data_ingest.read_batch(batch_csv)), store_path)
+                grown = train.load_history(store_path, csv_path=None)
+                refit, refit_metrics = train.fit_full(grown)
+                entry = publish(refit, refit_metrics, {"mode": "full"}, **paths)
+                summary = {"n_estimators": entry["n_estimators"]}
+            else:
+                summary = data_ingest.ingest_incremental(batch_csv, store_path=store_path, seed_csv=None,
+                                                         model_path=paths["model_path"], seed=seed,
+                                                         publish_kwargs=paths)
+            results[mode] = {"seconds": round(time.perf_counter() - started, 3),
+                             "n_estimators": summary["n_estimators"]}
+    results["speedup"] = round(results["full"]["seconds"] / results["incremental"]["seconds"], 1)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--history", type=int, nargs="+", default=[300, 30000])
+    parser.add_argument("--new-rows", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    for history in args.history:
+        print(json.dumps(_run(history, args.new_rows, args.seed)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""Closed-loop load test of a local API: throughput and tail latency per route.
+
+    cd CarbMine/backend
+    python -m benchmarks.load --workers 2 --concurrency 1,8,32,64 --duration 15
+    python -m benchmarks.load --mix predict=1 --distinct 50 --env RESPONSE_CACHE_MAX_ENTRIES=0
+    python -m benchmarks.load --workers 4 --env DB_POOL_SIZE=20 --data-rows 1000000 --json
+
+Starts app.main:app under uvicorn (`--workers` processes, throwaway database, storage and job
+dir, no background training) and, for each concurrency level, runs that many virtual users for
+`--duration` seconds after `--warmup` seconds of unrecorded traffic. Each user sends its next
+request as soon as the previous one answers, picking the route by the `--mix` weights.
+
+Payloads come from `--distinct` variants per route (0: every request is new), which sets how
+often the response cache can answer. Uploads always carry new bytes. `--env KEY=VALUE` passes
+settings to the server (pool sizes, cache sizes, ...) so configurations can be compared on one
+machine. The load generator shares the machine with the server, so the numbers are an upper
+bound on what a remote client would see.
+
+For each level the report has requests per second and p50/p95/p99/max per route and overall,
+plus the servers' summed peak RSS. The first level after which throughput grows by less than
+`--knee` (relative) is reported as the saturation point.
+"""
+import argparse
+import asyncio
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from .common import ML_DIR, RssSampler, percentile, prepare_data_dir, run_server
+
+DEFAULT_MIX = "estimate_indian=30,calculate=25,predict=25,recommend=15,upload=5"
+REGIONS = ["jharkhand", "chhattisgarh", "odisha", "west_bengal"]
+
+# route -> (method, path); the payload comes from _payload
+ROUTES: Dict[str, Tuple[str, str]] = {
+    "estimate_indian": ("POST", "/estimate_indian"),
+    "calculate": ("POST", "/calculate"),
+    "predict": ("POST", "/predict_emissions"),
+    "recommend": ("POST", "/recommend_strategies"),
+    "upload": ("POST", "/upload_pdf"),
+}
+
+
+def _payload(route: str, variant: int, upload_bytes: int, rng: random.Random) -> Dict:
+    """httpx request kwargs for one request; the same variant always gives the same body"""
+    if route == "estimate_indian":
+        return {"json": {"year": 2020 + variant % 10, "coal_production_tons": 1e6 + variant * 1000,
+                         "energy_consumption_mwh": 1e5, "methane_emissions_tons": 100,
+                         "region": REGIONS[variant % len(REGIONS)]}}
+    if route == "calculate":
+        return {"json": {"excavation": 10 + variant, "transportation": 20, "fuel": 30, "equipment": 5,
+                         "workers": 4, "output": 100, "fuelType": "coal", "reduction": 3}}
+    if route == "predict":
+        return {"json": {"start_year": 2025, "end_year": 2030 + variant % 20,
+                         "coal_production_tons": 6e8 + variant * 1e6}}
+    if route == "recommend":
+        return {"json": {"sector": "mining", "emission_value": 100_000 + variant * 500, "year": 2025,
+                         "region": REGIONS[variant % len(REGIONS)]}}
+    if route == "upload":
+        content = b"%PDF-1.4\n" + rng.randbytes(upload_bytes)
+        return {"params": {"uid": f"load-{variant % 50}"},
+                "files": {"file": ("load.pdf", content, "application/pdf")}}
+    raise ValueError(route)
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix: Dict[str, float] = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ROUTES:
+            raise ValueError(f"unknown route {name!r}; expected some of {', '.join(ROUTES)}")
+        mix[name] = float(weight or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("the mix needs at least one route with a positive weight")
+    return mix
+
+
+def _summary(latencies: List[float], errors: int, seconds: float) -> Dict:
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "req_per_s": round(len(latencies) / seconds, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+    }
+
+
+async def run_level(base_url: str, concurrency: int, mix: Dict[str, float], duration_s: float,
+                    warmup_s: float, distinct: int, upload_bytes: int, seed: int = 0) -> Dict:
+    routes, weights = list(mix), list(mix.values())
+    latencies: Dict[str, List[float]] = {route: [] for route in routes}
+    errors: Dict[str, int] = {route: 0 for route in routes}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    started = time.perf_counter()
+    record_from = started + warmup_s
+    deadline = record_from + duration_s
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60.0, limits=limits) as client:
+        async def user(n: int) -> None:
+            rng = random.Random(seed * 100_003 + n)
+            counter = 0
+            while True:
+                now = time.perf_counter()
+                if now >= deadline:
+                    return
+                route = rng.choices(routes, weights)[0]
+                counter += 1
+                variant = rng.randrange(distinct) if distinct > 0 else n * 10_000_000 + counter
+                method, path = ROUTES[route]
+                kwargs = _payload(route, variant, upload_bytes, rng)
+                sent = time.perf_counter()
+                try:
+                    r = await client.request(method, path, **kwargs)
+                    failed = r.status_code >= 400
+                except httpx.HTTPError:
+                    failed = True
+                done = time.perf_counter()
+                # Requests sent during the warm-up or finishing after the deadline are not recorded
+                if sent >= record_from and done <= deadline:
+                    latencies[route].append(done - sent)
+                    errors[route] += failed
+
+        await asyncio.gather(*(user(n) for n in range(concurrency)))
+
+    routes_out = {route: _summary(latencies[route], errors[route], duration_s) for route in routes}
+    overall = _summary([x for values in latencies.values() for x in values], sum(errors.values()), duration_s)
+    return {"concurrency": concurrency, **overall, "routes": routes_out}
+
+
+def saturation(levels: List[Dict], knee: float) -> Optional[int]:
+    """Concurrency after which throughput grew by less than `knee` (relative); None if it never did"""
+    for before, after in zip(levels, levels[1:]):
+        if before["req_per_s"] > 0 and after["req_per_s"] < before["req_per_s"] * (1.0 + knee):
+            return before["concurrency"]
+    return None
+
+
+def _server_env(tmp: Path, data_rows: int, overrides: List[str]) -> Dict[str, str]:
+    env = {
+        "DATA_DIR": str(prepare_data_dir(tmp / "data", rows=data_rows or None)),
+        "ML_DIR": str(ML_DIR),
+        "JOBS_DIR": str(tmp / "jobs"),
+        # A missing model must not start a training run in the middle of the measurement
+        "JOB_WORKERS": "0",
+    }
+    for item in overrides:
+        key, sep, value = item.partition("=")
+        if not sep or not key:
+            raise ValueError(f"--env expects KEY=VALUE, got {item!r}")
+        env[key] = value
+    return env
+
+
+def _print_table(levels: List[Dict], knee_at: Optional[int], workers: int) -> None:
+    print(f"workers={workers}")
+    for level in levels:
+        print(f"\nconcurrency {level['concurrency']}: {level['req_per_s']} req/s, "
+              f"p95 {level['p95_ms']} ms, p99 {level['p99_ms']} ms, {level['errors']} errors, "
+              f"server peak RSS {level['server_peak_rss_mib']} MiB")
+        print(f"  {'route':<16} {'req':>7} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'err':>5}")
+        for route, r in level["routes"].items():
+            print(f"  {route:<16} {r['requests']:>7} {r['req_per_s']:>8} {r['p50_ms']:>8} {r['p95_ms']:>8} "
+                  f"{r['p99_ms']:>8} {r['max_ms']:>8} {r['errors']:>5}")
+    if knee_at is not None:
+        print(f"\nthroughput stops scaling after concurrency {knee_at}")
+    elif len(levels) > 1:
+        print("\nthroughput still scaling at the highest concurrency tried")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma list of virtual-user counts")
+    parser.add_argument("--duration", type=float, default=10.0, help="recorded seconds per level")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unrecorded seconds before each level")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="route=weight list (default: %(default)s)")
+    parser.add_argument("--distinct", type=int, default=0,
+                        help="payload variants per route; 0 makes every request distinct")
+    parser.add_argument("--upload-kib", type=int, default=64)
+    parser.add_argument("--data-rows", type=int, default=0, help="synthetic history rows; 0 uses data/")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="server setting")
+    parser.add_argument("--knee", type=float, default=0.1, help="throughput gain below which a level saturates")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    try:
+        mix = parse_mix(args.mix)
+        concurrency = [int(c) for c in args.concurrency.split(",") if c.strip()]
+    except ValueError as e:
+        parser.error(str(e))
+
+    levels = []
+    with tempfile.TemporaryDirectory(prefix="zerith-load-") as tmp:
+        try:
+            env = _server_env(Path(tmp), args.data_rows, args.env)
+        except ValueError as e:
+            parser.error(str(e))
+        with run_server(workers=args.workers, env=env) as server:
+            for n in concurrency:
+                with RssSampler(server.worker_pids) as rss:
+                    level = asyncio.run(run_level(server.base_url, n, mix, args.duration, args.warmup,
+                                                  args.distinct, args.upload_kib * 1024, args.seed))
+                level["server_peak_rss_mib"] = round(sum(rss.peak.values()) / (1024 * 1024), 1)
+                levels.append(level)
+                if not args.json:
+                    print(f"concurrency {n}: {level['req_per_s']} req/s", flush=True)
+
+    knee_at = saturation(levels, args.knee)
+    if args.json:
+        print(json.dumps({"workers": args.workers, "mix": mix, "distinct": args.distinct, "env": args.env,
+                          "levels": levels, "saturation_concurrency": knee_at}, indent=2))
+        return
+    _print_table(levels, knee_at, args.workers)
+
+
+if __name__ == "__main__":
+    main()
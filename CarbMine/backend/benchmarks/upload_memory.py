@@ -0,0 +1,84 @@
+"""Server memory while uploading PDFs of growing size at growing concurrency.
+
+Starts the API under uvicorn, uploads synthetic PDFs through /upload_pdf and reports the server's
+peak RSS for each (size, concurrency) pair. With chunked streaming the peak should stay roughly
+flat as both grow.
+
+    cd CarbMine/backend
+    python -m benchmarks.upload_memory --sizes 1,16,64 --concurrency 1,4,16
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+import httpx
+
+from .common import RssSampler, rss_bytes, run_server
+
+MB = 1024 * 1024
+
+
+def _make_pdf(size_mb: int, directory: str) -> str:
+    path = os.path.join(directory, f"bench-{size_mb}mb.pdf")
+    block = os.urandom(MB)
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        for _ in range(size_mb):
+            f.write(block)
+    return path
+
+
+async def _upload_all(base_url: str, path: str, concurrency: int) -> None:
+    async with httpx.AsyncClient(base_url=base_url, timeout=None) as client:
+        async def one(i: int) -> None:
+            with open(path, "rb") as f:
+                r = await client.post("/upload_pdf", params={"uid": f"bench-{i}"},
+                                      files={"file": (f"bench-{i}.pdf", f, "application/pdf")})
+                r.raise_for_status()
+        await asyncio.gather(*(one(i) for i in range(concurrency)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1,16,64", help="upload sizes in MB")
+    parser.add_argument("--concurrency", default="1,4,16", help="concurrent uploads per round")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",")]
+    levels = [int(c) for c in args.concurrency.split(",")]
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        files = {size: _make_pdf(size, tmp) for size in sizes}
+        env = {"MAX_UPLOAD_BYTES": str((max(sizes) + 1) * MB)}
+        with run_server(env=env) as server:
+            baseline = rss_bytes(server.pid)
+            for size in sizes:
+                for concurrency in levels:
+                    with RssSampler([server.pid]) as sampler:
+                        started = time.perf_counter()
+                        asyncio.run(_upload_all(server.base_url, files[size], concurrency))
+                        elapsed = time.perf_counter() - started
+                    results.append({
+                        "size_mb": size,
+                        "concurrency": concurrency,
+                        "seconds": round(elapsed, 3),
+                        "throughput_mb_s": round(size * concurrency / elapsed, 1),
+                        "baseline_rss_mb": round(baseline / MB, 1),
+                        "peak_rss_mb": round(sampler.peak[server.pid] / MB, 1),
+                    })
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'size MB':>8} {'conc':>5} {'secs':>7} {'MB/s':>7} {'base RSS':>9} {'peak RSS':>9}")
+    for r in results:
+        print(f"{r['size_mb']:>8} {r['concurrency']:>5} {r['seconds']:>7} {r['throughput_mb_s']:>7} "
+              f"{r['baseline_rss_mb']:>9} {r['peak_rss_mb']:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Per-worker memory of the API with each model artifact layout, across worker counts.
+
+For every (artifact, workers) pair, starts uvicorn with `--workers N` against a temp ML_DIR that
+holds only that artifact, records each worker's RSS and PSS after startup ("before") and again
+after forecast traffic has loaded the model in the workers ("after"). PSS splits shared pages
+between processes, so total PSS is what the container actually pays.
+
+    cd CarbMine/backend
+    python -m benchmarks.worker_memory --model ../../ml/model.pkl --workers 1,2,4
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+
+from .common import pss_bytes, rss_bytes, run_server
+
+ML_DIR = Path(__file__).resolve().parents[3] / "ml"
+MB = 1024 * 1024
+
+# artifact layout -> (file to expose in ML_DIR, extra env)
+LAYOUTS = {
+    "pickle": ("model.pkl", {}),
+    "compact": ("model.forest.npz", {"MODEL_MMAP": "0"}),
+    "compact_mmap": ("model.forest.npz", {"MODEL_MMAP": "1"}),
+}
+
+
+def _memory(pids: List[int]) -> Dict:
+    rss = [rss_bytes(pid) for pid in pids]
+    pss = [pss_bytes(pid) for pid in pids]
+    return {
+        "rss_mb_per_worker": [round(v / MB, 1) for v in rss],
+        "pss_mb_per_worker": [round(v / MB, 1) for v in pss],
+        "pss_mb_total": round(sum(pss) / MB, 1),
+    }
+
+
+async def _forecast_traffic(base_url: str, requests: int, concurrency: int) -> None:
+    # Fresh connections so the kernel spreads them over the workers' shared listening socket;
+    # modest concurrency so request temporaries don't drown out the model's footprint
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        async with gate, httpx.AsyncClient(base_url=base_url, timeout=60.0) as client:
+            r = await client.post("/predict_emissions", json={"start_year": 2025, "end_year": 2040 + i % 20})
+            r.raise_for_status()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+
+
+def _compact_artifact(model_path: Path, directory: Path) -> Path:
+    existing = model_path.with_name("model.forest.npz")
+    if existing.exists():
+        return existing
+    import joblib
+
+    spec = importlib.util.spec_from_file_location("ml_export_forest", str(ML_DIR / "export_forest.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.export_forest(joblib.load(model_path), directory / "model.forest.npz")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default=str(ML_DIR / "model.pkl"))
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--layouts", default=",".join(LAYOUTS))
+    parser.add_argument("--requests-per-worker", type=int, default=30)
+    args = parser.parse_args()
+
+    model_path = Path(args.model).resolve()
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        artifacts = {"model.pkl": model_path, "model.forest.npz": _compact_artifact(model_path, Path(tmp))}
+        for layout in args.layouts.split(","):
+            filename, env = LAYOUTS[layout]
+            ml_dir = Path(tmp) / layout
+            ml_dir.mkdir()
+            os.symlink(artifacts[filename], ml_dir / filename)
+            for workers in (int(w) for w in args.workers.split(",")):
+                with run_server(workers=workers, env={"ML_DIR": str(ml_dir), **env}) as server:
+                    time.sleep(1.0)
+                    before = _memory(server.worker_pids)
+                    asyncio.run(_forecast_traffic(server.base_url, args.requests_per_worker * workers, 2 * workers))
+                    time.sleep(0.5)
+                    after = _memory(server.worker_pids)
+                results.append({"layout": layout, "workers": workers, "before": before, "after": after})
+
+    print(json.dumps(results, indent=2))
+    print(f"\n{'layout':<14} {'workers':>7} {'RSS/worker before':>18} {'RSS/worker after':>17} "
+          f"{'PSS total before':>17} {'PSS total after':>16}")
+    for r in results:
+        rss_before = max(r["before"]["rss_mb_per_worker"])
+        rss_after = max(r["after"]["rss_mb_per_worker"])
+        print(f"{r['layout']:<14} {r['workers']:>7} {rss_before:>18} {rss_after:>17} "
+              f"{r['before']['pss_mb_total']:>17} {r['after']['pss_mb_total']:>16}")
+
+
+if __name__ == "__main__":
+    main()
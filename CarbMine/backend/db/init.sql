@@ -1,6 +1,16 @@
 CREATE DATABASE IF NOT EXISTS zerith_db CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;
 USE zerith_db;
 
+CREATE TABLE IF NOT EXISTS pdf_blobs (
+  sha256 VARCHAR(64) PRIMARY KEY,
+  size_bytes INT NOT NULL,
+  ref_count INT NOT NULL DEFAULT 0,
+  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- blob_sha256 is NULL for reports stored before content addressing; databases created from an
+-- older version of this file get the column and the (uid, created_at, id) index from the API on
+-- startup
 CREATE TABLE IF NOT EXISTS pdf_reports (
   id INT AUTO_INCREMENT PRIMARY KEY,
   uid VARCHAR(128) NOT NULL,
@@ -8,7 +18,10 @@ CREATE TABLE IF NOT EXISTS pdf_reports (
   url TEXT NOT NULL,
   size_bytes INT NOT NULL,
   created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-  INDEX idx_uid (uid)
+  blob_sha256 VARCHAR(64) NULL,
+  INDEX idx_uid (uid),
+  INDEX ix_pdf_reports_uid_created_at_id (uid, created_at, id),
+  INDEX ix_pdf_reports_blob_sha256 (blob_sha256)
 );
 
 
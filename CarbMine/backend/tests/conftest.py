@@ -0,0 +1,11 @@
+import os
+import tempfile
+
+# Keep test uploads and the SQLite file out of the source tree; must run before app.main is imported
+_TMP = tempfile.mkdtemp(prefix="zerith-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite+pysqlite:///{_TMP}/zerith.db")
+os.environ.setdefault("LOCAL_STORAGE_DIR", os.path.join(_TMP, "storage"))
+os.environ.setdefault("MAX_UPLOAD_BYTES", str(1024 * 1024))
+os.environ.setdefault("JOBS_DIR", os.path.join(_TMP, "jobs"))
+# Requests without a model queue a training job; never let the tests run ml/train.py on the repo
+os.environ.setdefault("JOB_WORKERS", "0")
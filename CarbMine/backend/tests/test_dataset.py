@@ -0,0 +1,87 @@
+import os
+
+from app.dataset import DatasetCache, read_csv_columns
+
+HEADER = "Year,Coal_Production_Tons,Energy_Consumption_MWh,Emission_Factor_kgCO2_perTon,Methane_Emissions_tons,Other_GHG_Emissions_tons,Total_Emissions_tCO2e,Region\n"
+
+
+def _write(path, rows):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(HEADER)
+        for r in rows:
+            f.write(",".join(str(v) for v in r) + "\n")
+
+
+def test_snapshot_trends_and_invalidation(tmp_path):
+    path = tmp_path / "coal_emissions.csv"
+    _write(path, [
+        (2012, 120.0, 12.0, 2000, 1, 1, 0, "odisha"),
+        (2010, 100.0, 10.0, 2000, 1, 1, 0, "jharkhand"),
+        (2011, 110.0, 11.0, 2000, 1, 1, 0, "odisha"),
+    ])
+    cache = DatasetCache(path, check_interval_s=0)
+    snap = cache.get()
+    assert snap is not None and snap.num_rows == 3
+    assert list(snap.columns["Year"]) == [2010, 2011, 2012]
+    assert snap.stats.base_prod == 120.0
+    assert abs(snap.stats.prod_slope - 10.0) < 1e-9
+    assert abs(snap.stats.prod_cagr - ((120.0 / 100.0) ** 0.5 - 1.0)) < 1e-12
+    assert snap.base_at(2011) == (110.0, 11.0)
+    assert snap.base_at(2030) is None
+    assert cache.get() is snap
+
+    _write(path, [(2010, 100.0, 10.0, 2000, 1, 1, 0, "odisha"), (2020, 200.0, 20.0, 2000, 1, 1, 0, "odisha")])
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    snap2 = cache.get()
+    assert snap2 is not snap and snap2.version != snap.version
+    assert snap2.base_at(2015) == (150.0, 15.0)
+
+
+def test_unreadable_update_keeps_the_last_good_snapshot(tmp_path):
+    path = tmp_path / "coal_emissions.csv"
+    rows = [(2010, 100.0, 10.0, 2000, 1, 1, 0, "odisha"), (2011, 110.0, 11.0, 2000, 1, 1, 0, "odisha")]
+    _write(path, rows)
+    reads = []
+
+    def read(p):
+        reads.append(p)
+        return read_csv_columns(p)
+
+    cache = DatasetCache(path, check_interval_s=0, read=read)
+    snap = cache.get()
+
+    _write(path, rows + [(2012, "n/a", 12.0, 2000, 1, 1, 0, "odisha")])
+    assert cache.get() is snap
+    assert cache.stats()["loaded"] and cache.stats()["last_error"].startswith("ValueError")
+    # The failed version is read again on the next check rather than remembered as current
+    assert cache.get() is snap and len(reads) == 3
+
+    _write(path, rows + [(2012, 120.0, 12.0, 2000, 1, 1, 0, "odisha")])
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert cache.get().num_rows == 3 and cache.stats()["last_error"] is None
+
+
+def test_missing_dataset(tmp_path):
+    assert DatasetCache(tmp_path / "none.csv").get() is None
+
+
+def test_per_region_histories(tmp_path):
+    path = tmp_path / "coal_emissions.csv"
+    _write(path, [
+        (2010, 100.0, 10.0, 2000, 1, 1, 0, "odisha"),
+        (2010, 500.0, 50.0, 1900, 1, 1, 0, " Jharkhand"),
+        (2012, 121.0, 12.0, 2100, 1, 1, 0, "odisha"),
+        (2011, 400.0, 40.0, 1900, 1, 1, 0, "jharkhand"),
+    ])
+    snap = DatasetCache(path, check_interval_s=0).get()
+    assert sorted(snap.by_region) == ["jharkhand", "odisha"]
+    odisha, jharkhand = snap.by_region["odisha"], snap.by_region["jharkhand"]
+    assert odisha.rows == 2 and odisha.stats.base_prod == 121.0 and odisha.stats.ef == 2100
+    assert abs(odisha.stats.prod_cagr - 0.1) < 1e-12
+    assert jharkhand.stats.base_prod == 400.0 and jharkhand.stats.prod_slope == -100.0
+    assert odisha.base_at(2011) == (110.5, 11.0)
+    assert jharkhand.base_at(2012) is None
+    # National stats still come from the latest row overall
+    assert snap.stats.base_prod == 121.0
@@ -42,4 +42,179 @@ def test_recommend_strategies_basic():
     assert len(body) > 0
     first = body[0]
     for key in ["strategy", "category", "impact_level", "estimated_reduction_tco2e", "description"]:
-        assert key in first
\ No newline at end of file
+        assert key in first
+
+def test_predict_emissions_batch_reports_errors_per_scenario():
+    payload = {"scenarios": [
+        {"start_year": 2025, "end_year": 2027},
+        {"start_year": 2025, "end_year": 2030, "coal_production_tons": 7e8},
+        {"start_year": 2030, "end_year": 2025},
+        {"start_year": 1900, "end_year": 2025},
+    ]}
+    r = client.post('/predict_emissions/batch', json=payload)
+    assert r.status_code == 200
+    results = r.json()["results"]
+    assert [res["index"] for res in results] == [0, 1, 2, 3]
+    assert len(results[0]["predictions"]) == 3
+    assert len(results[1]["predictions"]) == 6
+    assert "error" in results[2] and "error" in results[3]
+
+
+def test_predict_emissions_batch_limits_and_all_invalid(monkeypatch):
+    from app import main
+
+    monkeypatch.setattr(main, "MAX_BATCH_SCENARIOS", 2)
+    r = client.post('/predict_emissions/batch', json={"scenarios": [{"start_year": 2025, "end_year": 2026}] * 3})
+    assert r.status_code == 413
+
+    def no_model():
+        raise AssertionError("model loaded for a batch with nothing to forecast")
+
+    monkeypatch.setattr(main, "load_or_train_model", no_model)
+    r = client.post('/predict_emissions/batch', json={"scenarios": [
+        {"start_year": 2030, "end_year": 2025}, {"start_year": "soon"},
+    ]})
+    assert r.status_code == 200
+    body = r.json()
+    assert body["source"] is None and all("error" in res for res in body["results"])
+
+
+def test_estimate_emissions_batch_json_and_csv():
+    payload = {
+        "year": [2024, 2024, 2025],
+        "coal_production_tons": [1_000_000, 10_000, 0],
+        "energy_consumption_mwh": [100_000, 1_000, 10],
+        "methane_emissions_tons": [100, 0, 0],
+        "emission_factor_kgco2_perton": [None, 2000, None],
+        "region": ["odisha", None, "jharkhand"],
+    }
+    r = client.post('/estimate_emissions/batch', json=payload)
+    assert r.status_code == 200
+    body = r.json()
+    assert body["count"] == 3
+    expected = 1_000_000 * 2100.0 / 1000.0 + 100_000 * 0.82 + 100
+    assert abs(body["total_emissions_tco2e"][0] - expected) < 1e-6
+    assert body["emission_level"] == ["high", "low", "low"]
+
+    csv_body = "year,coal_production_tons,energy_consumption_mwh,region\n2024,1000000,100000,odisha\n2024,10000,1000,\n"
+    r = client.post('/estimate_emissions/batch/csv', files={"file": ("inv.csv", csv_body, "text/csv")})
+    assert r.status_code == 200
+    assert r.json()["emission_factor_kgco2_perton"] == [2100.0, 2000.0]
+
+    r = client.post('/estimate_emissions/batch', json={**payload, "year": [2024, 2024]})
+    assert r.status_code == 400
+
+
+def test_calculate_stream_matches_single_calculation():
+    import json
+    body = (
+        "excavation,transportation,fuel,equipment,workers,output,fuelType,reduction\n"
+        "10,20,30,5,4,100,oil,3\n"
+        "1,2,bad,4,1,1,coal,0\n"
+    )
+    r = client.post('/calculate/stream', content=body, headers={"Content-Type": "text/csv"})
+    assert r.status_code == 200
+    lines = [json.loads(line) for line in r.text.splitlines()]
+    single = client.post('/calculate', json={
+        "excavation": 10, "transportation": 20, "fuel": 30, "equipment": 5,
+        "workers": 4, "output": 100, "fuelType": "oil", "reduction": 3,
+    }).json()
+    for key, value in single.items():
+        assert abs(lines[0][key] - value) < 1e-9
+    assert "error" in lines[1]
+    assert lines[-1]["summary"]["rows"] == 2 and lines[-1]["summary"]["error_rows"] == 1
+
+
+def test_streamed_csv_is_parsed_off_the_event_loop(monkeypatch):
+    import asyncio
+    import threading
+    from app import bulk
+
+    threads = []
+    real_split = bulk._split_records
+
+    def split(pending, finished):
+        threads.append(threading.current_thread())
+        return real_split(pending, finished)
+
+    monkeypatch.setattr(bulk, "_split_records", split)
+
+    async def body():
+        # A quoted newline and records cut across pieces
+        for piece in (b'a,b\n1,"x\ny', b'"\n2,', b"z\n"):
+            yield piece
+
+    async def collect():
+        return [rows async for _, rows in bulk.aiter_csv_chunks(body(), chunk_rows=10)]
+
+    assert asyncio.run(collect()) == [[["1", "x\ny"], ["2", "z"]]]
+    assert threads and threading.main_thread() not in threads
+
+
+def test_predict_emissions_served_from_cache_on_repeat():
+    payload = {"start_year": 2030, "end_year": 2033, "coal_production_tons": 5e8}
+    before = client.get('/status').json()["response_cache"]["hits"]
+    first = client.post('/predict_emissions', json=payload)
+    # Same body, different key order
+    second = client.post('/predict_emissions', json=dict(reversed(list(payload.items()))))
+    assert first.status_code == second.status_code == 200
+    assert first.content == second.content
+    assert client.get('/status').json()["response_cache"]["hits"] == before + 1
+
+
+def test_indian_regions_etag_revalidation():
+    r = client.get('/indian_regions')
+    assert r.status_code == 200
+    etag = r.headers["etag"]
+    assert len(r.json()["regions"]) == 4
+    r = client.get('/indian_regions', headers={"If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.content == b""
+    assert client.get('/get_strategies', headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_predict_emissions_by_region_uses_one_predict_call(monkeypatch):
+    from pathlib import Path
+
+    from app import main, services
+    from app.dataset import DatasetCache
+    from app.trajectory import PROD
+
+    csv_path = Path(__file__).resolve().parents[3] / "data" / "coal_emissions.csv"
+    monkeypatch.setattr(services, "_dataset_cache", DatasetCache(csv_path, check_interval_s=0))
+
+    class Model:
+        calls = []
+
+        def predict(self, X):
+            self.calls.append(X.shape)
+            return X[:, PROD] * 2.0
+
+    model = Model()
+    monkeypatch.setattr(main, "load_or_train_model", lambda: (model, []))
+
+    r = client.post('/predict_emissions', json={"start_year": 2030, "end_year": 2032, "region": "ALL"})
+    assert r.status_code == 200
+    body = r.json()
+    assert sorted(body["regions"]) == ["chhattisgarh", "jharkhand", "odisha", "west_bengal"]
+    # Four regions x three years, stacked into a single call
+    assert model.calls == [(12, 6)]
+    for i, point in enumerate(body["predictions"]):
+        total = sum(series[i]["predicted_total_emissions_tco2e"] for series in body["regions"].values())
+        assert abs(point["predicted_total_emissions_tco2e"] - total) < 1e-3
+
+    one = client.post('/predict_emissions', json={"start_year": 2030, "end_year": 2032, "region": "odisha"}).json()
+    assert one["region"] == "odisha" and one["predictions"] == body["regions"]["odisha"]
+
+    # A combined override is split across the regions, so their paths end on it together
+    r = client.post('/predict_emissions', json={"start_year": 2030, "end_year": 2032, "region": "all",
+                                                "coal_production_tons": 4e9})
+    assert abs(r.json()["predictions"][-1]["predicted_total_emissions_tco2e"] - 8e9) < 1e-3
+
+    assert client.post('/predict_emissions', json={"start_year": 2030, "end_year": 2032,
+                                                   "region": "kerala"}).status_code == 400
+    batch = client.post('/predict_emissions/batch', json={"scenarios": [
+        {"start_year": 2030, "end_year": 2031, "region": "odisha"},
+        {"start_year": 2030, "end_year": 2031, "region": "all"},
+    ]}).json()["results"]
+    assert len(batch[0]["predictions"]) == 2 and "error" in batch[1]
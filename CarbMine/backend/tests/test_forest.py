@@ -0,0 +1,100 @@
+import importlib.util
+import os
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.forest import load_compact_forest
+from app.model_registry import FEATURE_COLUMNS, ModelRegistry
+
+sklearn_ensemble = pytest.importorskip("sklearn.ensemble")
+
+EXPORT_PATH = Path(__file__).resolve().parents[3] / "ml" / "export_forest.py"
+
+
+def _export_module():
+    spec = importlib.util.spec_from_file_location("ml_export_forest", str(EXPORT_PATH))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _fitted_forest():
+    rng = np.random.default_rng(7)
+    X = rng.uniform(0, 1e6, size=(400, 6))
+    # Repeated values put inputs exactly on split boundaries
+    X[:, 0] = rng.integers(2000, 2030, size=400)
+    y = X[:, 1] * 2.0 + X[:, 2] * 0.8 + rng.normal(0, 1e4, size=400)
+    model = sklearn_ensemble.RandomForestRegressor(n_estimators=25, random_state=0).fit(X, y)
+    return model, X
+
+
+def test_compact_forest_matches_sklearn(tmp_path):
+    model, X = _fitted_forest()
+    path = _export_module().export_forest(model, tmp_path / "model.forest.npz")
+    forest = load_compact_forest(path)
+
+    probe = np.vstack([X, X * 1.01, np.random.default_rng(1).uniform(0, 1e6, size=(50, 6))])
+    np.testing.assert_allclose(forest.predict(probe), model.predict(probe), rtol=1e-12)
+    assert forest.n_estimators == 25
+
+
+def test_registry_prefers_compact_forest(tmp_path):
+    import joblib
+
+    model, X = _fitted_forest()
+    joblib.dump(model, tmp_path / "model.pkl")
+    registry = ModelRegistry(tmp_path / "model.pkl", FEATURE_COLUMNS, check_interval_s=0,
+                             compact_path=tmp_path / "model.forest.npz")
+    assert registry.stats()["format"] is None
+    registry.get()
+    assert registry.stats()["format"] == "pickle"
+
+    _export_module().export_forest(model, tmp_path / "model.forest.npz")
+    loaded, _ = registry.get()
+    assert registry.stats()["format"] == "compact"
+    np.testing.assert_allclose(loaded.predict(X[:5]), model.predict(X[:5]), rtol=1e-12)
+
+
+def test_registry_skips_a_compact_export_of_an_older_model(tmp_path):
+    import joblib
+
+    model, X = _fitted_forest()
+    pickle_path, compact_path = tmp_path / "model.pkl", tmp_path / "model.forest.npz"
+    joblib.dump(model, pickle_path)
+    export = _export_module().export_forest
+    export(model, compact_path, source=pickle_path)
+    registry = ModelRegistry(pickle_path, FEATURE_COLUMNS, check_interval_s=0, compact_path=compact_path)
+    registry.get()
+    assert registry.stats()["format"] == "compact"
+
+    # Retrained without re-exporting, even with the export touched afterwards
+    retrained = sklearn_ensemble.RandomForestRegressor(n_estimators=5, random_state=1).fit(X, X[:, 0])
+    joblib.dump(retrained, pickle_path)
+    os.utime(compact_path)
+    loaded, _ = registry.get()
+    assert registry.stats()["format"] == "pickle"
+    np.testing.assert_array_equal(loaded.predict(X[:5]), retrained.predict(X[:5]))
+
+    export(retrained, compact_path, source=pickle_path)
+    registry.get()
+    assert registry.stats()["format"] == "compact"
+
+    # Exports without a recorded source are trusted only while at least as new as the pickle
+    export(retrained, compact_path)
+    st = os.stat(compact_path)
+    os.utime(pickle_path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    registry.get()
+    assert registry.stats()["format"] == "pickle"
+
+
+def test_memory_mapped_forest_is_read_only_and_identical(tmp_path):
+    model, X = _fitted_forest()
+    path = _export_module().export_forest(model, tmp_path / "model.forest.npz")
+    mapped = load_compact_forest(path, mmap=True)
+    copied = load_compact_forest(path, mmap=False)
+
+    assert not mapped.children.flags.writeable
+    assert all(a.flags.aligned for a in (mapped.feature, mapped.threshold, mapped.children, mapped.value))
+    np.testing.assert_array_equal(mapped.predict(X), copied.predict(X))
@@ -0,0 +1,114 @@
+import csv
+import importlib.util
+from pathlib import Path
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app import services
+from app.dataset import read_csv_columns
+from app.main import app
+
+DATASTORE_PATH = Path(__file__).resolve().parents[3] / "ml" / "datastore.py"
+HEADER = [
+    "Year",
+    "Coal_Production_Tons",
+    "Energy_Consumption_MWh",
+    "Emission_Factor_kgCO2_perTon",
+    "Methane_Emissions_tons",
+    "Other_GHG_Emissions_tons",
+    "Total_Emissions_tCO2e",
+    "Region",
+]
+
+
+def _datastore_module():
+    spec = importlib.util.spec_from_file_location("ml_datastore_tests", str(DATASTORE_PATH))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _write_csv(path, n=200, seed=0):
+    rng = np.random.default_rng(seed)
+    regions = ["jharkhand", "Odisha ", "west_bengal"]
+    rows = []
+    for i in range(n):
+        prod = rng.uniform(4e8, 7e8)
+        rows.append([2000 + i % 20, prod, prod / 1000, 2000.0, prod * 2e-5, prod * 1e-5, prod * 2.1, regions[i % 3]])
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(rows)
+    return rows
+
+
+@pytest.fixture
+def datastore():
+    return _datastore_module()
+
+
+def test_store_matches_csv_and_rebuild_keeps_ingested_rows(datastore, tmp_path):
+    seed, store = tmp_path / "seed.csv", tmp_path / "store.sqlite3"
+    _write_csv(seed)
+    assert datastore.ensure_store(store, seed)
+    assert not datastore.ensure_store(store, seed)
+
+    columns, regions = datastore.read_columns(store)
+    csv_columns, csv_regions = read_csv_columns(seed)
+    for name, values in csv_columns.items():
+        np.testing.assert_array_equal(columns[name], values)
+    assert list(regions) == list(csv_regions)
+
+    datastore.append_rows([(2030, 1.0, 2.0, 3.0, 4.0, 5.0, 6.0, "odisha")], store)
+    # Editing the seed rebuilds the store; the ingested row survives
+    _write_csv(seed, n=30, seed=1)
+    assert datastore.ensure_store(store, seed)
+    assert datastore.count_rows(store) == 31
+    assert (2030, "odisha") in datastore.existing_keys(store)
+
+
+def test_query_history_aggregates_filtered_groups(datastore, tmp_path):
+    seed, store = tmp_path / "seed.csv", tmp_path / "store.sqlite3"
+    rows = _write_csv(seed)
+    datastore.build_store(store, seed)
+
+    result = datastore.query_history(store, year_min=2005, year_max=2007, regions=["ODISHA"],
+                                     group_by=["year", "region"], metrics=["coal_production_tons"], agg="avg")
+    assert [(r["year"], r["region"]) for r in result] == [(2005, "odisha"), (2006, "odisha"), (2007, "odisha")]
+    for r in result:
+        expected = [row[1] for row in rows if row[0] == r["year"] and row[7].strip().lower() == "odisha"]
+        assert r["rows"] == len(expected)
+        assert r["coal_production_tons"] == pytest.approx(np.mean(expected))
+
+    total = datastore.query_history(store, group_by=[], metrics=["total_emissions_tco2e"])
+    assert total == [{"rows": 200, "total_emissions_tco2e": pytest.approx(sum(row[6] for row in rows))}]
+    assert datastore.query_history(store, year_min=2100) == []
+    with pytest.raises(ValueError):
+        datastore.query_history(store, metrics=["Region"])
+
+
+def test_history_endpoint(datastore, tmp_path, monkeypatch):
+    seed, store = tmp_path / "seed.csv", tmp_path / "store.sqlite3"
+    _write_csv(seed)
+    datastore.build_store(store, seed)
+    monkeypatch.setattr(services, "_datastore", datastore)
+    monkeypatch.setattr(services, "DATASTORE_PATH", store)
+    client = TestClient(app)
+
+    r = client.get("/history", params={"year_min": 2010, "year_max": 2011, "group_by": "year,region",
+                                       "region": ["jharkhand", "west_bengal"], "agg": "max"})
+    assert r.status_code == 200
+    body = r.json()
+    assert [(row["year"], row["region"]) for row in body["rows"]] == [
+        (2010, "jharkhand"), (2010, "west_bengal"), (2011, "jharkhand"), (2011, "west_bengal"),
+    ]
+    assert body["agg"] == "max" and body["group_by"] == ["year", "region"]
+    # "both" is shorthand for year,region
+    both = client.get("/history", params={"year_min": 2010, "year_max": 2011, "group_by": "both",
+                                          "region": ["jharkhand", "west_bengal"], "agg": "max"})
+    assert both.status_code == 200 and both.json()["rows"] == body["rows"]
+
+    assert client.get("/history", params={"agg": "median"}).status_code == 400
+    assert client.get("/history", params={"group_by": "mine"}).status_code == 400
@@ -0,0 +1,111 @@
+import importlib
+import json
+import sys
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("sklearn.ensemble")
+
+ML_DIR = Path(__file__).resolve().parents[3] / "ml"
+COLUMNS = [
+    "Year",
+    "Coal_Production_Tons",
+    "Energy_Consumption_MWh",
+    "Emission_Factor_kgCO2_perTon",
+    "Methane_Emissions_tons",
+    "Other_GHG_Emissions_tons",
+    "Total_Emissions_tCO2e",
+    "Region",
+]
+
+
+@pytest.fixture
+def data_ingest(monkeypatch):
+    # The ml/ scripts import each other as top-level modules
+    monkeypatch.syspath_prepend(str(ML_DIR))
+    yield importlib.import_module("data_ingest")
+    for name in ("data_ingest", "train", "artifacts", "datastore", "export_forest"):
+        sys.modules.pop(name, None)
+
+
+def _rows(years, regions, seed=0):
+    rng = np.random.default_rng(seed)
+    n = len(years)
+    prod = rng.uniform(4e8, 7e8, n)
+    energy = prod / 1000 + 80_000
+    ef = rng.uniform(1800, 2100, n)
+    return pd.DataFrame({
+        "Year": years,
+        "Coal_Production_Tons": prod.round(2),
+        "Energy_Consumption_MWh": energy.round(2),
+        "Emission_Factor_kgCO2_perTon": ef.round(2),
+        "Methane_Emissions_tons": (prod * 2e-5).round(2),
+        "Other_GHG_Emissions_tons": (prod * 1e-5).round(2),
+        "Total_Emissions_tCO2e": (prod * ef / 1000 + energy * 0.82).round(2),
+        "Region": regions,
+    })[COLUMNS]
+
+
+def _paths(tmp_path):
+    return {
+        "artifacts_dir": tmp_path / "artifacts",
+        "model_path": tmp_path / "model.pkl",
+        "compact_path": tmp_path / "model.forest.npz",
+        "metrics_path": tmp_path / "model_metrics.json",
+    }
+
+
+def test_new_rows_are_deduplicated_on_year_and_region(data_ingest, tmp_path):
+    datastore = data_ingest.datastore
+    store = tmp_path / "store.sqlite3"
+    _rows([2020, 2020, 2021], ["odisha", "jharkhand", "odisha"]).to_csv(tmp_path / "seed.csv", index=False)
+    datastore.build_store(store, tmp_path / "seed.csv")
+    batch = _rows([2021, 2022, 2022, 2022], [" Odisha", "odisha", "jharkhand", "odisha"], seed=1)
+    batch.to_csv(tmp_path / "batch.csv", index=False)
+
+    new = data_ingest.select_new_rows(data_ingest.read_batch(tmp_path / "batch.csv"), datastore.existing_keys(store))
+    # 2021/odisha is already stored; the later of the two 2022/odisha rows wins
+    assert sorted(zip(new["Year"], new["Region"])) == [(2022, "jharkhand"), (2022, "odisha")]
+    assert new.loc[new["Region"] == "odisha", "Coal_Production_Tons"].item() == batch.iloc[3]["Coal_Production_Tons"]
+
+    datastore.append_rows(data_ingest.store_rows(new), store)
+    assert datastore.count_rows(store) == 5
+    assert (2022, "jharkhand") in datastore.existing_keys(store)
+
+
+def test_incremental_ingest_grows_the_model_and_versions_it(data_ingest, tmp_path):
+    seed_csv, store = tmp_path / "seed.csv", tmp_path / "store.sqlite3"
+    regions = ["jharkhand", "chhattisgarh", "odisha", "west_bengal"]
+    years = [2010 + i // 4 for i in range(80)]
+    _rows(years, [regions[i % 4] for i in range(80)]).to_csv(seed_csv, index=False)
+    _rows([2030] * 4 + [2031] * 4, regions * 2, seed=2).to_csv(tmp_path / "batch.csv", index=False)
+    paths = _paths(tmp_path)
+    store_args = {"store_path": store, "seed_csv": seed_csv, "model_path": paths["model_path"]}
+
+    first = data_ingest.ingest_incremental(tmp_path / "batch.csv", **store_args, seed=0, publish_kwargs=paths)
+    # No model yet: the first ingest trains from scratch
+    assert first["mode"] == "full" and first["new_rows"] == 8
+
+    _rows([2032] * 4, regions, seed=3).to_csv(tmp_path / "batch.csv", index=False)
+    second = data_ingest.ingest_incremental(tmp_path / "batch.csv", **store_args, add_trees=7, max_trees=405,
+                                            seed=0, publish_kwargs=paths)
+    assert second["mode"] == "incremental" and second["new_rows"] == 4
+    # 400 + 7 trees, capped at 405 by retiring the two oldest
+    assert second["n_estimators"] == 405
+    assert len(joblib.load(paths["model_path"]).estimators_) == 405
+    assert data_ingest.datastore.count_rows(store) == 92
+    # The seed CSV is left as it was
+    assert len(pd.read_csv(seed_csv)) == 80
+
+    manifest = json.loads((paths["artifacts_dir"] / "manifest.json").read_text())
+    assert manifest["current"] == second["version"]
+    assert [v["parent"] for v in manifest["versions"]] == [None, first["version"]]
+    assert (paths["artifacts_dir"] / second["version"] / "model.forest.npz").exists()
+
+    # Replaying the same batch adds nothing and publishes nothing
+    again = data_ingest.ingest_incremental(tmp_path / "batch.csv", **store_args, publish_kwargs=paths)
+    assert again["new_rows"] == 0 and again["version"] is None
@@ -0,0 +1,185 @@
+import sqlite3
+import sys
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from app.jobs import JOBS_INPUT_DIR, JobQueue, run_process
+from app.main import app
+
+
+def _queue(tmp_path, handlers, **kwargs):
+    return JobQueue(tmp_path / "jobs.sqlite3", handlers, workers=1, poll_interval_s=0.05, **kwargs)
+
+
+def test_identical_jobs_are_deduplicated_until_finished(tmp_path):
+    calls = []
+
+    def handler(args, progress):
+        progress(0.5, "halfway")
+        calls.append(args)
+        return {"rows": args["n"]}
+
+    queue = _queue(tmp_path, {"ingest": handler})
+    first, created = queue.enqueue("ingest", {"n": 1})
+    again, created_again = queue.enqueue("ingest", {"n": 1})
+    other, _ = queue.enqueue("ingest", {"n": 2})
+    assert created and not created_again
+    assert again.id == first.id and other.id != first.id
+
+    assert queue.run_pending() == 2
+    assert calls == [{"n": 1}, {"n": 2}]
+    done = queue.get(first.id)
+    assert done.status == "succeeded" and done.progress == 1.0
+    assert done.message == "halfway" and done.result == {"rows": 1}
+
+    # Finished jobs don't block a new run with the same arguments
+    rerun, created = queue.enqueue("ingest", {"n": 1})
+    assert created and rerun.id != first.id
+
+
+def test_failed_job_records_error_and_honours_cooldown(tmp_path):
+    def handler(args, progress):
+        raise RuntimeError("no dataset")
+
+    queue = _queue(tmp_path, {"train": handler})
+    job, _ = queue.enqueue("train")
+    queue.run_pending()
+    failed = queue.get(job.id)
+    assert failed.status == "failed" and failed.error == "RuntimeError: no dataset"
+
+    retry, created = queue.enqueue("train", cooldown_s=60)
+    assert not created and retry.id == job.id
+    assert queue.enqueue("train")[1]
+
+
+def test_jobs_of_a_lost_process_are_requeued(tmp_path):
+    lost = _queue(tmp_path, {"train": lambda args, progress: None}, stale_after_s=10, max_attempts=2)
+    job, _ = lost.enqueue("train")
+    assert lost.claim().id == job.id
+    # The process died: its heartbeat stops
+    with sqlite3.connect(str(lost.path)) as conn:
+        conn.execute("UPDATE jobs SET heartbeat_at = ?", (time.time() - 60,))
+
+    survivor = _queue(tmp_path, {"train": lambda args, progress: {"ok": True}}, stale_after_s=10)
+    assert survivor.recover_stale() == 1
+    assert survivor.get(job.id).status == "queued"
+    survivor.run_pending()
+    finished = survivor.get(job.id)
+    assert finished.status == "succeeded" and finished.attempts == 2
+
+
+def test_worker_pool_runs_jobs_in_the_background(tmp_path):
+    started = threading.Event()
+    release = threading.Event()
+
+    def handler(args, progress):
+        started.set()
+        release.wait(5)
+        return "done"
+
+    queue = _queue(tmp_path, {"train": handler})
+    queue.start()
+    try:
+        job, _ = queue.enqueue("train")
+        assert started.wait(5)
+        assert queue.get(job.id).status == "running"
+        assert queue.stats()["running_in_process"] == 1
+        release.set()
+        deadline = time.time() + 5
+        while queue.get(job.id).status == "running" and time.time() < deadline:
+            time.sleep(0.02)
+        assert queue.get(job.id).result == "done"
+    finally:
+        release.set()
+        queue.stop()
+
+
+def test_finished_jobs_are_cleaned_up_once(tmp_path):
+    cleaned = []
+
+    def handler(args, progress):
+        if args["n"] > 1:
+            raise RuntimeError("bad rows")
+        return "ok"
+
+    queue = _queue(tmp_path, {"ingest": handler}, cleanup={"ingest": lambda args: cleaned.append(args["n"])},
+                   stale_after_s=10, max_attempts=1)
+    queue.enqueue("ingest", {"n": 1})
+    queue.enqueue("ingest", {"n": 2})
+    queue.run_pending()
+    assert cleaned == [1, 2]
+
+    # Failing while the queue shuts down: requeued with its input intact
+    queue.enqueue("ingest", {"n": 3})
+    job = queue.claim()
+    queue._stop.set()
+    queue.run(job)
+    assert queue.get(job.id).status == "queued" and cleaned == [1, 2]
+
+    # Lost for good once its process stops heartbeating
+    queue._stop.clear()
+    assert queue.claim().id == job.id
+    with sqlite3.connect(str(queue.path)) as conn:
+        conn.execute("UPDATE jobs SET heartbeat_at = ?", (time.time() - 60,))
+    assert queue.recover_stale() == 1
+    assert queue.get(job.id).status == "failed" and cleaned == [1, 2, 3]
+
+
+def test_run_process_reports_stages_as_they_are_printed(tmp_path):
+    flag = tmp_path / "seen"
+    # Printed without flushing: only reaches us before exit if the child's output is unbuffered
+    code = (
+        "import os, time\n"
+        "print('progress 0.40 fitting')\n"
+        "deadline = time.time() + 5\n"
+        f"while not os.path.exists({str(flag)!r}) and time.time() < deadline: time.sleep(0.01)\n"
+        f"print({{'seen': os.path.exists({str(flag)!r})}})\n"
+    )
+    reports = []
+
+    def progress(fraction, message):
+        reports.append((fraction, message))
+        if fraction == 0.4:
+            flag.touch()
+
+    result = run_process([sys.executable, "-c", code], progress)
+    assert (0.4, "fitting") in reports
+    assert result == {"returncode": 0, "summary": {"seen": True}}
+
+
+def test_job_endpoints(monkeypatch):
+    from app import main
+
+    client = TestClient(app)
+    upload = {"file": ("rows.csv", b"Year,Region\n2030,odisha\n", "text/csv")}
+    # Queuing is refused while no token is configured, and without the right one once it is
+    assert client.post("/jobs/train").status_code == 403
+    monkeypatch.setattr(main, "JOBS_ADMIN_TOKEN", "s3cret")
+    assert client.post("/jobs/train").status_code == 401
+    assert client.post("/jobs/ingest", files=upload, headers={"X-Jobs-Token": "wrong"}).status_code == 401
+    auth = {"X-Jobs-Token": "s3cret"}
+
+    r = client.post("/jobs/train", headers=auth)
+    assert r.status_code == 202
+    job = r.json()["job"]
+    # Same job while it is still queued
+    r = client.post("/jobs/train", headers=auth)
+    assert r.json()["job"]["id"] == job["id"] and r.json()["created"] is False
+
+    r = client.get(f"/jobs/{job['id']}")
+    assert r.status_code == 200
+    assert r.json()["status"] == "queued" and r.json()["kind"] == "train"
+    assert any(j["id"] == job["id"] for j in client.get("/jobs", params={"status": "queued"}).json()["jobs"])
+    assert client.get("/jobs/missing").status_code == 404
+
+    assert client.post("/jobs/ingest", params={"incremental": "false"}, files=upload, headers=auth).status_code == 400
+    r = client.post("/jobs/ingest", files=upload, headers=auth)
+    assert r.status_code == 202
+    job = r.json()["job"]
+    assert job["args"]["csv"].endswith(".csv")
+    # Identical bytes: the same job, and only its own staged copy is kept
+    again = client.post("/jobs/ingest", files=upload, headers=auth).json()
+    assert again["job"]["id"] == job["id"] and again["created"] is False
+    assert [str(p) for p in JOBS_INPUT_DIR.glob(f"{job['args']['sha256']}-*.csv")] == [job["args"]["csv"]]
@@ -0,0 +1,95 @@
+import threading
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.metrics import MetricsRegistry
+
+
+def _sample(text, prefix):
+    for line in text.splitlines():
+        if line.startswith(prefix + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+def test_thread_shards_sum_into_prometheus_text():
+    registry = MetricsRegistry()
+    hits = registry.counter("demo_hits_total", "Hits", ("kind",))
+    latency = registry.histogram("demo_seconds", "Latency", buckets=(0.1, 1.0))
+
+    def work():
+        for _ in range(1000):
+            hits.inc("a")
+        latency.observe(0.05)
+        latency.observe(0.5)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    hits.inc('quo"te', amount=2.5)
+    latency.observe(5.0)
+
+    text = registry.render()
+    assert "# TYPE demo_hits_total counter" in text
+    assert _sample(text, 'demo_hits_total{kind="a"}') == 4000
+    assert _sample(text, 'demo_hits_total{kind="quo\\"te"}') == 2.5
+    # Buckets are cumulative; +Inf equals the count
+    assert _sample(text, 'demo_seconds_bucket{le="0.1"}') == 4
+    assert _sample(text, 'demo_seconds_bucket{le="1"}') == 8
+    assert _sample(text, 'demo_seconds_bucket{le="+Inf"}') == 9
+    assert _sample(text, "demo_seconds_count") == 9
+    assert abs(_sample(text, "demo_seconds_sum") - 7.2) < 1e-9
+    assert registry.counter("demo_hits_total", "again", ("kind",)) is hits
+
+
+def test_exited_threads_shards_are_merged_not_kept():
+    registry = MetricsRegistry()
+    hits = registry.counter("demo_hits_total", "Hits")
+    latency = registry.histogram("demo_seconds", "Latency", buckets=(0.1,))
+
+    def work():
+        hits.inc()
+        latency.observe(0.05)
+
+    for _ in range(200):
+        t = threading.Thread(target=work)
+        t.start()
+        t.join()
+    hits.inc()
+    # Only the live main thread still owns a shard
+    assert len(hits._shards) == 1 and len(latency._shards) == 0
+    assert hits.value() == 201 and latency.count() == 200
+    text = registry.render()
+    assert _sample(text, "demo_hits_total") == 201
+    assert _sample(text, 'demo_seconds_bucket{le="0.1"}') == 200
+
+
+def test_metrics_endpoint_reports_routes_fallbacks_uploads_and_queries():
+    with TestClient(app) as client:
+        # No model in the test environment: the heuristic serves
+        assert client.post("/predict_emissions", json={"start_year": 2041, "end_year": 2043}).status_code == 200
+        r = client.post("/upload_pdf", params={"uid": "metrics-user"},
+                        files={"file": ("m.pdf", b"%PDF-1.4\n" + b"m" * 3000, "application/pdf")})
+        assert r.status_code == 200
+        assert client.get("/no/such/path").status_code == 404
+        assert client.get("/uploads/no-such-file.pdf").status_code == 404
+
+        r = client.get("/metrics")
+        assert r.status_code == 200 and r.headers["content-type"].startswith("text/plain; version=0.0.4")
+        text = r.text
+        assert _sample(text, 'zerith_http_request_duration_seconds_count{method="POST",route="/predict_emissions",status="200"}') >= 1
+        assert _sample(text, 'zerith_http_request_duration_seconds_count{method="POST",route="/upload_pdf",status="200"}') >= 1
+        # Unknown paths share one label
+        assert _sample(text, 'zerith_http_request_duration_seconds_count{method="GET",route="unmatched",status="404"}') >= 1
+        assert "/no/such/path" not in text
+        # Mounted apps are labelled by their mount point, not as unmatched
+        assert _sample(text, 'zerith_http_request_duration_seconds_count{method="GET",route="/uploads/{path}",status="404"}') >= 1
+        assert _sample(text, 'zerith_forecast_series_total{path="heuristic"}') >= 1
+        assert _sample(text, 'zerith_forecast_fallbacks_total{reason="no_model"}') >= 1
+        assert _sample(text, 'zerith_upload_size_bytes_bucket{le="4096"}') >= 1
+        assert _sample(text, 'zerith_db_query_duration_seconds_count{engine="async_write",operation="INSERT"}') >= 1
+        assert _sample(text, "zerith_model_loaded") == 0
+        assert "zerith_response_cache_requests_total" in text
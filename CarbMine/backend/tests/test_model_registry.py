@@ -0,0 +1,35 @@
+import os
+
+import joblib
+import pytest
+
+from app.model_registry import FEATURE_COLUMNS, ModelRegistry
+
+
+def test_registry_caches_and_hot_swaps(tmp_path):
+    path = tmp_path / "model.pkl"
+    joblib.dump({"version": 1}, path)
+    registry = ModelRegistry(path, FEATURE_COLUMNS, check_interval_s=0)
+
+    model, columns = registry.get()
+    assert model == {"version": 1}
+    assert columns == FEATURE_COLUMNS
+    # Unchanged file: same object, no reload
+    assert registry.get()[0] is model
+
+    joblib.dump({"version": 2}, path)
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert registry.get()[0] == {"version": 2}
+
+    stats = registry.stats()
+    assert stats["reload_count"] == 1
+    assert stats["last_reload_at"] is not None
+    assert stats["load_seconds"] >= 0
+
+
+def test_registry_missing_model(tmp_path):
+    registry = ModelRegistry(tmp_path / "missing.pkl", FEATURE_COLUMNS)
+    with pytest.raises(FileNotFoundError):
+        registry.get()
+    assert registry.stats()["loaded"] is False
@@ -0,0 +1,94 @@
+import pstats
+import threading
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.profiling import PROFILER, ProfileStore, RequestProfile
+
+CALCULATE = {"excavation": 10, "transportation": 20, "fuel": 30, "equipment": 5,
+             "workers": 4, "output": 100, "fuelType": "coal", "reduction": 3}
+
+
+def test_profiling_off_ignores_the_header_and_hides_the_admin_endpoints(monkeypatch):
+    monkeypatch.setattr(PROFILER, "enabled", False)
+    client = TestClient(app)
+    r = client.post("/calculate", json=CALCULATE, headers={"X-Profile": "cprofile"})
+    assert r.status_code == 200 and "x-profile-id" not in r.headers
+    assert client.get("/admin/profiles").status_code == 404
+
+
+def test_header_profile_covers_the_threadpool_endpoint_and_is_downloadable(monkeypatch, tmp_path):
+    monkeypatch.setattr(PROFILER, "enabled", True)
+    monkeypatch.setattr(PROFILER, "token", "s3cret")
+    monkeypatch.setattr(PROFILER, "store", ProfileStore(tmp_path, keep=2))
+    # The endpoint itself is cheap next to the framework around it
+    monkeypatch.setattr(PROFILER, "top_n", 1000)
+    client = TestClient(app)
+    auth = {"X-Profile-Token": "s3cret"}
+
+    # Without the token the header is ignored and the admin endpoints refuse
+    r = client.post("/calculate", json=CALCULATE, headers={"X-Profile": "cprofile"})
+    assert r.status_code == 200 and "x-profile-id" not in r.headers
+    assert client.get("/admin/profiles").status_code == 401
+
+    r = client.post("/calculate", json=CALCULATE, headers={"X-Profile": "cprofile", **auth})
+    assert r.status_code == 200
+    profile_id = r.headers["x-profile-id"]
+    report = client.get(f"/admin/profiles/{profile_id}", headers=auth).json()
+    assert report["mode"] == "cprofile" and report["status"] == 200 and report["path"] == "/calculate"
+    # The sync endpoint runs on a threadpool thread; its own profile is merged in
+    assert any(f["function"].endswith("(calculate_legacy)") for f in report["functions"])
+    assert "allocations" in report and report["files"] == ["pstats"]
+
+    r = client.get(f"/admin/profiles/{profile_id}/pstats", headers=auth)
+    assert r.status_code == 200
+    dump = tmp_path / "downloaded.pstats"
+    dump.write_bytes(r.content)
+    assert any(name == "calculate_legacy" for _, _, name in pstats.Stats(str(dump)).stats)
+    assert client.get(f"/admin/profiles/{profile_id}/../../etc", headers=auth).status_code == 404
+    assert client.get("/admin/profiles/not-an-id", headers=auth).status_code == 404
+
+    # Stack sampling, then the ring keeps only the newest two
+    r = client.post("/calculate", json=CALCULATE, headers={"X-Profile": "sample", **auth})
+    sampled = r.headers["x-profile-id"]
+    client.post("/calculate", json=CALCULATE, headers={"X-Profile": "1", **auth})
+    listed = client.get("/admin/profiles", headers=auth).json()["profiles"]
+    assert len(listed) == 2 and profile_id not in {p["id"] for p in listed}
+    assert "functions" not in listed[0]
+    report = client.get(f"/admin/profiles/{sampled}", headers=auth).json()
+    assert report["mode"] == "sample" and report["files"] == ["folded"]
+    assert client.get(f"/admin/profiles/{sampled}/folded", headers=auth).status_code == 200
+    assert not list(tmp_path.glob(f"{profile_id}.*"))
+
+
+def test_sample_rate_profiles_without_the_header(monkeypatch, tmp_path):
+    monkeypatch.setattr(PROFILER, "enabled", True)
+    monkeypatch.setattr(PROFILER, "token", "")
+    monkeypatch.setattr(PROFILER, "sample_rate", 1.0)
+    monkeypatch.setattr(PROFILER, "store", ProfileStore(tmp_path))
+    client = TestClient(app)
+    profile_id = client.get("/health").headers["x-profile-id"]
+    assert PROFILER.store.get(profile_id)["trigger"] == "sample"
+    # No admin token configured: profiles are recorded but never served
+    assert client.get("/admin/profiles").status_code == 403
+    assert client.get(f"/admin/profiles/{profile_id}").status_code == 403
+
+
+def test_sync_call_on_another_thread_is_profiled():
+    # The path ProfiledRoute takes for sync endpoints; on 3.12+ a second enabled cProfile raises
+    def work():
+        return sum(i * i for i in range(1000))
+
+    profile = RequestProfile("cprofile", top_n=1000, trace_allocations=False)
+    profile.start()
+    try:
+        results = []
+        thread = threading.Thread(target=lambda: results.append(profile.run(work, (), {})))
+        thread.start()
+        thread.join()
+    finally:
+        profile.stop()
+    assert results == [sum(i * i for i in range(1000))]
+    report, _ = profile.finish({})
+    assert any(f["function"].endswith("(work)") for f in report["functions"])
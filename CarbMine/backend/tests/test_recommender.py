@@ -0,0 +1,67 @@
+import os
+import shutil
+from pathlib import Path
+
+from app.recommender import RecommenderPlugin
+
+ROOT = Path(__file__).resolve().parents[3]
+
+
+def test_plugin_loads_once_and_reloads_on_catalogue_change(tmp_path):
+    module_path = tmp_path / "recommend.py"
+    catalogue_path = tmp_path / "strategies.csv"
+    shutil.copy(ROOT / "ml" / "recommend.py", module_path)
+    shutil.copy(ROOT / "data" / "strategies.csv", catalogue_path)
+
+    plugin = RecommenderPlugin(module_path, catalogue_path, check_interval_s=0)
+    first = plugin.get()
+    assert first.accepts_rows
+    recs = plugin.recommend(sector="mining", emission_value=250_000, region=None)
+    assert recs and all("strategy" in r for r in recs)
+    assert plugin.get() is first
+
+    with open(catalogue_path, "a", encoding="utf-8") as f:
+        f.write("Test Strategy,Energy Efficiency,High,0.5,Added in test,mining\n")
+    st = os.stat(catalogue_path)
+    os.utime(catalogue_path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    second = plugin.get()
+    assert second is not first
+    # Only the catalogue changed: the module is not re-executed
+    assert second.module is first.module
+    assert len(second.catalogue) == len(first.catalogue) + 1
+
+    stats = plugin.stats()
+    assert stats["reload_count"] == 1 and stats["rank_calls"] == 1
+
+
+def test_index_matches_full_sort():
+    import importlib.util
+    import random
+
+    spec = importlib.util.spec_from_file_location("ml_recommend_test", str(ROOT / "ml" / "recommend.py"))
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+
+    rng = random.Random(7)
+    categories = ["Renewable Energy", "Energy Efficiency", "Offset Projects", "Policy/Behavioral", "Carbon Capture"]
+    rows = [{
+        "strategy": f"s{i}",
+        "category": rng.choice(categories),
+        "impact_level": rng.choice(["High", "Medium", "Low"]),
+        "estimated_reduction_tco2e": rng.random(),
+        "description": "",
+        "sector": rng.choice(["mining", "industrial", "cross-sector", None]),
+    } for i in range(500)]
+    index = mod.build_index(rows)
+    sectors = ["mining", "industrial", "coal mining", "MINING", "", "unknown", "cross-sector industrial mining"]
+    for _ in range(2):
+        # The second pass is served from the memo
+        for sector in sectors:
+            for emission_value in [10_000, 50_000, 250_000, 500_000, 2_000_000]:
+                expected = sorted(rows, key=lambda r: mod._score(r, sector, emission_value), reverse=True)[:10]
+                assert index.top(sector, emission_value) == expected
+
+    index.MEMO_SIZE = 4
+    for i in range(10):
+        index.top(f"mining site {i}", 250_000)
+    assert len(index._memo) == 4
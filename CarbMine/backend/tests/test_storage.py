@@ -0,0 +1,147 @@
+import asyncio
+import hashlib
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from app import storage, uploads
+from app.database import AsyncWriteSession, SessionLocal, dispose_async_engines
+from app.main import app
+from app.models import PdfBlob
+
+
+def test_upload_pdf_streams_and_checksums():
+    content = b"%PDF-1.4\n" + b"0" * 300_000
+    with TestClient(app) as client:
+        r = client.post('/upload_pdf', params={"uid": "user-1"}, files={"file": ("report.pdf", content, "application/pdf")})
+        assert r.status_code == 200
+        body = r.json()
+        assert body["size_bytes"] == len(content)
+        assert body["sha256"] == hashlib.sha256(content).hexdigest()
+
+
+def test_upload_pdf_rejects_oversized_files():
+    content = b"%PDF-1.4\n" + b"0" * (2 * 1024 * 1024)
+    with TestClient(app) as client:
+        r = client.post('/upload_pdf', params={"uid": "user-1"}, files={"file": ("big.pdf", content, "application/pdf")})
+        assert r.status_code == 413
+
+
+def test_identical_uploads_share_one_blob_until_last_delete():
+    content = b"%PDF-1.4\n" + b"same report" * 1000
+    with TestClient(app) as client:
+        a = client.post('/upload_pdf', params={"uid": "user-a"}, files={"file": ("a.pdf", content, "application/pdf")}).json()
+        b = client.post('/upload_pdf', params={"uid": "user-b"}, files={"file": ("b.pdf", content, "application/pdf")}).json()
+        assert a["sha256"] == b["sha256"]
+        assert a["url"] == b["url"]
+
+        path = a["url"].split("/uploads", 1)[1]
+        r = client.get("/uploads" + path)
+        assert r.status_code == 200
+        assert r.content == content
+        assert "immutable" in r.headers["cache-control"]
+
+        listed = client.get('/fetch_pdfs', params={"uid": "user-b"}).json()
+        assert [p["sha256"] for p in listed] == [b["sha256"]]
+
+        assert client.delete(f'/pdfs/{a["id"]}', params={"uid": "user-b"}).status_code == 404
+        assert client.delete(f'/pdfs/{a["id"]}', params={"uid": "user-a"}).json()["blob_deleted"] is False
+        assert client.get("/uploads" + path).status_code == 200
+        assert client.delete(f'/pdfs/{b["id"]}', params={"uid": "user-b"}).json()["blob_deleted"] is True
+        assert client.get("/uploads" + path).status_code == 404
+
+
+def test_fetch_pdfs_pages_with_cursor():
+    with TestClient(app) as client:
+        ids = []
+        for i in range(5):
+            content = b"%PDF-1.4\n" + f"page test {i}".encode()
+            r = client.post('/upload_pdf', params={"uid": "pager"}, files={"file": (f"{i}.pdf", content, "application/pdf")})
+            ids.append(r.json()["id"])
+
+        seen, cursor = [], None
+        while True:
+            params = {"uid": "pager", "limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            r = client.get('/fetch_pdfs', params=params)
+            assert r.status_code == 200
+            assert len(r.json()) <= 2
+            seen += [p["id"] for p in r.json()]
+            cursor = r.headers.get("x-next-cursor")
+            if not cursor:
+                break
+        # Same-second uploads are ordered by id
+        assert seen == sorted(ids, reverse=True)
+
+        assert client.get('/fetch_pdfs', params={"uid": "pager", "cursor": "not-a-cursor"}).status_code == 400
+
+
+def _blob_row(sha256):
+    with SessionLocal() as db:
+        return db.execute(select(PdfBlob.ref_count).where(PdfBlob.sha256 == sha256)).scalar()
+
+
+def test_failed_upload_leaves_no_row_and_only_removes_its_own_blob(monkeypatch):
+    real_place = storage._place_blob
+
+    def place_then_fail(tmp_path, dest):
+        real_place(tmp_path, dest)
+        raise OSError("worker died before commit")
+
+    content = b"%PDF-1.4\n" + b"placed but never committed" * 100
+    sha256 = hashlib.sha256(content).hexdigest()
+    with TestClient(app) as client:
+        monkeypatch.setattr(storage, "_place_blob", place_then_fail)
+        with pytest.raises(OSError):
+            client.post('/upload_pdf', params={"uid": "crash"}, files={"file": ("c.pdf", content, "application/pdf")})
+        # The row was never committed and the file this upload created is gone again
+        assert _blob_row(sha256) is None
+        assert not uploads.blob_path(sha256).exists()
+        assert client.get('/fetch_pdfs', params={"uid": "crash"}).json() == []
+
+        monkeypatch.setattr(storage, "_place_blob", real_place)
+        assert client.post('/upload_pdf', params={"uid": "crash"},
+                           files={"file": ("c.pdf", content, "application/pdf")}).status_code == 200
+        monkeypatch.setattr(storage, "_place_blob", place_then_fail)
+        with pytest.raises(OSError):
+            client.post('/upload_pdf', params={"uid": "crash"}, files={"file": ("c.pdf", content, "application/pdf")})
+        # An existing blob is not this upload's to remove
+        assert _blob_row(sha256) == 1
+        assert uploads.blob_path(sha256).exists()
+        assert not list(uploads.BLOB_DIR.glob(".upload-*"))
+
+
+def test_blob_file_is_only_unlinked_while_no_row_references_it(tmp_path):
+    content = b"%PDF-1.4\n" + b"re-referenced" * 100
+    sha256 = hashlib.sha256(content).hexdigest()
+    stale = tmp_path / "stale.part"
+    stale.write_bytes(b"old copy")
+    fresh = tmp_path / "fresh.part"
+    fresh.write_bytes(content)
+
+    async def scenario():
+        try:
+            async with AsyncWriteSession() as session:
+                # An upload in another worker re-created the row after our delete committed
+                session.add(PdfBlob(sha256=sha256, size_bytes=len(content), ref_count=1))
+                await session.commit()
+                storage._place_blob(stale, uploads.blob_path(sha256))
+                # Placing always installs this upload's own copy
+                storage._place_blob(fresh, uploads.blob_path(sha256))
+                assert uploads.blob_path(sha256).read_bytes() == content
+                assert await storage._unlink_if_unreferenced(session, sha256) is False
+                assert uploads.blob_path(sha256).exists()
+
+                await session.delete(await session.get(PdfBlob, sha256))
+                await session.commit()
+                assert await storage._unlink_if_unreferenced(session, sha256) is True
+                assert not uploads.blob_path(sha256).exists()
+        finally:
+            await dispose_async_engines()
+
+    with TestClient(app):
+        # Startup creates the schema
+        pass
+    asyncio.run(scenario())
@@ -0,0 +1,38 @@
+import importlib
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.dataset import read_csv_columns
+
+ML_DIR = Path(__file__).resolve().parents[3] / "ml"
+
+
+@pytest.fixture
+def gen(monkeypatch):
+    # Imported by its own name so worker processes can unpickle its functions
+    monkeypatch.syspath_prepend(str(ML_DIR))
+    yield importlib.import_module("generate_synthetic_data")
+    sys.modules.pop("generate_synthetic_data", None)
+
+
+def test_output_is_reproducible_and_independent_of_workers(gen, tmp_path):
+    one = gen.generate(tmp_path / "one.csv", rows=1000, seed=7, chunk_rows=128, workers=1)
+    two = gen.generate(tmp_path / "two.csv", rows=1000, seed=7, chunk_rows=128, workers=2)
+    assert one.read_bytes() == two.read_bytes()
+    assert gen.generate(tmp_path / "other.csv", rows=1000, seed=8, chunk_rows=128).read_bytes() != one.read_bytes()
+    assert not list(tmp_path.glob(".*.tmp"))
+
+    columns, regions = read_csv_columns(one)
+    assert columns["Year"].shape[0] == 1000
+    # Years and regions cycle with the row index across chunk boundaries
+    assert columns["Year"][:16].tolist() == list(range(2010, 2025)) + [2010]
+    assert regions[126:131].tolist() == ["odisha", "west_bengal", "jharkhand", "chhattisgarh", "odisha"]
+    # Production ramps until 2015 and emission factors drop after 2020
+    prod_by_year = {y: columns["Coal_Production_Tons"][columns["Year"] == y].mean() for y in (2010, 2015)}
+    assert prod_by_year[2015] > prod_by_year[2010] * 1.2
+    ef = columns["Emission_Factor_kgCO2_perTon"]
+    assert ef[columns["Year"] > 2020].mean() < ef[columns["Year"] <= 2020].mean() - 150
+    assert np.all(columns["Total_Emissions_tCO2e"] > 0)
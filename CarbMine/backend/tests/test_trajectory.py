@@ -0,0 +1,25 @@
+import numpy as np
+
+from app.trajectory import PROD, ENERGY, YEAR, TrajectoryBase, build_feature_matrices, flat_series, physics_totals
+
+
+def test_scenarios_share_one_feature_build():
+    base = TrajectoryBase(base_prod=100.0, base_energy=10.0, ef=2000.0, ch4=1.0, other=2.0, prod_cagr=0.05)
+    X = build_feature_matrices(base, 2025, 2035, [None, 200.0], [None, None])
+    assert X.shape == (2, 11, 6)
+    assert list(X[0, :, YEAR]) == list(range(2025, 2036))
+    # Trend path follows the CAGR, override path lands on its target
+    assert np.isclose(X[0, -1, PROD], 100.0 * 1.05 ** 10)
+    assert np.isclose(X[1, -1, PROD], 200.0)
+    # No energy trend and no default growth: flat
+    assert np.allclose(X[:, :, ENERGY], 10.0)
+
+
+def test_physics_fallback_for_flat_predictions():
+    base = TrajectoryBase(base_prod=1000.0, base_energy=10.0, ef=2000.0, ch4=1.0, other=2.0, default_prod_growth=0.01)
+    X = build_feature_matrices(base, 2025, 2027, [None], [None])
+    assert flat_series(np.full((1, 3), 5.0)).tolist() == [True]
+    assert flat_series(np.array([[1.0, 2.0, 3.0]])).tolist() == [False]
+    totals = physics_totals(X)
+    assert np.isclose(totals[0, 0], 1000.0 * 2000.0 / 1000.0 + 10.0 * 0.8 + 1.0 + 2.0)
+    assert totals[0, 2] > totals[0, 0]
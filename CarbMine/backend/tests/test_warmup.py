@@ -0,0 +1,82 @@
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from app import services
+from app.main import app
+from app.warmup import Warmup
+
+
+def test_warmup_runs_steps_in_background_and_records_outcomes():
+    release = threading.Event()
+    calls = []
+
+    def slow_model():
+        release.wait(5)
+        calls.append("model")
+        return True
+
+    def broken():
+        raise OSError("catalogue unreadable")
+
+    warmup = Warmup([("model", slow_model), ("dataset", lambda: False), ("recommender", broken)], enabled=True)
+    assert not warmup.ready and warmup.stats()["steps"]["model"]["state"] == "pending"
+    warmup.start()
+    warmup.start()
+    assert not warmup.ready
+    release.set()
+    assert warmup.wait(5)
+
+    stats = warmup.stats()
+    assert stats["ready"] and stats["seconds"] is not None
+    assert {name: s["state"] for name, s in stats["steps"].items()} == {
+        "model": "loaded", "dataset": "missing", "recommender": "failed",
+    }
+    assert stats["steps"]["recommender"]["error"] == "OSError: catalogue unreadable"
+    # Started once however many times startup runs
+    assert calls == ["model"]
+
+
+def test_disabled_warmup_is_ready_without_running():
+    warmup = Warmup([("model", lambda: 1 / 0)], enabled=False)
+    warmup.start()
+    assert warmup.ready and warmup.stats()["steps"]["model"]["state"] == "pending"
+
+
+def test_ready_endpoint_reports_warm_state():
+    with TestClient(app) as client:
+        assert services.get_warmup().wait(10)
+        r = client.get("/ready")
+        assert r.status_code == 200
+        body = r.json()
+        assert body["ready"] and set(body["steps"]) == {"model", "dataset", "recommender"}
+        # No trained model in the test environment: the heuristic serves
+        assert body["steps"]["model"]["state"] == "missing"
+        assert client.get("/status").json()["warmup"]["ready"]
+
+
+def test_ready_endpoint_is_503_while_warming(monkeypatch):
+    release = threading.Event()
+    warmup = Warmup([("model", lambda: release.wait(5))], enabled=True)
+    monkeypatch.setattr(services, "_warmup", warmup)
+    client = TestClient(app)
+    warmup.start()
+    try:
+        r = client.get("/ready")
+        assert r.status_code == 503 and not r.json()["ready"]
+    finally:
+        release.set()
+    assert warmup.wait(5)
+    assert client.get("/ready").status_code == 200
+
+
+def test_importing_the_app_defers_the_database_layer_and_services():
+    # A fresh interpreter: this one has long imported everything
+    code = ("import sys, app.main, app.services as s; "
+            "print('sqlalchemy' in sys.modules, s._model_registry is s._UNBUILT, s._job_queue is s._UNBUILT)")
+    out = subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).resolve().parents[1],
+                         capture_output=True, text=True, check=True).stdout
+    assert out.split() == ["False", "True", "True"]
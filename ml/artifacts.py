@@ -0,0 +1,119 @@
+"""Versioned model artifacts.
+
+Every training run (full or incremental) publishes into its own directory
+
+    ml/artifacts/<version>/model.pkl, model.forest.npz, model_metrics.json
+
+and records it in ml/artifacts/manifest.json, newest last, with its parent version, file hashes
+and whatever the caller reports (mode, rows, trees). The published files are then installed over
+ml/model.pkl, ml/model.forest.npz and ml/model_metrics.json, each with an atomic replace, which is
+where the API's model registry picks them up. Older versions beyond `keep` are pruned.
+"""
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Optional
+
+import joblib
+
+from export_forest import COMPACT_PATH, export_forest
+
+
+ROOT = Path(__file__).resolve().parents[1]
+ARTIFACTS_DIR = ROOT / "ml" / "artifacts"
+MODEL_PATH = ROOT / "ml" / "model.pkl"
+METRICS_PATH = ROOT / "ml" / "model_metrics.json"
+MANIFEST_NAME = "manifest.json"
+# Versions kept on disk, including the current one
+KEEP_VERSIONS = 10
+
+
+def read_manifest(artifacts_dir: Path = ARTIFACTS_DIR) -> Dict:
+    path = Path(artifacts_dir) / MANIFEST_NAME
+    if not path.exists():
+        return {"current": None, "versions": []}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_json(path: Path, payload) -> None:
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _install(src: Path, dest: Path) -> None:
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = dest.with_name(dest.name + ".tmp")
+    tmp_path.unlink(missing_ok=True)
+    try:
+        # Version files are never modified after publishing, so a hard link is as good as a copy
+        os.link(src, tmp_path)
+    except OSError:
+        shutil.copyfile(src, tmp_path)
+    os.replace(tmp_path, dest)
+
+
+def _file_info(path: Path) -> Dict:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return {"sha256": digest.hexdigest(), "bytes": path.stat().st_size}
+
+
+def _new_version(artifacts_dir: Path) -> str:
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    version, n = stamp, 1
+    while (artifacts_dir / version).exists():
+        n += 1
+        version = f"{stamp}-{n}"
+    return version
+
+
+def publish(model, metrics: Dict, info: Optional[Dict] = None, artifacts_dir: Path = ARTIFACTS_DIR,
+            model_path: Path = MODEL_PATH, compact_path: Path = COMPACT_PATH,
+            metrics_path: Path = METRICS_PATH, keep: int = KEEP_VERSIONS) -> Dict:
+    """Write `model` as a new version, make it current and return its manifest entry"""
+    artifacts_dir = Path(artifacts_dir)
+    artifacts_dir.mkdir(parents=True, exist_ok=True)
+    manifest = read_manifest(artifacts_dir)
+    version = _new_version(artifacts_dir)
+    version_dir = artifacts_dir / version
+    version_dir.mkdir()
+
+    files = {
+        "model": version_dir / "model.pkl",
+        "compact": version_dir / "model.forest.npz",
+        "metrics": version_dir / "model_metrics.json",
+    }
+    joblib.dump(model, files["model"])
+    export_forest(model, files["compact"], source=files["model"])
+    _write_json(files["metrics"], metrics)
+
+    entry = {
+        "version": version,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "parent": manifest.get("current"),
+        "n_estimators": len(model.estimators_),
+        "metrics": metrics,
+        **(info or {}),
+        "files": {name: {"path": f"{version}/{p.name}", **_file_info(p)} for name, p in files.items()},
+    }
+
+    # Compact form first: it is what the registry serves when present
+    _install(files["compact"], Path(compact_path))
+    _install(files["model"], Path(model_path))
+    _install(files["metrics"], Path(metrics_path))
+
+    versions = manifest.get("versions", []) + [entry]
+    stale = versions[:-keep] if keep > 0 else []
+    versions = versions[len(stale):]
+    _write_json(artifacts_dir / MANIFEST_NAME, {"current": version, "versions": versions})
+    for old in stale:
+        shutil.rmtree(artifacts_dir / old["version"], ignore_errors=True)
+    return entry
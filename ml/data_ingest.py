@@ -1,13 +1,33 @@
+"""Ingest emissions data and update the model.
+
+    python ml/data_ingest.py --csv data/coal_emissions.csv
+        validate the dataset and retrain from scratch (ml/train.py)
+
+    python ml/data_ingest.py --incremental --csv new_rows.csv
+        append the rows of new_rows.csv whose (Year, Region) is not already in the dataset store
+        (ml/datastore.py), then grow the current forest with a few trees fitted on those rows plus
+        a bounded sample of the history, instead of refitting all 400 trees over everything
+
+Either way the result is published as a new version under ml/artifacts/ (see ml/artifacts.py).
+"""
 import argparse
-import sys
 from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import joblib
+import numpy as np
 import pandas as pd
-import subprocess
+
+from artifacts import MODEL_PATH, publish
+import datastore
+from train import FEATURE_COLUMNS, TARGET_COLUMN, fit_full, report_progress, score
+from train import main as retrain
 
 ROOT = Path(__file__).resolve().parents[1]
 DATA_DIR = ROOT / 'data'
 ML_DIR = ROOT / 'ml'
 CSV_PATH = DATA_DIR / 'coal_emissions.csv'
+STORE_PATH = datastore.STORE_PATH
 
 REQUIRED_COLUMNS = [
     "Year",
@@ -18,6 +38,15 @@ REQUIRED_COLUMNS = [
     "Other_GHG_Emissions_tons",
     "Total_Emissions_tCO2e",
 ]
+KEY_COLUMNS = ["Year", "Region"]
+
+# Trees added per incremental ingest
+ADD_TREES = 50
+# Forest size cap; the oldest trees are retired beyond it, so the model keeps tracking recent data
+MAX_TREES = 600
+# Historical rows sampled into each incremental fit, bounding its cost whatever the history size
+REPLAY_ROWS = 5000
+
 
 def validate_csv(path: Path) -> None:
     if not path.exists():
@@ -30,19 +59,125 @@ def validate_csv(path: Path) -> None:
         raise ValueError("Dataset too small; need >= 50 rows")
 
 
+def read_batch(path: Path) -> pd.DataFrame:
+    """Rows to ingest, with Region normalised the way the API reads it"""
+    if not path.exists():
+        raise FileNotFoundError(f"CSV not found: {path}")
+    df = pd.read_csv(path)
+    missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"Missing columns: {missing}")
+    if df[REQUIRED_COLUMNS].isna().any().any():
+        raise ValueError("Missing values in required columns")
+    df["Region"] = df["Region"].fillna("").astype(str).str.strip().str.lower() if "Region" in df else ""
+    df["Year"] = df["Year"].astype(np.int64)
+    return df
+
+
+def select_new_rows(batch: pd.DataFrame, existing: Set[Tuple[int, str]]) -> pd.DataFrame:
+    """Rows of `batch` whose (Year, Region) is not in `existing`; the last one wins within the batch"""
+    batch = batch.drop_duplicates(KEY_COLUMNS, keep="last")
+    seen = [(int(year), region) in existing for year, region in zip(batch["Year"], batch["Region"])]
+    return batch[~np.array(seen, dtype=bool)]
+
+
+def store_rows(df: pd.DataFrame) -> List[tuple]:
+    # Plain Python values in datastore.COLUMNS order; sqlite3 cannot bind numpy scalars
+    return [
+        (int(row[0]), *(float(v) for v in row[1:-1]), str(row[-1]))
+        for row in df[datastore.COLUMNS].itertuples(index=False, name=None)
+    ]
+
+
+def history_frame(columns_regions) -> pd.DataFrame:
+    columns, regions = columns_regions
+    return pd.DataFrame({**columns, "Region": regions})
+
+
+def grow_forest(model, new_rows: pd.DataFrame, history: pd.DataFrame, add_trees: int = ADD_TREES,
+                max_trees: int = MAX_TREES, replay_rows: int = REPLAY_ROWS, seed: Optional[int] = None):
+    """Fit `add_trees` more trees (warm start) on the new rows plus a sample of the history.
+
+    Trees beyond `max_trees` are dropped oldest first.
+    """
+    rng = np.random.default_rng(seed)
+    if len(history) > replay_rows:
+        history = history.iloc[np.sort(rng.choice(len(history), replay_rows, replace=False))]
+    train_df = pd.concat([history, new_rows], ignore_index=True)
+
+    model.set_params(
+        warm_start=True,
+        n_estimators=len(model.estimators_) + add_trees,
+        # Fresh seeds: the forest draws per-tree seeds from random_state, and retiring trees
+        # would otherwise make it hand out seeds it has already used
+        random_state=int(rng.integers(2**31 - 1)),
+    )
+    model.fit(train_df[FEATURE_COLUMNS], train_df[TARGET_COLUMN])
+    excess = len(model.estimators_) - max_trees
+    if excess > 0:
+        del model.estimators_[:excess]
+    model.set_params(warm_start=False, n_estimators=len(model.estimators_))
+    return model
+
+
+def ingest_incremental(csv_path: Path, store_path: Path = STORE_PATH, seed_csv: Optional[Path] = CSV_PATH,
+                       model_path: Path = MODEL_PATH, add_trees: int = ADD_TREES, max_trees: int = MAX_TREES,
+                       replay_rows: int = REPLAY_ROWS, seed: Optional[int] = None,
+                       publish_kwargs: Optional[Dict] = None,
+                       progress: Optional[Callable[[float, str], None]] = None) -> Dict:
+    progress = progress or (lambda fraction, message: None)
+    progress(0.05, "reading batch")
+    datastore.ensure_store(store_path, seed_csv)
+    batch = read_batch(csv_path)
+    new_rows = select_new_rows(batch, datastore.existing_keys(store_path))
+    summary = {"mode": "incremental", "batch_rows": len(batch), "new_rows": len(new_rows)}
+    if new_rows.empty:
+        return {**summary, "version": None}
+
+    grow = model_path.exists()
+    progress(0.15, f"appending {len(new_rows)} new rows")
+    # Replay sample drawn before the append so it holds history only; reads just the sampled rows
+    history = history_frame(datastore.sample_columns(replay_rows, seed, store_path)) if grow else None
+    datastore.append_rows(store_rows(new_rows), store_path)
+    if not grow:
+        # Nothing to grow yet
+        progress(0.25, "fitting a new forest")
+        model, metrics = fit_full(history_frame(datastore.read_columns(store_path)))
+        summary["mode"] = "full"
+    else:
+        progress(0.25, f"growing the forest by {add_trees} trees")
+        model = joblib.load(model_path)
+        # Scored before the update: how well the current model predicted the rows it hadn't seen
+        metrics = {**score(model, new_rows[FEATURE_COLUMNS], new_rows[TARGET_COLUMN]), "evaluated_on": "new_rows"}
+        model = grow_forest(model, new_rows, history, add_trees, max_trees, replay_rows, seed)
+    progress(0.85, "publishing")
+    entry = publish(model, metrics, {**summary, "rows": datastore.count_rows(store_path)}, **(publish_kwargs or {}))
+    return {**summary, "version": entry["version"], "n_estimators": entry["n_estimators"], "metrics": metrics}
+
+
 def main():
     parser = argparse.ArgumentParser(description='Ingest CSV and retrain model')
     parser.add_argument('--csv', type=str, default=str(CSV_PATH))
+    parser.add_argument('--incremental', action='store_true',
+                        help='append new (Year, Region) rows from --csv and grow the current model')
+    parser.add_argument('--add-trees', type=int, default=ADD_TREES)
+    parser.add_argument('--max-trees', type=int, default=MAX_TREES)
+    parser.add_argument('--replay-rows', type=int, default=REPLAY_ROWS)
+    parser.add_argument('--seed', type=int, default=None)
     args = parser.parse_args()
 
     csv_path = Path(args.csv)
+    if args.incremental:
+        print(ingest_incremental(csv_path, add_trees=args.add_trees, max_trees=args.max_trees,
+                                 replay_rows=args.replay_rows, seed=args.seed, progress=report_progress))
+        return
+
+    report_progress(0.05, f"validating {csv_path.name}")
     validate_csv(csv_path)
     print(f"Validated {csv_path}")
 
     # Retrain model
-    code = subprocess.call([sys.executable, str(ML_DIR / 'train.py')])
-    if code != 0:
-        sys.exit(code)
+    retrain()
     print("Model retrained. Artifacts in ml/model.pkl and ml/model_metrics.json")
 
 if __name__ == '__main__':
@@ -0,0 +1,305 @@
+"""Indexed SQLite store for the emissions history, shared by the ml/ scripts and the API.
+
+data/coal_emissions.csv stays the hand-editable seed; data/coal_emissions.sqlite3 holds one row
+per mine-year with indexes on (Region, Year) and (Year), so year-range and region filters read
+only the matching index range and aggregate in SQL instead of parsing the whole CSV.
+
+Rows carry their source: 'csv' rows mirror the seed file, 'ingest' rows were added by
+ml/data_ingest.py. When the seed CSV changes, the store is rebuilt from it and the ingested rows
+whose (Year, Region) the CSV does not cover are carried over.
+
+Standard library and numpy only: the API loads this file directly (see app/services.py).
+"""
+import csv
+import hashlib
+import os
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+from urllib.parse import quote
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are not serialised across processes
+    fcntl = None
+
+
+ROOT = Path(__file__).resolve().parents[1]
+CSV_PATH = ROOT / "data" / "coal_emissions.csv"
+STORE_PATH = ROOT / "data" / "coal_emissions.sqlite3"
+
+NUMERIC_COLUMNS = [
+    "Year",
+    "Coal_Production_Tons",
+    "Energy_Consumption_MWh",
+    "Emission_Factor_kgCO2_perTon",
+    "Methane_Emissions_tons",
+    "Other_GHG_Emissions_tons",
+    "Total_Emissions_tCO2e",
+]
+COLUMNS = NUMERIC_COLUMNS + ["Region"]
+# /history names: the lower-cased column names
+METRICS = {name.lower(): name for name in NUMERIC_COLUMNS[1:]}
+GROUP_BY = {"year": "Year", "region": "Region"}
+# Shorthands accepted in group_by
+GROUP_BY_ALIASES = {"both": ("year", "region")}
+AGGREGATES = {"sum": "SUM", "avg": "AVG", "min": "MIN", "max": "MAX"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS emissions (
+    id INTEGER PRIMARY KEY,
+    Year INTEGER NOT NULL,
+    Region TEXT NOT NULL DEFAULT '',
+    Coal_Production_Tons REAL NOT NULL,
+    Energy_Consumption_MWh REAL NOT NULL,
+    Emission_Factor_kgCO2_perTon REAL NOT NULL,
+    Methane_Emissions_tons REAL NOT NULL,
+    Other_GHG_Emissions_tons REAL NOT NULL,
+    Total_Emissions_tCO2e REAL NOT NULL,
+    source TEXT NOT NULL DEFAULT 'csv'
+);
+CREATE INDEX IF NOT EXISTS ix_emissions_region_year ON emissions (Region, Year);
+CREATE INDEX IF NOT EXISTS ix_emissions_year ON emissions (Year);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+_INSERT = (
+    f"INSERT INTO emissions ({', '.join(COLUMNS)}, source) "
+    f"VALUES ({', '.join('?' for _ in COLUMNS)}, ?)"
+)
+
+
+@contextmanager
+def connect(path: Path = STORE_PATH, readonly: bool = True) -> Iterator[sqlite3.Connection]:
+    if readonly:
+        conn = sqlite3.connect(f"file:{quote(str(path))}?mode=ro", uri=True)
+    else:
+        conn = sqlite3.connect(str(path), isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+@contextmanager
+def _write_lock(path: Path) -> Iterator[None]:
+    # Rebuilds and appends must not interleave: a rebuild would drop rows appended meanwhile
+    if fcntl is None:
+        yield
+        return
+    with open(str(path) + ".lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def normalise_region(value) -> str:
+    # Same normalisation the API applies to request regions
+    return str(value or "").strip().lower()
+
+
+def read_csv_rows(path: Path) -> List[tuple]:
+    """Rows of a history CSV as tuples in COLUMNS order"""
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        index = {name: i for i, name in enumerate(header)}
+        missing = [c for c in NUMERIC_COLUMNS if c not in index]
+        if missing:
+            raise ValueError(f"Missing columns: {missing}")
+        region_at = index.get("Region")
+        rows = []
+        for r in reader:
+            if not r:
+                continue
+            values = [int(float(r[index["Year"]]))] + [float(r[index[c]]) for c in NUMERIC_COLUMNS[1:]]
+            values.append(normalise_region(r[region_at]) if region_at is not None else "")
+            rows.append(tuple(values))
+    return rows
+
+
+def _signature(path: Path) -> str:
+    st = os.stat(path)
+    return f"{st.st_mtime_ns}:{st.st_size}"
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _meta(path: Path) -> Dict[str, str]:
+    try:
+        with connect(path) as conn:
+            return {row["key"]: row["value"] for row in conn.execute("SELECT key, value FROM meta")}
+    except sqlite3.Error:
+        return {}
+
+
+def build_store(store_path: Path = STORE_PATH, csv_path: Path = CSV_PATH) -> int:
+    """(Re)create the store from the seed CSV, keeping ingested rows the CSV does not cover.
+
+    Built in a temp file and swapped in, so readers see the old or the new store, never a
+    partial one. Returns the number of rows.
+    """
+    store_path, csv_path = Path(store_path), Path(csv_path)
+    with _write_lock(store_path):
+        return _build(store_path, csv_path)
+
+
+def _build(store_path: Path, csv_path: Path) -> int:
+    csv_signature, csv_sha256 = _signature(csv_path), _sha256(csv_path)
+    rows = read_csv_rows(csv_path)
+    seeded = {(r[0], r[-1]) for r in rows}
+    carried: List[tuple] = []
+    if store_path.exists():
+        with connect(store_path) as old:
+            for row in old.execute(f"SELECT {', '.join(COLUMNS)} FROM emissions WHERE source = 'ingest' ORDER BY id"):
+                if (row["Year"], row["Region"]) not in seeded:
+                    carried.append(tuple(row))
+
+    tmp_path = store_path.with_name(store_path.name + ".tmp")
+    tmp_path.unlink(missing_ok=True)
+    with connect(tmp_path, readonly=False) as conn:
+        conn.executescript(_SCHEMA)
+        conn.execute("BEGIN")
+        conn.executemany(_INSERT, (r + ("csv",) for r in rows))
+        conn.executemany(_INSERT, (r + ("ingest",) for r in carried))
+        conn.executemany("INSERT INTO meta (key, value) VALUES (?, ?)", [
+            ("csv_signature", csv_signature),
+            ("csv_sha256", csv_sha256),
+        ])
+        conn.execute("COMMIT")
+        conn.execute("ANALYZE")
+    os.replace(tmp_path, store_path)
+    return len(rows) + len(carried)
+
+
+def ensure_store(store_path: Path = STORE_PATH, csv_path: Optional[Path] = CSV_PATH) -> bool:
+    """Build the store if it is missing or its seed CSV changed; True when it was (re)built"""
+    store_path = Path(store_path)
+    if csv_path is None or not Path(csv_path).exists():
+        return False
+    csv_path = Path(csv_path)
+    meta = _meta(store_path) if store_path.exists() else {}
+    # Stat first; the hash only settles touched-but-identical files
+    if meta.get("csv_signature") == _signature(csv_path):
+        return False
+    with _write_lock(store_path):
+        meta = _meta(store_path) if store_path.exists() else {}
+        if meta.get("csv_sha256") == _sha256(csv_path):
+            if meta.get("csv_signature") != _signature(csv_path):
+                with connect(store_path, readonly=False) as conn:
+                    conn.execute("UPDATE meta SET value = ? WHERE key = 'csv_signature'", (_signature(csv_path),))
+            return False
+        _build(store_path, csv_path)
+    return True
+
+
+def append_rows(rows: Iterable[Sequence], store_path: Path = STORE_PATH) -> int:
+    """Insert ingested rows (tuples in COLUMNS order); returns how many"""
+    rows = [tuple(r) + ("ingest",) for r in rows]
+    with _write_lock(Path(store_path)), connect(store_path, readonly=False) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(_INSERT, rows)
+        conn.execute("COMMIT")
+    return len(rows)
+
+
+def existing_keys(store_path: Path = STORE_PATH) -> Set[Tuple[int, str]]:
+    # Answered from the (Region, Year) index alone
+    with connect(store_path) as conn:
+        return {(year, region) for region, year in conn.execute("SELECT DISTINCT Region, Year FROM emissions")}
+
+
+def count_rows(store_path: Path = STORE_PATH) -> int:
+    with connect(store_path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM emissions").fetchone()[0]
+
+
+def _where(year_min: Optional[int], year_max: Optional[int], regions: Optional[Sequence[str]]) -> Tuple[str, list]:
+    clauses, params = [], []
+    if regions:
+        clauses.append(f"Region IN ({', '.join('?' for _ in regions)})")
+        params += [normalise_region(r) for r in regions]
+    if year_min is not None:
+        clauses.append("Year >= ?")
+        params.append(int(year_min))
+    if year_max is not None:
+        clauses.append("Year <= ?")
+        params.append(int(year_max))
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def _columns_of(cursor, names: Sequence[str]) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    rows = cursor.fetchall()
+    values = list(zip(*rows)) if rows else [()] * (len(names) + 1)
+    columns = {name: np.array(values[i], dtype=np.float64) for i, name in enumerate(names)}
+    return columns, np.array(values[-1], dtype=object)
+
+
+def read_columns(store_path: Path = STORE_PATH, columns: Sequence[str] = NUMERIC_COLUMNS,
+                 year_min: Optional[int] = None, year_max: Optional[int] = None,
+                 regions: Optional[Sequence[str]] = None) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    """Numeric columns as float64 arrays plus the Region array, in insertion (seed CSV) order"""
+    unknown = [c for c in columns if c not in NUMERIC_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown columns: {unknown}")
+    where, params = _where(year_min, year_max, regions)
+    with connect(store_path) as conn:
+        cursor = conn.execute(f"SELECT {', '.join(list(columns) + ['Region'])} FROM emissions{where} ORDER BY id", params)
+        result = _columns_of(cursor, columns)
+    if not where and not result[1].shape[0]:
+        raise ValueError(f"No rows in {store_path}")
+    return result
+
+
+def sample_columns(n: int, seed: Optional[int] = None, store_path: Path = STORE_PATH) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    """Up to `n` rows drawn uniformly without replacement; reads only the sampled rows"""
+    with connect(store_path) as conn:
+        ids = np.array([r[0] for r in conn.execute("SELECT id FROM emissions")], dtype=np.int64)
+        if ids.shape[0] > n:
+            ids = np.sort(np.random.default_rng(seed).choice(ids, n, replace=False))
+        conn.execute("CREATE TEMP TABLE sample_ids (id INTEGER PRIMARY KEY)")
+        conn.executemany("INSERT INTO sample_ids (id) VALUES (?)", ((int(i),) for i in ids))
+        cursor = conn.execute(
+            f"SELECT {', '.join(COLUMNS)} FROM emissions JOIN sample_ids USING (id) ORDER BY id"
+        )
+        return _columns_of(cursor, NUMERIC_COLUMNS)
+
+
+def query_history(store_path: Path = STORE_PATH, year_min: Optional[int] = None, year_max: Optional[int] = None,
+                  regions: Optional[Sequence[str]] = None, group_by: Sequence[str] = ("year",),
+                  metrics: Sequence[str] = ("total_emissions_tco2e",), agg: str = "sum") -> List[Dict]:
+    """Filtered aggregate of the history: one dict per group with `rows` and each metric"""
+    group_by = [key for g in group_by for key in GROUP_BY_ALIASES.get(g, (g,))]
+    bad_groups = [g for g in group_by if g not in GROUP_BY]
+    bad_metrics = [m for m in metrics if m not in METRICS]
+    if bad_groups:
+        expected = sorted(GROUP_BY) + sorted(GROUP_BY_ALIASES)
+        raise ValueError(f"Unknown group_by {bad_groups}; expected any of {expected}")
+    if bad_metrics:
+        raise ValueError(f"Unknown metrics {bad_metrics}; expected any of {sorted(METRICS)}")
+    if agg not in AGGREGATES:
+        raise ValueError(f"Unknown agg {agg!r}; expected one of {sorted(AGGREGATES)}")
+
+    keys = list(dict.fromkeys(group_by))
+    select = [f"{GROUP_BY[g]} AS {g}" for g in keys] + ["COUNT(*) AS rows"]
+    select += [f"{AGGREGATES[agg]}({METRICS[m]}) AS {m}" for m in dict.fromkeys(metrics)]
+    where, params = _where(year_min, year_max, regions)
+    sql = f"SELECT {', '.join(select)} FROM emissions{where}"
+    if keys:
+        order = ", ".join(GROUP_BY[g] for g in keys)
+        sql += f" GROUP BY {order} ORDER BY {order}"
+    with connect(store_path) as conn:
+        rows = [dict(row) for row in conn.execute(sql, params)]
+    # An ungrouped aggregate over no rows still yields one row of NULLs
+    return [row for row in rows if row["rows"]]
@@ -0,0 +1,144 @@
+"""Convert a fitted RandomForestRegressor into the compact array format read by the API.
+
+All trees are concatenated into flat node arrays:
+
+    feature    int16    split feature per node (0 for leaves)
+    threshold  float32  split threshold, rounded down so float32 inputs split exactly as sklearn does
+    children   int64    global child indices, interleaved: [2n] left, [2n + 1] right; a leaf
+                        points at itself so traversal can run a fixed number of steps unmasked
+    value      float64  leaf prediction (internal nodes keep theirs, unused)
+    roots      int64    root node of each tree
+
+plus `max_depth`, `feature_names` and, when exported from a pickle, that file's `source_sha256`:
+the API serves the export only while it matches the pickle next to it. The .npz is written uncompressed, with every array stored
+in its final form and 64-byte aligned in the file, so the API can memory-map it and all workers
+share one copy through the page cache. Usage:
+
+    python ml/export_forest.py [model.pkl] [model.forest.npz]
+"""
+import hashlib
+import io
+import json
+import os
+import struct
+import sys
+import zipfile
+from pathlib import Path
+from typing import Optional
+
+import joblib
+import numpy as np
+
+
+ROOT = Path(__file__).resolve().parents[1]
+MODEL_PATH = ROOT / "ml" / "model.pkl"
+COMPACT_PATH = ROOT / "ml" / "model.forest.npz"
+FORMAT_VERSION = 2
+
+
+def _float32_floor(threshold: np.ndarray) -> np.ndarray:
+    # sklearn compares float32 inputs against float64 thresholds; the largest float32 not above
+    # each threshold gives the same decision for every float32 input
+    t32 = threshold.astype(np.float32)
+    above = t32.astype(np.float64) > threshold
+    t32[above] = np.nextafter(t32[above], np.float32(-np.inf))
+    return t32
+
+
+def forest_arrays(model) -> dict:
+    """Flatten the estimators of a fitted sklearn forest (single-output regression)"""
+    trees = [est.tree_ for est in model.estimators_]
+    if any(t.n_outputs != 1 for t in trees):
+        raise ValueError("only single-output forests are supported")
+    counts = np.array([t.node_count for t in trees], dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    total = int(counts.sum())
+
+    feature = np.empty(total, dtype=np.int16)
+    threshold = np.empty(total, dtype=np.float32)
+    children = np.empty((total, 2), dtype=np.int64)
+    value = np.empty(total, dtype=np.float64)
+    for tree, offset, count in zip(trees, offsets, counts):
+        sl = slice(offset, offset + count)
+        own = np.arange(offset, offset + count, dtype=np.int64)
+        is_leaf = tree.children_left == -1
+        feature[sl] = np.where(is_leaf, 0, tree.feature)
+        threshold[sl] = np.where(is_leaf, np.float32(np.inf), _float32_floor(tree.threshold))
+        children[sl, 0] = np.where(is_leaf, own, tree.children_left + offset)
+        children[sl, 1] = np.where(is_leaf, own, tree.children_right + offset)
+        value[sl] = tree.value[:, 0, 0]
+
+    names = getattr(model, "feature_names_in_", None)
+    return {
+        "format_version": np.array(FORMAT_VERSION),
+        "feature": feature,
+        "threshold": threshold,
+        "children": children.ravel(),
+        "value": value,
+        "roots": offsets.astype(np.int64),
+        "max_depth": np.array(max(t.max_depth for t in trees)),
+        "feature_names": np.array(list(names) if names is not None else [], dtype=str),
+    }
+
+
+# Alignment of every array's data within the file, so memory-mapped arrays are aligned in memory
+ARRAY_ALIGN = 64
+# Zip extra-field id conventionally used for alignment padding (as by Android's zipalign)
+_ALIGN_EXTRA_ID = 0xD935
+
+
+def _npy_bytes(array: np.ndarray) -> bytes:
+    buf = io.BytesIO()
+    np.lib.format.write_array(buf, np.asarray(array), allow_pickle=False)
+    return buf.getvalue()
+
+
+def write_aligned_npz(path: Path, arrays: dict) -> None:
+    """Uncompressed .npz (readable by np.load) in which each array's data starts at a multiple of
+    ARRAY_ALIGN bytes from the start of the file.
+
+    .npy headers are padded to 64 bytes, so it is enough to pad each zip member's local header
+    with an extra field until the member's payload is aligned.
+    """
+    with open(path, "wb") as f, zipfile.ZipFile(f, "w", compression=zipfile.ZIP_STORED) as zf:
+        for name, array in arrays.items():
+            info = zipfile.ZipInfo(f"{name}.npy", date_time=(1980, 1, 1, 0, 0, 0))
+            info.compress_type = zipfile.ZIP_STORED
+            payload_at = f.tell() + 30 + len(info.filename.encode("utf-8")) + 4
+            pad = -payload_at % ARRAY_ALIGN
+            info.extra = struct.pack("<HH", _ALIGN_EXTRA_ID, pad) + b"\0" * pad
+            zf.writestr(info, _npy_bytes(array))
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def export_forest(model, path: Path, source: Optional[Path] = None) -> Path:
+    """Write the compact form of `model` to `path` atomically; `source` is the pickle it was
+    loaded from (or dumped to), recorded so a later retrain can be detected"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    arrays = forest_arrays(model)
+    if source is not None:
+        arrays["source_sha256"] = np.array(_file_sha256(Path(source)))
+    write_aligned_npz(tmp_path, arrays)
+    os.replace(tmp_path, path)
+    return path
+
+
+def main() -> None:
+    src = Path(sys.argv[1]) if len(sys.argv) > 1 else MODEL_PATH
+    dest = Path(sys.argv[2]) if len(sys.argv) > 2 else COMPACT_PATH
+    model = joblib.load(src)
+    export_forest(model, dest, source=src)
+    print(json.dumps({"model": str(src), "compact": str(dest), "bytes": dest.stat().st_size}))
+
+
+if __name__ == "__main__":
+    main()
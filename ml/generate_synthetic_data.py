@@ -1,98 +1,195 @@
-import csv
-import math
-import random
+"""Synthetic Indian coal-mining history, from the 300-row seed dataset up to load-test sizes.
+
+    python ml/generate_synthetic_data.py                                  # data/coal_emissions.csv
+    python ml/generate_synthetic_data.py --rows 100000000 --out /tmp/history.csv --workers 4
+    python ml/generate_synthetic_data.py --rows 10000000 --out /tmp/history.parquet  # needs pyarrow
+
+Rows are generated in chunks of --chunk-rows with NumPy. Chunk k draws from its own stream,
+SeedSequence(seed, spawn_key=(k,)), so the output depends only on --seed, --rows and
+--chunk-rows: the same bytes come out for any --workers. Workers build and format chunks; the
+parent writes them in order, keeping at most two chunks per worker in flight, so memory stays
+bounded whatever the row count. The output is written next to its target and moved into place.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
 
 
 OUT_DIR = Path(__file__).resolve().parents[1] / "data"
-OUT_DIR.mkdir(parents=True, exist_ok=True)
 CSV_PATH = OUT_DIR / "coal_emissions.csv"
 
-
-def main() -> None:
-    random.seed(42)
-
-    # Generate 300 rows representing Indian coal mining data (2010-2024)
-    # Trends reflect Indian coal mining patterns: production rises 2010-2015, 
-    # plateaus 2016-2020, modest growth 2021+ with efficiency improvements
-    years = list(range(2010, 2025))
-
-    # Indian coal mining regions and their characteristics
-    indian_regions = ['jharkhand', 'chhattisgarh', 'odisha', 'west_bengal']
-    regional_emission_factors = {
-        'jharkhand': 2000.0,
-        'chhattisgarh': 1950.0, 
-        'odisha': 2100.0,
-        'west_bengal': 2050.0
+COLUMNS = [
+    "Year",
+    "Coal_Production_Tons",
+    "Energy_Consumption_MWh",
+    "Emission_Factor_kgCO2_perTon",
+    "Methane_Emissions_tons",
+    "Other_GHG_Emissions_tons",
+    "Total_Emissions_tCO2e",
+    "Region",
+]
+
+DEFAULT_ROWS = 300
+DEFAULT_SEED = 42
+CHUNK_ROWS = 500_000
+
+# Trends reflect Indian coal mining patterns: production rises 2010-2015,
+# plateaus 2016-2020, modest growth 2021+ with efficiency improvements
+YEARS = np.arange(2010, 2025)
+# Indian coal mining regions and their emission factors (kg CO2/ton)
+REGIONS = np.array(["jharkhand", "chhattisgarh", "odisha", "west_bengal"], dtype=object)
+REGIONAL_EMISSION_FACTORS = np.array([2000.0, 1950.0, 2100.0, 2050.0])
+# India's grid emission factor (tCO2/MWh)
+GRID_FACTOR = 0.82
+
+
+def chunk_rng(seed: int, chunk: int) -> np.random.Generator:
+    """Independent stream for one chunk, whichever process generates it"""
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(chunk,)))
+
+
+def generate_chunk(seed: int, chunk: int, start: int, rows: int) -> Dict[str, np.ndarray]:
+    """Columns of rows [start, start + rows); years and regions cycle with the global row index"""
+    rng = chunk_rng(seed, chunk)
+    index = np.arange(start, start + rows, dtype=np.int64)
+    year = YEARS[index % len(YEARS)]
+    region = index % len(REGIONS)
+
+    # Base production (MT) per year: ramp to 2015, ~630 plateau, then +8 MT/year
+    base_prod_mt = np.where(
+        year <= 2015,
+        500.0 + (year - 2010) * 25.0,
+        np.where(year <= 2020, 630.0 + rng.uniform(-5, 5, rows), 640.0 + (year - 2020) * 8.0),
+    )
+    prod_tons = np.maximum(0.0, (base_prod_mt + rng.uniform(-6, 6, rows)) * 1_000_000)
+    energy_mwh = np.maximum(0.0, prod_tons / 1_000 + 80_000 + rng.uniform(-5_000, 5_000, rows))
+
+    # Regional emission factors, ~200 kg/t lower after 2020 with efficiency improvements
+    base_ef = REGIONAL_EMISSION_FACTORS[region]
+    ef = np.where(year <= 2020, base_ef + rng.uniform(-100, 100, rows), base_ef - 200 + rng.uniform(-80, 80, rows))
+
+    methane_t = np.maximum(0.0, prod_tons * 0.00002 + rng.uniform(-200, 200, rows))
+    other_ghg_t = np.maximum(0.0, prod_tons * 0.00001 + rng.uniform(-150, 150, rows))
+
+    total_tco2e = prod_tons * ef / 1000.0 + energy_mwh * GRID_FACTOR + methane_t + other_ghg_t
+    total_tco2e *= 1.0 + rng.uniform(-0.01, 0.01, rows)
+
+    return {
+        "Year": year,
+        "Coal_Production_Tons": prod_tons.round(2),
+        "Energy_Consumption_MWh": energy_mwh.round(2),
+        "Emission_Factor_kgCO2_perTon": ef.round(2),
+        "Methane_Emissions_tons": methane_t.round(2),
+        "Other_GHG_Emissions_tons": other_ghg_t.round(2),
+        "Total_Emissions_tCO2e": total_tco2e.round(2),
+        "Region": REGIONS[region],
     }
 
-    rows = []
-    for i in range(300):
-        year = years[i % len(years)]
-        region = indian_regions[i % len(indian_regions)]
-
-        # Base production trend reflecting Indian coal mining patterns
-        if year <= 2015:
-            base_prod_mt = 500 + (year - 2010) * 25  # 500→625 MT (Indian scale)
-        elif year <= 2020:
-            base_prod_mt = 630 + random.uniform(-5, 5)  # plateau around 630 MT
-        else:
-            base_prod_mt = 640 + (year - 2020) * 8  # modest growth post-2020
-
-        # Add regional variations and random noise
-        prod_tons = max(0.0, (base_prod_mt + random.uniform(-6, 6)) * 1_000_000)
-
-        # Energy consumption adapted for Indian grid conditions
-        energy_mwh = max(0.0, prod_tons / 1_000 + 80_000 + random.uniform(-5_000, 5_000))
-
-        # Regional emission factors with efficiency improvements post-2020
-        base_ef = regional_emission_factors[region]
-        if year <= 2020:
-            ef = base_ef + random.uniform(-100, 100)
-        else:
-            ef = base_ef - 200 + random.uniform(-80, 80)  # efficiency improvements
-
-        # Methane and other GHGs specific to Indian coal seam conditions
-        methane_t = max(0.0, prod_tons * 0.00002 + random.uniform(-200, 200))
-        other_ghg_t = max(0.0, prod_tons * 0.00001 + random.uniform(-150, 150))
-
-        # Total emissions using Indian grid factor (0.82 tCO2/MWh)
-        co2_from_prod_t = prod_tons * ef / 1000.0
-        electricity_t = energy_mwh * 0.82  # India's grid emission factor
-        total_tco2e = co2_from_prod_t + electricity_t + methane_t + other_ghg_t
-        total_tco2e += random.uniform(-0.01, 0.01) * total_tco2e
-
-        rows.append([
-            year,
-            round(prod_tons, 2),
-            round(energy_mwh, 2),
-            round(ef, 2),
-            round(methane_t, 2),
-            round(other_ghg_t, 2),
-            round(total_tco2e, 2),
-            region,  # Add region column
-        ])
-
-    with open(CSV_PATH, "w", newline="", encoding="utf-8") as f:
-        w = csv.writer(f)
-        w.writerow([
-            "Year",
-            "Coal_Production_Tons",
-            "Energy_Consumption_MWh",
-            "Emission_Factor_kgCO2_perTon",
-            "Methane_Emissions_tons",
-            "Other_GHG_Emissions_tons",
-            "Total_Emissions_tCO2e",
-            "Region",  # Add region column
-        ])
-        w.writerows(rows)
-
-    print(f"Generated {len(rows)} rows of Indian coal mining data to {CSV_PATH}")
+
+def _chunks(rows: int, chunk_rows: int) -> List[Tuple[int, int, int]]:
+    return [(k, start, min(chunk_rows, rows - start)) for k, start in enumerate(range(0, rows, chunk_rows))]
+
+
+# Row format of the CSV; ~4x faster than DataFrame.to_csv or csv.writer on these columns
+CSV_ROW = "%d,%.2f,%.2f,%.2f,%.2f,%.2f,%.2f,%s\n"
+
+
+def _csv_chunk(seed: int, chunk: int, start: int, rows: int) -> bytes:
+    # Formatting is the expensive part, so it happens in the worker too
+    columns = generate_chunk(seed, chunk, start, rows)
+    return "".join(CSV_ROW % row for row in zip(*(columns[name].tolist() for name in COLUMNS))).encode("utf-8")
+
+
+def _map_ordered(fn: Callable, tasks: List[Tuple], workers: int) -> Iterator:
+    """fn(*task) for each task, in order, with at most 2 * workers results held at once"""
+    if workers <= 1:
+        for task in tasks:
+            yield fn(*task)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        for task in tasks:
+            pending.append(pool.submit(fn, *task))
+            if len(pending) >= 2 * workers:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+
+def write_csv(path: Path, tasks: List[Tuple], workers: int) -> None:
+    with open(path, "wb") as f:
+        f.write((",".join(COLUMNS) + "\n").encode("utf-8"))
+        for block in _map_ordered(_csv_chunk, tasks, workers):
+            f.write(block)
+
+
+def write_parquet(path: Path, tasks: List[Tuple], workers: int) -> None:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("Parquet output needs pyarrow (pip install pyarrow); use a .csv path instead")
+    writer = None
+    try:
+        # One row group per chunk
+        for columns in _map_ordered(generate_chunk, tasks, workers):
+            table = pa.table({name: columns[name] for name in COLUMNS})
+            if writer is None:
+                writer = pq.ParquetWriter(str(path), table.schema, compression="zstd")
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def generate(out: Path, rows: int = DEFAULT_ROWS, seed: int = DEFAULT_SEED, chunk_rows: int = CHUNK_ROWS,
+             workers: int = 1, fmt: Optional[str] = None) -> Path:
+    """Write `rows` synthetic rows to `out` as CSV or Parquet (by suffix unless `fmt` is given)"""
+    if rows < 1 or chunk_rows < 1:
+        raise ValueError("rows and chunk_rows must be positive")
+    out = Path(out)
+    fmt = fmt or ("parquet" if out.suffix.lower() in (".parquet", ".pq") else "csv")
+    writers = {"csv": write_csv, "parquet": write_parquet}
+    if fmt not in writers:
+        raise ValueError(f"unknown format {fmt!r}; expected one of {sorted(writers)}")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tasks = [(seed, *chunk) for chunk in _chunks(rows, chunk_rows)]
+    # Readers of `out` (the API, the store builder) never see a half-written file
+    tmp = out.with_name(f".{out.name}.{os.getpid()}.tmp")
+    try:
+        writers[fmt](tmp, tasks, workers)
+        os.replace(tmp, out)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return out
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Generate synthetic Indian coal-mining history")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS)
+    parser.add_argument("--out", type=Path, default=CSV_PATH, help=".csv or .parquet (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--workers", type=int, default=1, help="processes generating chunks (default: 1)")
+    parser.add_argument("--format", choices=["csv", "parquet"], help="default: from the --out suffix")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    try:
+        out = generate(args.out, rows=args.rows, seed=args.seed, chunk_rows=args.chunk_rows,
+                       workers=args.workers, fmt=args.format)
+    except ValueError as e:
+        parser.error(str(e))
+    elapsed = time.perf_counter() - started
+    print(f"Generated {args.rows} rows of Indian coal mining data to {out} in {elapsed:.1f}s")
     print("Data includes regional variations for Jharkhand, Chhattisgarh, Odisha, and West Bengal")
     print("Uses India's grid emission factor (0.82 tCO2/MWh) and regional emission factors")
 
 
 if __name__ == "__main__":
     main()
-
-
@@ -3,6 +3,9 @@ from __future__ import annotations
 from pathlib import Path
 from typing import List, Dict, Optional
 import csv
+import heapq
+import threading
+from collections import OrderedDict
 
 
 ROOT = Path(__file__).resolve().parents[1]
@@ -29,21 +32,28 @@ def _load_strategies() -> List[Dict]:
     return rows
 
 
-def _score(row: Dict, sector: str, emission_value: float) -> float:
+TOP_K = 10
+
+
+def _band(emission_value: float) -> str:
+    # Indian coal mining emission bands (adapted from paper)
+    if emission_value >= 500_000:    # High: >500K tCO2e (Indian scale)
+        return "high"
+    if emission_value >= 50_000:     # Medium: 50K-500K tCO2e (Indian scale)
+        return "medium"
+    return "low"                     # Low: <50K tCO2e (Indian scale)
+
+
+def _base_score(row: Dict, band: str) -> float:
     score = 0.0
     cat = (row.get("category") or "").lower()
     impact = (row.get("impact_level") or "Medium").lower()
-    
-    # Indian coal mining emission band preferences (adapted from paper)
-    high = emission_value >= 500_000    # High: >500K tCO2e (Indian scale)
-    medium = 50_000 <= emission_value < 500_000  # Medium: 50K-500K tCO2e (Indian scale)
-    low = emission_value < 50_000       # Low: <50K tCO2e (Indian scale)
 
     # Strategy preferences aligned with India's renewable energy targets (500 GW by 2030)
-    if high:
+    if band == "high":
         if "renewable" in cat or "efficiency" in cat or "offset" in cat or "carbon capture" in cat:
             score += 3
-    elif medium:
+    elif band == "medium":
         if "efficiency" in cat or "renewable" in cat:
             score += 3
     else:
@@ -56,6 +66,12 @@ def _score(row: Dict, sector: str, emission_value: float) -> float:
     elif impact == "medium":
         score += 1
 
+    return score
+
+
+def _score(row: Dict, sector: str, emission_value: float) -> float:
+    score = _base_score(row, _band(emission_value))
+
     # Regional matching for different Indian coal belts
     r_sector = (row.get("sector") or "").lower()
     if r_sector and r_sector in (sector or "").lower():
@@ -64,11 +80,79 @@ def _score(row: Dict, sector: str, emission_value: float) -> float:
     return score
 
 
-def recommend_strategies(sector: str, emission_value: float, region: Optional[str] = None) -> List[Dict]:
-    rows = _load_strategies()
-    ranked = sorted(rows, key=lambda r: _score(r, sector, emission_value), reverse=True)
+class RecommendationIndex:
+    """Top-k strategy lists per (emission band, sector), from rankings built once per catalogue.
+
+    Scores only depend on the band, each row's category/impact and whether the row's sector is a
+    substring of the requested sector (+0.5). Each band keeps every row ranked by base score;
+    a request merges the boosted rows of the matching sectors with the head of that ranking,
+    so it never re-scores the whole catalogue. Results are memoised per (band, sector), keeping
+    the most recent MEMO_SIZE.
+    """
+
+    MEMO_SIZE = 1024
+
+    def __init__(self, rows: List[Dict], top_k: int = TOP_K):
+        self.rows = rows
+        self.top_k = top_k
+        self._sector_rows: Dict[str, List[int]] = {}
+        for i, r in enumerate(rows):
+            sector = (r.get("sector") or "").lower()
+            if sector:
+                self._sector_rows.setdefault(sector, []).append(i)
+        self._base = {band: [_base_score(r, band) for r in rows] for band in ("high", "medium", "low")}
+        # Score descending, ties by catalogue order: what a stable sort of every row would give
+        self._order = {
+            band: sorted(range(len(rows)), key=lambda i, scores=scores: -scores[i])
+            for band, scores in self._base.items()
+        }
+        self._unmatched = {band: order[:top_k] for band, order in self._order.items()}
+        self._memo: "OrderedDict[tuple, List[int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _rank(self, band: str, sector: str) -> List[int]:
+        boosted = {i for s, indices in self._sector_rows.items() if s in sector for i in indices}
+        if not boosted:
+            return self._unmatched[band]
+        base = self._base[band]
+        # At most len(boosted) rows of the ranking can be displaced, so its head holds every
+        # unboosted row of the result
+        candidates = sorted(boosted.union(self._order[band][:self.top_k + len(boosted)]))
+        return heapq.nlargest(self.top_k, candidates, key=lambda i: base[i] + (0.5 if i in boosted else 0.0))
+
+    def top(self, sector: str, emission_value: float) -> List[Dict]:
+        key = (_band(emission_value), (sector or "").lower())
+        with self._lock:
+            ranked = self._memo.get(key)
+            if ranked is not None:
+                self._memo.move_to_end(key)
+        if ranked is None:
+            ranked = self._rank(*key)
+            with self._lock:
+                self._memo[key] = ranked
+                while len(self._memo) > self.MEMO_SIZE:
+                    self._memo.popitem(last=False)
+        return [self.rows[i] for i in ranked]
+
+
+def build_index(rows: List[Dict]) -> RecommendationIndex:
+    return RecommendationIndex(rows)
+
+
+def recommend_strategies(
+    sector: str,
+    emission_value: float,
+    region: Optional[str] = None,
+    rows: Optional[List[Dict]] = None,
+    index: Optional[RecommendationIndex] = None,
+) -> List[Dict]:
+    # Callers that keep the catalogue in memory (the API) pass it, or its prebuilt index, in
+    if index is None:
+        if rows is None:
+            rows = _load_strategies()
+        index = build_index(rows)
     out: List[Dict] = []
-    for r in ranked[:10]:
+    for r in index.top(sector, emission_value):
         est = float(r.get("estimated_reduction_tco2e", 0) or 0)
         estimated = est * emission_value if est <= 1 else est
         out.append({
@@ -81,5 +165,3 @@ def recommend_strategies(sector: str, emission_value: float, region: Optional[st
             "region": region,
         })
     return out
-
-
@@ -1,58 +1,80 @@
-import json
 from pathlib import Path
-import joblib
+from typing import Dict, Optional, Tuple
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import r2_score, mean_squared_error
 import numpy as np
 
+from artifacts import publish
+import datastore
+
 
 ROOT = Path(__file__).resolve().parents[1]
 DATA_PATH = ROOT / "data" / "coal_emissions.csv"
-MODEL_PATH = ROOT / "ml" / "model.pkl"
-METRICS_PATH = ROOT / "ml" / "model_metrics.json"
+STORE_PATH = datastore.STORE_PATH
 
+FEATURE_COLUMNS = [
+    "Year",
+    "Coal_Production_Tons",
+    "Energy_Consumption_MWh",
+    "Emission_Factor_kgCO2_perTon",
+    "Methane_Emissions_tons",
+    "Other_GHG_Emissions_tons",
+]
+TARGET_COLUMN = "Total_Emissions_tCO2e"
+N_ESTIMATORS = 400
 
-def main() -> None:
-    df = pd.read_csv(DATA_PATH)
 
-    feature_cols = [
-        "Year",
-        "Coal_Production_Tons",
-        "Energy_Consumption_MWh",
-        "Emission_Factor_kgCO2_perTon",
-        "Methane_Emissions_tons",
-        "Other_GHG_Emissions_tons",
-    ]
-    target_col = "Total_Emissions_tCO2e"
+def report_progress(fraction: float, message: str) -> None:
+    """Stage marker read by the API's job queue (run_process in app/jobs.py) as the job's progress"""
+    print(f"progress {fraction:.2f} {message}", flush=True)
+
+
+def score(model, X, y) -> Dict:
+    y_pred = model.predict(X)
+    return {
+        # r2 is undefined for fewer than two samples
+        "r2": float(r2_score(y, y_pred)) if len(y) >= 2 else None,
+        "rmse": float(np.sqrt(mean_squared_error(y, y_pred))),
+    }
+
 
-    X = df[feature_cols]
-    y = df[target_col]
+def fit_full(df: pd.DataFrame) -> Tuple[RandomForestRegressor, Dict]:
+    """Train a fresh forest on `df` and score it on a 20% holdout"""
+    X = df[FEATURE_COLUMNS]
+    y = df[TARGET_COLUMN]
 
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
 
     model = RandomForestRegressor(
-        n_estimators=400,
+        n_estimators=N_ESTIMATORS,
         max_depth=None,
         random_state=42,
         n_jobs=-1,
     )
     model.fit(X_train, y_train)
-    y_pred = model.predict(X_test)
+    return model, score(model, X_test, y_test)
 
-    r2 = float(r2_score(y_test, y_pred))
-    rmse = float(np.sqrt(mean_squared_error(y_test, y_pred)))
 
-    MODEL_PATH.parent.mkdir(parents=True, exist_ok=True)
-    joblib.dump(model, MODEL_PATH)
-    with open(METRICS_PATH, "w", encoding="utf-8") as f:
-        json.dump({"r2": r2, "rmse": rmse}, f, indent=2)
+def load_history(store_path: Path = STORE_PATH, csv_path: Optional[Path] = DATA_PATH) -> pd.DataFrame:
+    """Training frame from the indexed store, rebuilt first if the seed CSV changed"""
+    datastore.ensure_store(store_path, csv_path)
+    columns, regions = datastore.read_columns(store_path)
+    return pd.DataFrame({**columns, "Region": regions})
 
-    print({"r2": r2, "rmse": rmse, "model": str(MODEL_PATH)})
+
+def main() -> None:
+    report_progress(0.05, "loading history")
+    df = load_history()
+    report_progress(0.15, f"fitting {N_ESTIMATORS} trees on {len(df)} rows")
+    model, metrics = fit_full(df)
+    report_progress(0.85, "publishing")
+    # Versioned copy under ml/artifacts/, then installed over ml/model.pkl (and its compact
+    # export, which the API prefers) with atomic replaces
+    entry = publish(model, metrics, {"mode": "full", "rows": len(df)})
+    print({**metrics, "version": entry["version"], "n_estimators": entry["n_estimators"]})
 
 
 if __name__ == "__main__":
     main()
-
-